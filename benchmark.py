@@ -0,0 +1,254 @@
+"""
+Benchmarks do gerador de sinais.
+
+Uso:
+    python benchmark.py renderizacao [--repeticoes 30]
+    python benchmark.py pipeline [--ativos 10 50] [--dias 5 10] [--timeframes 1 5 15] [--repeticoes 3]
+                                 [--saida resultados.json] [--comparar base.json --limite 20]
+"""
+import argparse, contextlib, io, json, platform, random, sys, tempfile, time, tracemalloc
+import numpy as np
+from main import Catalogador
+from replay import RelogioSimulado, IQOptionSimulado, gravar_velas_sinteticas, criar_bot, fuso_local
+
+
+def gerar_velas_sinteticas(quantidade, timeframe=1, fim=1760000000, semente=0):
+    """Gera velas determinísticas(passeio aleatório) no mesmo formato do get_candles() da IQ Option."""
+    gerador = random.Random(semente)
+    duracao = timeframe * 60
+    inicio = fim - fim % duracao - (quantidade - 1) * duracao
+
+    velas = []
+    preco = 1.1
+    for i in range(quantidade):
+        abertura = preco
+        fechamento = round(abertura + gerador.gauss(0, 0.0003), 5) if gerador.random() > 0.05 else abertura
+        velas.append({
+            'id': i, 'from': inicio + i * duracao, 'at': (inicio + i * duracao) * 10**9, 'to': inicio + (i + 1) * duracao,
+            'open': abertura, 'close': fechamento,
+            'min': round(min(abertura, fechamento) - abs(gerador.gauss(0, 0.0001)), 5),
+            'max': round(max(abertura, fechamento) + abs(gerador.gauss(0, 0.0001)), 5),
+            'volume': gerador.randint(1, 500)
+        })
+        preco = fechamento
+    return velas
+
+
+def medir(funcao, repeticoes):
+    """Executa `funcao` `repeticoes` vezes e retorna os tempos em milissegundos."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return np.array(tempos)
+
+
+def benchmark_renderizacao(repeticoes):
+    """Compara o RenderizadorDeVelas(figura reutilizada) com o caminho antigo do mplfinance."""
+    catalogador = Catalogador(None)
+    velas = gerar_velas_sinteticas(15)
+
+    resultados = {}
+    for nome, rapido in (('mplfinance', False), ('renderizador', True)):
+        catalogador.renderizador_rapido = rapido
+        catalogador.gerar_imagem(velas, 'EURUSD-op', 'Win +R$(Nenhum Martingale)')  # aquecimento
+        tempos = medir(lambda: catalogador.gerar_imagem(velas, 'EURUSD-op', 'Win +R$(Nenhum Martingale)'), repeticoes)
+        resultados[nome] = tempos
+        print(f"{nome:>13}: média {tempos.mean():7.1f} ms | p95 {np.percentile(tempos, 95):7.1f} ms | {repeticoes} gráficos")
+
+    print(f"{'ganho':>13}: {resultados['mplfinance'].mean() / resultados['renderizador'].mean():.1f}x")
+    return resultados
+
+
+# configuração fixa(sem sorteio) para que os cenários sejam comparáveis entre execuções
+CONFIGURACAO_DO_PIPELINE = {
+    "tipo de catalogação": "agressivo",
+    "martingale": "1 martingale",
+    "porcentagem de assertividade(nenhum martingale)": "70%",
+    "porcentagem de assertividade(1 martingale)": "60%",
+    "porcentagem de assertividade(2 martingale)": "60%",
+    "quantidade de operações que a Machine Learning ira filtrar": 20
+}
+
+
+def medir_etapa(funcao, repeticoes, preparar=None):
+    """
+    Mede uma etapa do pipeline: tempos(ms) de `repeticoes` execuções e o pico de memória(tracemalloc)
+    de uma execução extra, feita separada para não pesar nos tempos. `preparar` roda antes de cada execução.
+
+    Returns:
+        tuple: (resultado da última execução, tempos em ms, pico de memória em bytes)
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        if preparar:
+            preparar()
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+    if preparar:
+        preparar()
+    tracemalloc.start()
+    funcao()
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return resultado, np.array(tempos), pico
+
+
+def benchmark_cenario(ativos, dias, timeframe, repeticoes, fim=1760000000, processos=0):
+    """
+    Catalogação → organização → filtro → ordenação sobre velas sintéticas servidas pela IQOptionSimulado
+    (sem latência), sempre a frio: o estado da catalogação incremental é descartado antes de cada execução.
+    Com `processos`, mede também a catalogação completa com a agregação em `processos` processos.
+
+    Returns:
+        dict: Por etapa, a mediana e o p95 do tempo(ms), a vazão(velas/s nas etapas que consomem velas,
+        horários/s ou sinais/s nas seguintes) e o pico de memória(MB).
+    """
+    with tempfile.TemporaryDirectory() as diretorio:
+        # a catalogação incremental carrega ao menos dias_maximos_da_catalogacao dias e busca até completar
+        # um dia distinto a mais, então são gravados 2 dias de folga. Só o M1 é gravado: M5/M15 são
+        # reamostrados dele(pela catalogação com reamostrar_do_m1 ou pela IQOptionSimulado)
+        dias_gravados = max(dias, Catalogador(None).dias_maximos_da_catalogacao) + 2
+        pares = gravar_velas_sinteticas(diretorio, ativos, dias_gravados, fim, 1)
+        relogio = RelogioSimulado(fim)
+        api = IQOptionSimulado(relogio, diretorio, latencia=0)
+        bot = criar_bot(relogio, api, diretorio)
+        catalogador = bot.catalogador
+
+        configuracoes = dict(CONFIGURACAO_DO_PIPELINE, **{"timeframe": f"{timeframe} minutos", "periodo de catalogação em dias": f"{dias} dias"})
+        gales = int(configuracoes['martingale'].split(' ')[0])
+        descartar_estado = catalogador.estados_da_catalogacao.clear
+
+        def velas_da_execucao(funcao):
+            """Velas servidas pela IQOptionSimulado em uma execução da etapa."""
+            descartar_estado()
+            antes = api.velas_servidas
+            funcao()
+            return api.velas_servidas - antes
+
+        etapas = {}
+        def registrar(nome, tempos, pico, quantidade, unidade="velas"):
+            """`quantidade` é o que a etapa processa por execução, em `unidade`(gravado como `<unidade>_por_s`)."""
+            etapas[nome] = {
+                "mediana_ms": round(float(np.median(tempos)), 3),
+                "p95_ms": round(float(np.percentile(tempos, 95)), 3),
+                "unidade": unidade,
+                f"{unidade}_por_s": round(quantidade / (np.median(tempos) / 1000)) if np.median(tempos) else None,
+                "pico_de_memoria_mb": round(pico / 2**20, 3)
+            }
+
+        with fuso_local(bot.horario.timezone.zone), contextlib.redirect_stdout(io.StringIO()):
+            # 1. um ativo
+            catalogar_um = lambda: catalogador.cataloga(pares[0], dias, timeframe, gales=gales)
+            velas_de_um_ativo = velas_da_execucao(catalogar_um)
+            _, tempos, pico = medir_etapa(catalogar_um, repeticoes, descartar_estado)
+            registrar("cataloga", tempos, pico, velas_de_um_ativo)
+
+            # 2. todos os ativos(inclui organizar_catalogacao_por_horario)
+            catalogar_todos = lambda: catalogador.catalogar_operacoes(configuracoes)
+            velas_do_ciclo = velas_da_execucao(catalogar_todos)
+            organizada, tempos, pico = medir_etapa(catalogar_todos, repeticoes, descartar_estado)
+            registrar("catalogar_operacoes", tempos, pico, velas_do_ciclo)
+
+            if processos:
+                catalogador.processos_de_agregacao = processos
+                catalogar_em_processos = lambda: catalogador.catalogar_ativos_em_processos(pares, dias, timeframe, gales)
+                _, tempos, pico = medir_etapa(catalogar_em_processos, repeticoes)
+                registrar("catalogar_ativos_em_processos", tempos, pico, velas_do_ciclo)
+                catalogador.executor_de_agregacao.shutdown()
+
+            # 3. etapas seguintes sobre o resultado do ciclo: não consomem velas, então a vazão é medida no que
+            # cada uma processa(horários catalogados de todos os ativos, sinais aprovados pelo filtro)
+            descartar_estado()
+            por_ativo = catalogador.catalogar_ativos_em_paralelo(pares, dias, timeframe, gales=gales)
+            horarios_do_ciclo = sum(len(horarios) for horarios in por_ativo.values())
+            _, tempos, pico = medir_etapa(lambda: catalogador.organizar_catalogacao_por_horario(por_ativo), repeticoes)
+            registrar("organizar_catalogacao_por_horario", tempos, pico, horarios_do_ciclo, "horarios")
+
+            filtrada, tempos, pico = medir_etapa(lambda: catalogador.filtrar_lista_de_operacoes_por_horario(organizada, configuracoes), repeticoes)
+            registrar("filtrar_lista_de_operacoes_por_horario", tempos, pico, len(filtrada["lista"]), "sinais")
+
+            lista, tempos, pico = medir_etapa(lambda: catalogador.ordenar_lista(filtrada["lista"]), repeticoes)
+            registrar("ordenar_lista", tempos, pico, len(filtrada["lista"]), "sinais")
+
+        return {"ativos": ativos, "dias": dias, "timeframe": timeframe, "velas_do_ciclo": velas_do_ciclo, "operacoes": len(lista), "etapas": etapas}
+
+
+def comparar_resultados(resultados, base, limite):
+    """
+    Compara a mediana de cada etapa com a do arquivo base(mesmos ativos/dias/timeframe).
+
+    Returns:
+        list: Regressões acima de `limite`%, como (cenário, etapa, base_ms, atual_ms).
+    """
+    chave = lambda cenario: (cenario["ativos"], cenario["dias"], cenario["timeframe"])
+    cenarios_base = {chave(cenario): cenario for cenario in base["cenarios"]}
+
+    regressoes = []
+    for cenario in resultados["cenarios"]:
+        anterior = cenarios_base.get(chave(cenario))
+        if anterior is None:
+            continue
+        for etapa, medidas in cenario["etapas"].items():
+            base_ms = anterior["etapas"].get(etapa, {}).get("mediana_ms")
+            if base_ms and medidas["mediana_ms"] > base_ms * (1 + limite / 100):
+                regressoes.append((chave(cenario), etapa, base_ms, medidas["mediana_ms"]))
+    return regressoes
+
+
+def benchmark_pipeline(ativos, dias, timeframes, repeticoes, saida=None, comparar=None, limite=20, processos=0):
+    """Roda todos os cenários(ativos x dias x timeframes), grava o JSON e, com `comparar`, retorna 1 se houver regressão."""
+    resultados = {
+        "ambiente": {"python": platform.python_version(), "numpy": np.__version__, "plataforma": platform.platform()},
+        "repeticoes": repeticoes,
+        "cenarios": []
+    }
+    for timeframe in timeframes:
+        for quantidade_de_dias in dias:
+            for quantidade_de_ativos in ativos:
+                cenario = benchmark_cenario(quantidade_de_ativos, quantidade_de_dias, timeframe, repeticoes, processos=processos)
+                resultados["cenarios"].append(cenario)
+                print(f"M{timeframe} | {quantidade_de_ativos} ativos | {quantidade_de_dias} dias | {cenario['velas_do_ciclo']} velas | {cenario['operacoes']} operações")
+                for etapa, medidas in cenario["etapas"].items():
+                    print(f"  {etapa:>40}: {medidas['mediana_ms']:10.2f} ms | {medidas[medidas['unidade'] + '_por_s'] or 0:>12,} {medidas['unidade'] + '/s':<10} | pico {medidas['pico_de_memoria_mb']:8.2f} MB")
+
+    if saida:
+        with open(saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+    if comparar:
+        with open(comparar, "r", encoding="utf-8") as arquivo:
+            regressoes = comparar_resultados(resultados, json.load(arquivo), limite)
+        for (ativos_, dias_, timeframe), etapa, base_ms, atual_ms in regressoes:
+            print(f"REGRESSÃO M{timeframe} | {ativos_} ativos | {dias_} dias | {etapa}: {base_ms:.2f} ms -> {atual_ms:.2f} ms(+{100 * (atual_ms / base_ms - 1):.0f}%)")
+        if regressoes:
+            return 1
+        print(f"sem regressões acima de {limite}%")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks do gerador de sinais")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    renderizacao = subparsers.add_parser("renderizacao", help="gráficos de resultado: RenderizadorDeVelas x mplfinance")
+    renderizacao.add_argument("--repeticoes", type=int, default=30)
+
+    pipeline = subparsers.add_parser("pipeline", help="cataloga → catalogar_operacoes → organizar → filtrar → ordenar_lista")
+    pipeline.add_argument("--ativos", type=int, nargs="+", default=[10, 50], help="quantidades de ativos(10 a 500)")
+    pipeline.add_argument("--dias", type=int, nargs="+", default=[5, 10], help="dias de catalogação(5 a 30)")
+    pipeline.add_argument("--timeframes", type=int, nargs="+", default=[1, 5, 15], choices=[1, 5, 15])
+    pipeline.add_argument("--repeticoes", type=int, default=3)
+    pipeline.add_argument("--saida", help="arquivo JSON com os resultados")
+    pipeline.add_argument("--comparar", help="JSON de uma execução anterior; sai com código 1 se alguma etapa piorar além do --limite")
+    pipeline.add_argument("--limite", type=float, default=20, help="regressão tolerada, em %% da mediana")
+    pipeline.add_argument("--processos", type=int, default=0, help="medir também a agregação em N processos(catalogar_ativos_em_processos)")
+
+    argumentos = parser.parse_args()
+    if argumentos.benchmark == "renderizacao":
+        benchmark_renderizacao(argumentos.repeticoes)
+    elif argumentos.benchmark == "pipeline":
+        sys.exit(benchmark_pipeline(argumentos.ativos, argumentos.dias, argumentos.timeframes, argumentos.repeticoes, argumentos.saida, argumentos.comparar, argumentos.limite, argumentos.processos))
@@ -1,23 +1,94 @@
-import os, time, random, json, sys
+import os, io, time, random, json, sys, threading, heapq, itertools, hashlib, bisect
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future, wait
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+from multiprocessing import shared_memory
 import telebot
 import pytz
 from datetime import datetime, timedelta
+from collections import deque
 from iqoptionapi.stable_api import IQ_Option
 from colorama import Fore, init
 import pandas as pd
 import numpy as np
 import mplfinance as mpl
-import secrets
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.patches import Rectangle
+from matplotlib.collections import LineCollection
+from matplotlib.ticker import FormatStrFormatter
 from dotenv import load_dotenv
 init(autoreset=True, convert=True)
 load_dotenv()
 
+class Relogio:
+    """
+    Relógio do sistema usado pelo Horario e pelas esperas do bot. Pode ser trocado por um relógio
+    simulado(ver replay.py) para rodar um dia inteiro de operações sem esperar em tempo real.
+    """
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, segundos):
+        time.sleep(segundos)
+
+    def aguardar(self, condicao, timeout=None, ocioso=True):
+        """Espera uma notificação em `condicao` por até `timeout` segundos. `ocioso` indica que nenhuma
+        tarefa está em execução(usado pelo relógio simulado para avançar o tempo)."""
+        return condicao.wait(timeout)
+
+
 class Horario:
-    def __init__(self, timezone="America/Sao_Paulo"):
+    def __init__(self, timezone="America/Sao_Paulo", relogio=None):
         self.timezone = pytz.timezone(timezone)
+        self.relogio = relogio or Relogio()
+
+        # atraso(em segundos) de cada despertar agendado: (nome, atraso)
+        self.atrasos = deque(maxlen=1000)
 
     def now(self):
-        return datetime.now(self.timezone)
+        return datetime.fromtimestamp(self.relogio.time(), self.timezone)
+
+    def prazo_monotonico(self, timestamp: float) -> float:
+        """Converte um timestamp(relógio de parede) em um prazo no relógio monotônico(time.monotonic())."""
+        return self.relogio.monotonic() + (timestamp - self.relogio.time())
+
+    def aguardar_prazo_monotonico(self, prazo: float, nome: str = "aguardar") -> float:
+        """
+        Dorme até o prazo informado no relógio monotônico, sem polling: cada time.sleep() vai direto até o
+        prazo e só repete se o sistema acordar antes.
+
+        Returns:
+            float: Atraso do despertar em segundos.
+        """
+        while True:
+            restante = prazo - self.relogio.monotonic()
+            if restante <= 0:
+                break
+            self.relogio.sleep(restante)
+
+        atraso = self.relogio.monotonic() - prazo
+        self.registrar_atraso(nome, atraso)
+        return atraso
+
+    def aguardar_ate(self, timestamp: float, nome: str = "aguardar") -> float:
+        """
+        Aguarda até o timestamp informado(segundos desde a época) usando o relógio monotônico, então
+        ajustes no relógio do sistema durante a espera não adiantam nem atrasam o despertar.
+
+        Returns:
+            float: Atraso do despertar em segundos.
+        """
+        return self.aguardar_prazo_monotonico(self.prazo_monotonico(timestamp), nome)
+
+    def registrar_atraso(self, nome: str, atraso: float):
+        self.atrasos.append((nome, atraso))
     def horario_valido(self, horario: str) -> bool:
         """
         Verifica se o horário informado (no formato 'HH:MM') é maior que o horário atual.
@@ -30,7 +101,7 @@ class Horario:
         """
         try:
             # Obter o horário atual no timezone configurado
-            agora = datetime.now(self.timezone)
+            agora = self.now()
             
             # Combinar a data atual com o horário fornecido
             data_com_horario = datetime.strptime(
@@ -55,7 +126,7 @@ class Horario:
         """
         try:
             # Obter a data e horário atual no timezone configurado
-            agora = datetime.now(self.timezone)
+            agora = self.now()
 
             # Extrair horas e minutos do horário fornecido
             horas, minutos = map(int, horario.split(':'))
@@ -67,11 +138,10 @@ class Horario:
                 data_com_horario += timedelta(days=1)
 
             # Calcular o timestamp do horário da operação e aplicar o delay
-            timestemp_da_operacao = int(data_com_horario.timestamp()) - delay
+            timestemp_da_operacao = data_com_horario.timestamp() - delay
 
-            # Loop para aguardar até o horário ser atingido
-            while int(datetime.now(self.timezone).timestamp()) < timestemp_da_operacao:
-                time.sleep(1)  # Espera 1 segundo antes de verificar novamente
+            # Aguardar até o horário ser atingido
+            self.aguardar_ate(timestemp_da_operacao, nome=f"aguardar_horario {horario}")
 
         except ValueError:
             raise ValueError("Horário inválido. Certifique-se de usar o formato 'HH:MM'.")
@@ -99,7 +169,7 @@ class Horario:
             int: Timestamp do horário ajustado.
         """
         # Obter a data atual no timezone configurado
-        agora = datetime.now(self.timezone)
+        agora = self.now()
 
         # Combinar a data atual com o horário fornecido
         data_com_horario = datetime.strptime(
@@ -117,15 +187,53 @@ class Horario:
         return int(data_com_horario.timestamp())
 
 class MessageString:
+    # cabeçalho e idioma de um grupo sem configuração própria(ver BotManager.carregar_grupos)
+    GRUPO_PADRAO = {"cabecalho": "CLUBE DOS INVESTIDORES", "idioma": "pt"}
+
+    TEXTOS = {
+        "pt": {
+            "dias_da_semana": ['Segunda-Feira','Terça-feira','Quarta-feira','Quinta-feira','Sexta-feira','Sábado','Domingo'],
+            "periodo": "Sinais de <b>{inicio}h</b> a <b>{fim}h</b>",
+            "ativo_fechado": "🔒 ativo {ativo} fechado no momento",
+            "horario_expirado": "⏰ horário da operação <i>{horario}</i> expirou",
+            "aguardando_operacao": "Aguardando Operação",
+            "operacao_realizada": "⏰ Operação Realizada no ativo {ativo}, aguardando resultado...",
+            "aguardando_martingale": "🔄 Operação Realizada({martingale}° Martingale) no ativo {ativo}, aguardando resultado...",
+            "placar": "Placar",
+            "martingales": ['Nenhum Martingale', '1° Martingale', '2° Martingale'],
+            "win": "<b>Win +R$({martingale})</b>",
+            "loss": "<b>Loss -R$({martingale})</b>",
+            "doji": "🔍 DOJI detectado no ativo <i>{ativo}</i>",
+        },
+        "en": {
+            "dias_da_semana": ['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday'],
+            "periodo": "Signals from <b>{inicio}h</b> to <b>{fim}h</b>",
+            "ativo_fechado": "🔒 asset {ativo} is closed right now",
+            "horario_expirado": "⏰ operation time <i>{horario}</i> has expired",
+            "aguardando_operacao": "Awaiting Operation",
+            "operacao_realizada": "⏰ Operation placed on {ativo}, awaiting result...",
+            "aguardando_martingale": "🔄 Operation placed({martingale}° Martingale) on {ativo}, awaiting result...",
+            "placar": "Score",
+            "martingales": ['No Martingale', '1st Martingale', '2nd Martingale'],
+            "win": "<b>Win +R$({martingale})</b>",
+            "loss": "<b>Loss -R$({martingale})</b>",
+            "doji": "🔍 DOJI detected on <i>{ativo}</i>",
+        },
+    }
+
     def __init__(self, botManager):
         self.botManager = botManager
 
-    def header(self):
-        return "🚀 | <b>CLUBE DOS INVESTIDORES</b>\n| <i>" + self.botManager.datetime_and_weekday_in_string() + "</i>"
+    def textos(self, grupo=None):
+        return self.TEXTOS[(grupo or self.GRUPO_PADRAO).get("idioma", "pt")]
+
+    def header(self, grupo=None):
+        grupo = grupo or self.GRUPO_PADRAO
+        return f"🚀 | <b>{grupo['cabecalho']}</b>\n| <i>" + self.botManager.datetime_and_weekday_in_string(self.textos(grupo)["dias_da_semana"]) + "</i>"
 
-    def send_list_string(self, catalogacao):
-        message = f"{self.header()}\n\n"
-        message += f"Sinais de <b>{catalogacao['hora_atual']}h</b> a <b>{catalogacao['proxima_hora']}h</b>\n\n"
+    def send_list_string(self, catalogacao, grupo=None):
+        message = f"{self.header(grupo)}\n\n"
+        message += self.textos(grupo)["periodo"].format(inicio=catalogacao['hora_atual'], fim=catalogacao['proxima_hora']) + "\n\n"
 
         for signal in catalogacao["lista"]:
             for ativo in signal:
@@ -139,26 +247,30 @@ class MessageString:
         
         return message
 
-    def active_closed_string(self, operacao):
-        return f"{self.header()}\n\n\n| <i>{operacao['ativo'].replace('-op','')} {operacao['horario']} {operacao['timeframe']} {operacao['dir']}</i>\n🔒 ativo {operacao['ativo'].replace('-op','')} fechado no momento"
-    def time_has_expired_string(self, operacao):
-        return f"{self.header()}\n\n\n| <i>{operacao['ativo'].replace('-op','')} {operacao['horario']} {operacao['timeframe']} {operacao['dir']}</i>\n⏰ horário da operação <i>{operacao['horario']}</i> expirou"
-    def awaiting_operation_string(self, operacao):
-        return f"{self.header()}\n\n| <b>Aguardando Operação</b>\n{operacao['ativo'].replace('-op','')} {operacao['horario']} {operacao['timeframe']} {'CALL 🟩' if operacao['dir'].strip() == 'CALL' else 'PUT 🟥'}"
-    def operacao_realizada_string(self, operacao):
-        return f"{self.header()}\n\n⏰ Operação Realizada no ativo {operacao['ativo'].replace('-op','')}, aguardando resultado..."
-    def resultado_da_operacao_string(self, operacao, resultado, aguardando_martingale=0):
-        mensagem = f'{self.header()}\n\n\n| {operacao["ativo"].replace("-op","")} {operacao["horario"]} {operacao["timeframe"]} {operacao["dir"]}\n{resultado}'
+    def active_closed_string(self, operacao, grupo=None):
+        return f"{self.header(grupo)}\n\n\n| <i>{operacao['ativo'].replace('-op','')} {operacao['horario']} {operacao['timeframe']} {operacao['dir']}</i>\n" + self.textos(grupo)["ativo_fechado"].format(ativo=operacao['ativo'].replace('-op',''))
+    def time_has_expired_string(self, operacao, grupo=None):
+        return f"{self.header(grupo)}\n\n\n| <i>{operacao['ativo'].replace('-op','')} {operacao['horario']} {operacao['timeframe']} {operacao['dir']}</i>\n" + self.textos(grupo)["horario_expirado"].format(horario=operacao['horario'])
+    def awaiting_operation_string(self, operacao, grupo=None):
+        return f"{self.header(grupo)}\n\n| <b>{self.textos(grupo)['aguardando_operacao']}</b>\n{operacao['ativo'].replace('-op','')} {operacao['horario']} {operacao['timeframe']} {'CALL 🟩' if operacao['dir'].strip() == 'CALL' else 'PUT 🟥'}"
+    def operacao_realizada_string(self, operacao, grupo=None):
+        return f"{self.header(grupo)}\n\n" + self.textos(grupo)["operacao_realizada"].format(ativo=operacao['ativo'].replace('-op',''))
+    def resultado_string(self, tipo, martingale, operacao, grupo=None):
+        """Texto do resultado('win', 'loss' ou 'doji') na entrada(martingale=0) ou no N° martingale."""
+        textos = self.textos(grupo)
+        return textos[tipo].format(martingale=textos["martingales"][martingale], ativo=operacao["ativo"])
+    def resultado_da_operacao_string(self, operacao, resultado, aguardando_martingale=0, grupo=None):
+        mensagem = f'{self.header(grupo)}\n\n\n| {operacao["ativo"].replace("-op","")} {operacao["horario"]} {operacao["timeframe"]} {operacao["dir"]}\n{resultado}'
         
 
         if aguardando_martingale == 1 or aguardando_martingale == 2:  # Para 'Nenhum Martingale' ou '1° Martingale'
-            mensagem += f"\n\n\n🔄 Operação Realizada({aguardando_martingale}° Martingale) no ativo {operacao['ativo'].replace('-op','')}, aguardando resultado..."
+            mensagem += "\n\n\n" + self.textos(grupo)["aguardando_martingale"].format(martingale=aguardando_martingale, ativo=operacao['ativo'].replace('-op',''))
         
 
         return mensagem
-    def resultado_e_placar_da_lista_string(self, catalogacao):
-        message = f"{self.header()}\n\n"
-        message += f"Sinais de <b>{catalogacao['hora_atual']}h</b> a <b>{catalogacao['proxima_hora']}h</b>\n\n"
+    def resultado_e_placar_da_lista_string(self, catalogacao, grupo=None):
+        message = f"{self.header(grupo)}\n\n"
+        message += self.textos(grupo)["periodo"].format(inicio=catalogacao['hora_atual'], fim=catalogacao['proxima_hora']) + "\n\n"
         wins = 0
         losses = 0
         for signal in catalogacao["lista"]:
@@ -181,60 +293,1404 @@ class MessageString:
                     sinal = f"{ativo.replace('-op','')} {horario} M1 {direcao} {resultado_string}\n"
                     message+=sinal
         
-        message+=f'\nPlacar: {wins}x{losses}'
+        message+=f'\n{self.textos(grupo)["placar"]}: {wins}x{losses}'
         return message
 
 
 
-class Catalogador:
-    def __init__(self, botManager):
+class Metricas:
+    """
+    Contadores e histogramas de latência do bot, exportados no formato texto do Prometheus(/metrics) ou
+    em JSON(/metrics.json) por um servidor HTTP local(`iniciar_servidor`).
+
+    Cada métrica é identificada pelo nome e pelos rótulos(ex.: metodo="get_candles").
+    """
+    LIMITES = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+    DESCRICOES = {
+        "iqoption_chamadas_total": "Chamadas à IQ Option por método e status",
+        "iqoption_latencia_segundos": "Latência das chamadas à IQ Option por método",
+        "iqoption_velas_recebidas_total": "Velas recebidas do get_candles()",
+        "catalogacao_ativo_segundos": "Tempo de catalogação de cada ativo",
+        "catalogacao_ciclo_segundos": "Tempo de catalogação de todos os ativos(catalogar_operacoes)",
+        "varredura_segundos": "Tempo da varredura de todas as configurações(varrer_configuracoes)",
+        "filtro_segundos": "Tempo do filtro da lista por horário",
+        "ordenacao_segundos": "Tempo da ordenação da lista",
+        "grafico_segundos": "Tempo de renderização dos gráficos de resultado",
+        "telegram_envios_total": "Envios ao Telegram por método e status",
+        "telegram_latencia_segundos": "Latência dos envios ao Telegram por método",
+        "acompanhamento_atraso_segundos": "Atraso das tarefas agendadas do acompanhamento em relação ao horário marcado",
+    }
+
+    def __init__(self):
+        self.trava = threading.Lock()
+        self.contadores = {}
+        self.histogramas = {}
+        self.servidor = None
+
+    def incrementar(self, nome, valor=1, **rotulos):
+        chave = tuple(sorted(rotulos.items()))
+        with self.trava:
+            serie = self.contadores.setdefault(nome, {})
+            serie[chave] = serie.get(chave, 0) + valor
+
+    def observar(self, nome, valor, **rotulos):
+        chave = tuple(sorted(rotulos.items()))
+        with self.trava:
+            serie = self.histogramas.setdefault(nome, {})
+            if chave not in serie:
+                serie[chave] = {"baldes": [0] * (len(self.LIMITES) + 1), "soma": 0.0, "total": 0}
+            histograma = serie[chave]
+            histograma["baldes"][bisect.bisect_left(self.LIMITES, valor)] += 1
+            histograma["soma"] += valor
+            histograma["total"] += 1
+
+    @contextmanager
+    def cronometro(self, nome, **rotulos):
+        """Observa em `nome` a duração(segundos) do bloco `with`."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nome, time.perf_counter() - inicio, **rotulos)
+
+    @staticmethod
+    def formatar_rotulos(chave, extra=()):
+        rotulos = list(chave) + list(extra)
+        return "{" + ",".join(f'{nome}="{valor}"' for nome, valor in rotulos) + "}" if rotulos else ""
+
+    def texto_prometheus(self):
+        linhas = []
+        with self.trava:
+            for nome, serie in sorted(self.contadores.items()):
+                linhas += [f"# HELP {nome} {self.DESCRICOES.get(nome, nome)}", f"# TYPE {nome} counter"]
+                linhas += [f"{nome}{self.formatar_rotulos(chave)} {valor}" for chave, valor in sorted(serie.items())]
+
+            for nome, serie in sorted(self.histogramas.items()):
+                linhas += [f"# HELP {nome} {self.DESCRICOES.get(nome, nome)}", f"# TYPE {nome} histogram"]
+                for chave, histograma in sorted(serie.items()):
+                    acumulado = 0
+                    for limite, quantidade in zip(self.LIMITES + ("+Inf",), histograma["baldes"]):
+                        acumulado += quantidade
+                        linhas.append(f"{nome}_bucket{self.formatar_rotulos(chave, [('le', limite)])} {acumulado}")
+                    linhas.append(f"{nome}_sum{self.formatar_rotulos(chave)} {histograma['soma']}")
+                    linhas.append(f"{nome}_count{self.formatar_rotulos(chave)} {histograma['total']}")
+        return "\n".join(linhas) + "\n"
+
+    def snapshot(self):
+        """Todas as métricas em um dicionário(serializável em JSON)."""
+        with self.trava:
+            return {
+                "contadores": {nome: [{"rotulos": dict(chave), "valor": valor} for chave, valor in serie.items()] for nome, serie in self.contadores.items()},
+                "histogramas": {nome: [{"rotulos": dict(chave), "total": histograma["total"], "soma": histograma["soma"],
+                                        "media": histograma["soma"] / histograma["total"],
+                                        "baldes": dict(zip(map(str, self.LIMITES + ("+Inf",)), histograma["baldes"]))}
+                                       for chave, histograma in serie.items()] for nome, serie in self.histogramas.items()},
+            }
+
+    def iniciar_servidor(self, porta=9100, endereco='127.0.0.1'):
+        """Serve /metrics(texto do Prometheus) e /metrics.json em uma thread em segundo plano."""
+        if self.servidor is not None:
+            return self.servidor
+        metricas = self
+
+        class Requisicao(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    corpo, tipo = metricas.texto_prometheus().encode(), 'text/plain; version=0.0.4; charset=utf-8'
+                elif self.path == '/metrics.json':
+                    corpo, tipo = json.dumps(metricas.snapshot()).encode(), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', tipo)
+                self.send_header('Content-Length', str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        self.servidor = ThreadingHTTPServer((endereco, porta), Requisicao)
+        threading.Thread(target=self.servidor.serve_forever, name='metricas', daemon=True).start()
+        return self.servidor
+
+
+class IQOptionInstrumentada:
+    """
+    Envolve uma conexão da IQ Option e registra nas Metricas as chamadas(por método e status), a latência e
+    as velas recebidas. Os demais atributos são repassados para a conexão original.
+    """
+    METODOS = ('get_candles', 'get_all_open_time', 'start_candles_stream', 'stop_candles_stream', 'connect', 'get_balance')
+
+    def __init__(self, conexao, metricas):
+        # não usar `self.api`: o IQ_Option já tem um atributo `api`(o cliente websocket), que seria escondido
+        self.conexao = conexao
+        self.metricas = metricas
+
+    def __getattr__(self, nome):
+        atributo = getattr(self.conexao, nome)
+        if nome not in self.METODOS:
+            return atributo
+
+        def chamada_instrumentada(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                resposta = atributo(*args, **kwargs)
+            except Exception:
+                self.metricas.incrementar("iqoption_chamadas_total", metodo=nome, status="erro")
+                raise
+            finally:
+                self.metricas.observar("iqoption_latencia_segundos", time.perf_counter() - inicio, metodo=nome)
+            self.metricas.incrementar("iqoption_chamadas_total", metodo=nome, status="ok")
+            if nome == 'get_candles' and resposta:
+                self.metricas.incrementar("iqoption_velas_recebidas_total", len(resposta))
+            return resposta
+        return chamada_instrumentada
+
+
+class AtivosAbertos:
+    """
+    Cache compartilhado dos ativos abertos na IQ Option(resultado de get_all_open_time()).
+
+    O snapshot vale por `ttl` segundos e é renovado por uma thread em segundo plano, então as consultas
+    de aberto/fechado são feitas em memória(O(1)) sem bloquear: com a thread viva, a consulta devolve o
+    snapshot atual mesmo que a renovação esteja atrasada. Sem a thread, um snapshot vencido é renovado
+    na própria consulta; `forcar=True` sempre busca um snapshot novo.
+    """
+    TIPOS = ('digital', 'binary', 'turbo')
+
+    def __init__(self, botManager, ttl=60):
         self.botManager = botManager
+        self.ttl = ttl
+        self.snapshot = None
+        self.abertos = {}
+        self.atualizado_em = 0
+        self.duracao_da_busca = 0
+        self.trava = threading.Lock()
+        self.thread = None
+
+    def atualizar(self, se_vencido=False):
+        """
+        Busca os ativos abertos na IQ Option e substitui o snapshot(em caso de erro mantém o anterior).
+        Com `se_vencido`, a busca é descartada se outra thread renovou o snapshot enquanto esta esperava a trava.
+        """
+        with self.trava:
+            if se_vencido and not self.vencido():
+                return self.snapshot
 
-    def excluir_imagem(self,nome_imagem, diretorio='temporary images'):
-        """Exclui a imagem do diretório especificado."""
-        caminho_imagem = os.path.join(diretorio, nome_imagem)
-        
-        # Verifica se o arquivo existe antes de tentar excluir
-        if os.path.isfile(caminho_imagem):
+            inicio = time.perf_counter()
             try:
-                os.remove(caminho_imagem)
-                self.botManager.logging(f"{Fore.GREEN}[TEMPORARY IMAGES]{Fore.RESET}", f"imagem {nome_imagem} excluída")
-            except Exception as e:
-                self.botManager.logging(f"{Fore.RED}[TEMPORARY IMAGES]{Fore.RESET}", f"erro ao excluir a imagem {nome_imagem}. Erro: {e}")
+                snapshot = self.botManager.api_iqoption.get_all_open_time()
+            except Exception as erro:
+                self.botManager.logging(f"{Fore.RED}[ATIVOS ABERTOS]{Fore.RESET}", f"erro ao buscar os ativos abertos com get_all_open_time(): {erro}")
+                return self.snapshot
+            finally:
+                self.duracao_da_busca = time.perf_counter() - inicio
+
+            self.abertos = {tipo: {ativo for ativo, dados in ativos.items() if dados.get('open')} for tipo, ativos in snapshot.items()}
+            self.snapshot = snapshot
+            self.atualizado_em = self.botManager.horario.relogio.time()
+            return snapshot
+
+    def vencido(self):
+        return self.snapshot is None or self.botManager.horario.relogio.time() - self.atualizado_em > self.ttl
+
+    def renovar_se_preciso(self, forcar=False):
+        """Renova o snapshot na própria consulta só quando forçado, quando ainda não há snapshot ou quando
+        não há thread em segundo plano para renová-lo."""
+        if forcar:
+            self.atualizar()
+        elif self.snapshot is None or (self.vencido() and not (self.thread is not None and self.thread.is_alive())):
+            self.atualizar(se_vencido=True)
+
+    def obter(self, forcar=False):
+        """Retorna o snapshot no mesmo formato de get_all_open_time(). Enquanto nenhuma busca tiver dado
+        certo, retorna um snapshot vazio(nenhum ativo aberto) em vez de None."""
+        self.renovar_se_preciso(forcar)
+        if self.snapshot is None:
+            return {tipo: {} for tipo in self.TIPOS}
+        return self.snapshot
+
+    def esta_aberto(self, ativo, tipo='digital', forcar=False):
+        self.renovar_se_preciso(forcar)
+        return ativo in self.abertos.get(tipo, ())
+
+    def iniciar_atualizacao_em_segundo_plano(self):
+        """Inicia a thread que renova o snapshot a cada `ttl` segundos. Cada renovação começa antes do snapshot
+        vencer(descontando a duração da última busca), para que ele nunca fique mais velho que `ttl`."""
+        if self.thread is not None and self.thread.is_alive():
+            return
+
+        def atualizar_periodicamente():
+            while True:
+                self.atualizar()
+                time.sleep(max(self.ttl - self.duracao_da_busca, 0))
+
+        self.thread = threading.Thread(target=atualizar_periodicamente, name='ativos-abertos', daemon=True)
+        self.thread.start()
+
+
+class VelasRecentes:
+    """
+    Buffer das velas recentes de cada ativo usado na verificação dos resultados.
+
+    A vela do resultado e a janela do gráfico vêm de uma única chamada do get_candles(), e os gales
+    seguintes do mesmo sinal(ou outros sinais do mesmo ativo) reaproveitam as velas já buscadas,
+    pedindo à IQ Option só as que faltam. Apenas velas já fechadas são guardadas, em arrays no formato
+    do ArmazenamentoDeVelas ordenados pelo 'from'.
+    """
+    def __init__(self, botManager, limite_por_ativo=120):
+        self.botManager = botManager
+        self.limite_por_ativo = limite_por_ativo
+        self.velas = {}
+        self.trava = threading.Lock()
+        self.buscas = 0
+
+    def obter(self, ativo, timeframe, timestamp, quantidade=15):
+        """
+        Retorna as `quantidade` velas que terminam na vela iniciada em `timestamp`(a última é a vela do
+        resultado), em um array no formato do ArmazenamentoDeVelas. Se todas já estiverem no buffer, o
+        retorno é uma fatia(sem cópia); senão faz uma única busca na IQ Option.
+        """
+        duracao = timeframe * 60
+        timestamp -= timestamp % duracao  # início da vela que contém o timestamp, como no get_candles()
+        primeira = timestamp - duracao * (quantidade - 1)
+
+        with self.trava:
+            buffer = self.velas.get((ativo, timeframe), np.empty(0, dtype=ArmazenamentoDeVelas.DTYPE))
+        janela = buffer[np.searchsorted(buffer['from'], primeira):np.searchsorted(buffer['from'], timestamp, side='right')]
+        if len(janela) == quantidade:
+            return janela
+
+        # uma única busca, da primeira vela que falta até a vela do resultado
+        presentes = set(janela['from'].tolist())
+        faltando = next(inicio for inicio in range(primeira, timestamp + 1, duracao) if inicio not in presentes)
+        with self.botManager.trava_iqoption:
+            novas = ArmazenamentoDeVelas.converter(self.botManager.api_iqoption.get_candles(ativo, duracao, (timestamp - faltando) // duracao + 1, timestamp))
+        self.buscas += 1
+
+        agora = self.botManager.horario.relogio.time()
+        with self.trava:
+            buffer = self.velas.get((ativo, timeframe), buffer)
+            fechadas = novas[novas['from'] + duracao <= agora]
+            self.velas[(ativo, timeframe)] = ArmazenamentoDeVelas.sem_repetidas(np.concatenate([buffer, fechadas]))[-self.limite_por_ativo:]
+
+        velas = ArmazenamentoDeVelas.sem_repetidas(np.concatenate([janela, novas]))
+        return velas[(velas['from'] >= primeira) & (velas['from'] <= timestamp)]
+
+
+class FluxoDeVelas:
+    """
+    Inscrições no stream de velas em tempo real da IQ Option(start_candles_stream/get_realtime_candles)
+    usadas na verificação ao vivo dos resultados.
+
+    Cada ativo com sinal pendente fica inscrito enquanto algum sinal dele estiver sendo acompanhado(contagem
+    de referências); o fechamento da vela do resultado é percebido no próprio stream, assim que a vela
+    seguinte aparece, sem novas chamadas ao get_candles(). `fonte` permite usar outra origem do stream
+    com a mesma interface(por padrão, a conexão botManager.api_iqoption).
+    """
+    def __init__(self, botManager, fonte=None, quantidade=15, intervalo=0.05, tolerancia=5):
+        self.botManager = botManager
+        self.fonte = fonte
+        self.quantidade = quantidade
+        self.intervalo = intervalo
+        self.tolerancia = tolerancia
+        self.inscricoes = {}
+        self.trava = threading.Lock()
+
+    def api(self):
+        return self.fonte if self.fonte is not None else self.botManager.api_iqoption
+
+    def inscrever(self, ativo, timeframe):
+        with self.trava:
+            inscritos = self.inscricoes.get((ativo, timeframe), 0)
+            self.inscricoes[(ativo, timeframe)] = inscritos + 1
+            if inscritos == 0:
+                # o start_candles_stream() também busca as velas iniciais pela mesma conexão. O stream guarda
+                # só as últimas N velas e o fechamento é percebido com a vela seguinte já aberta, então são
+                # pedidas duas a mais para sobrarem `quantidade` velas até a do resultado
+                with self.botManager.trava_iqoption:
+                    self.api().start_candles_stream(ativo, timeframe * 60, self.quantidade + 2)
+
+    def cancelar(self, ativo, timeframe):
+        with self.trava:
+            inscritos = self.inscricoes.get((ativo, timeframe), 0) - 1
+            if inscritos > 0:
+                self.inscricoes[(ativo, timeframe)] = inscritos
+                return
+            if self.inscricoes.pop((ativo, timeframe), None) is not None:
+                with self.botManager.trava_iqoption:
+                    self.api().stop_candles_stream(ativo, timeframe * 60)
+
+    def aguardar_fechamento(self, ativo, timeframe, inicio_da_vela):
+        """
+        Espera a vela iniciada em `inicio_da_vela` fechar no stream.
+
+        Returns:
+            np.ndarray | None: As últimas velas do stream até a vela do resultado(a última), no formato do
+            ArmazenamentoDeVelas; None se o fechamento não aparecer no stream até `tolerancia` segundos
+            depois do fim da vela.
+        """
+        relogio = self.botManager.horario.relogio
+        duracao = timeframe * 60
+        inicio_da_vela -= inicio_da_vela % duracao
+        limite = inicio_da_vela + duracao + self.tolerancia
+        while True:
+            velas = self.api().get_realtime_candles(ativo, duracao).copy()
+            if inicio_da_vela in velas and any(inicio >= inicio_da_vela + duracao for inicio in velas):
+                return ArmazenamentoDeVelas.converter([velas[inicio] for inicio in sorted(velas) if inicio <= inicio_da_vela][-self.quantidade:])
+            if relogio.time() >= limite:
+                return None
+            relogio.sleep(self.intervalo)
+
+
+class AcompanhadorDeSinais:
+    """
+    Agenda de tarefas com horário marcado(heap de timers) usada para acompanhar vários sinais ao mesmo tempo.
+
+    Cada tarefa roda em um pool de workers no seu horário, então o envio de mensagens ou a busca de velas de
+    um sinal não atrasa os outros. Uma tarefa pode agendar as próximas etapas do próprio sinal.
+    """
+    def __init__(self, botManager, maximo_de_workers=8):
+        self.botManager = botManager
+        self.agenda = []
+        self.sequencia = itertools.count()
+        self.condicao = threading.Condition()
+        self.em_execucao = 0
+        self.executor = ThreadPoolExecutor(max_workers=maximo_de_workers, thread_name_prefix='acompanhamento')
+
+    def agendar(self, timestamp, funcao, *args):
+        """Agenda `funcao(*args)` para o timestamp informado(ou para agora, se já passou). O prazo é
+        guardado no relógio monotônico, então não acumula desvio nem sofre com ajustes do relógio."""
+        prazo = self.botManager.horario.prazo_monotonico(timestamp)
+        with self.condicao:
+            heapq.heappush(self.agenda, (prazo, next(self.sequencia), funcao, args))
+            self.condicao.notify()
+
+    def executar_tarefa(self, funcao, args, prazo):
+        atraso = self.botManager.horario.relogio.monotonic() - prazo
+        self.botManager.horario.registrar_atraso(funcao.__name__, atraso)
+        self.botManager.metricas.observar("acompanhamento_atraso_segundos", max(atraso, 0), tarefa=funcao.__name__)
+        if atraso > 0.1:
+            self.botManager.logging(f"{Fore.YELLOW}[ACOMPANHAMENTO]{Fore.RESET}", f"tarefa {funcao.__name__} iniciada com {atraso:.3f} segundos de atraso")
+
+        try:
+            funcao(*args)
+        except Exception as erro:
+            self.botManager.logging(f"{Fore.RED}[ACOMPANHAMENTO]{Fore.RESET}", f"erro ao executar a tarefa {funcao.__name__}: {erro}")
+        finally:
+            with self.condicao:
+                self.em_execucao -= 1
+                self.condicao.notify()
+
+    def executar(self):
+        """Executa a agenda até não restar nenhuma tarefa agendada ou em execução."""
+        relogio = self.botManager.horario.relogio
+        with self.condicao:
+            while self.agenda or self.em_execucao:
+                if not self.agenda:
+                    self.condicao.wait()
+                    continue
+
+                restante = self.agenda[0][0] - relogio.monotonic()
+                if restante > 0:
+                    relogio.aguardar(self.condicao, restante, ocioso=not self.em_execucao)
+                    continue
+
+                prazo, _, funcao, args = heapq.heappop(self.agenda)
+                self.em_execucao += 1
+                self.executor.submit(self.executar_tarefa, funcao, args, prazo)
+
+        self.executor.shutdown(wait=False)
+
+
+class RenderizadorDeVelas:
+    """
+    Renderizador leve dos gráficos de resultado(~15 velas): desenha numa figura Agg criada uma única vez,
+    com os retângulos das velas, os pavios, as barras de volume, o marcador e os títulos já montados. A cada
+    chamada só os dados desses elementos são atualizados, sem DataFrame e sem figura nova.
+
+    Cada instância tem a sua própria figura(sem pyplot), então cada thread pode usar um renderizador próprio.
+    """
+    COR_ALTA = '#00b060'
+    COR_BAIXA = '#fe3032'
+    COR_DOJI = 'gray'
+
+    def __init__(self, quantidade=15, largura=8, altura=6, dpi=100):
+        self.figura = Figure(figsize=(largura, altura), dpi=dpi)
+        FigureCanvasAgg(self.figura)
+
+        self.eixo_precos = self.figura.add_axes([0.05, 0.36, 0.83, 0.50])
+        self.eixo_volume = self.figura.add_axes([0.05, 0.12, 0.83, 0.20], sharex=self.eixo_precos)
+        self.eixo_precos.tick_params(labelbottom=False)
+        self.eixo_precos.yaxis.set_major_formatter(FormatStrFormatter('%.5f'))
+        for eixo in (self.eixo_precos, self.eixo_volume):
+            eixo.grid(True, color='#e6e6e6', linewidth=0.8)
+            eixo.set_axisbelow(True)
+            eixo.yaxis.tick_right()
+
+        self.titulo = self.figura.suptitle('', fontsize=20)
+        self.subtitulo = self.eixo_precos.set_title('', fontsize=15, loc='center')
+        self.pavios = LineCollection([], linewidths=1)
+        self.eixo_precos.add_collection(self.pavios)
+        self.marcador, = self.eixo_precos.plot([], [], linestyle='', markersize=10)
+
+        self.corpos = []
+        self.volumes = []
+        self.criar_velas(quantidade)
+
+    def criar_velas(self, quantidade):
+        """Cria os retângulos(corpo e volume) que faltam para `quantidade` velas."""
+        for i in range(len(self.corpos), quantidade):
+            self.corpos.append(self.eixo_precos.add_patch(Rectangle((i - 0.3, 0), 0.6, 0, linewidth=0.8)))
+            self.volumes.append(self.eixo_volume.add_patch(Rectangle((i - 0.3, 0), 0.6, 0, linewidth=0)))
+
+    def renderizar(self, velas, titulo, subtitulo):
+        """
+        Desenha as velas(array no formato do ArmazenamentoDeVelas) e retorna o PNG em memória.
+
+        Returns:
+            io.BytesIO: Imagem PNG pronta para o send_photo().
+        """
+        quantidade = len(velas)
+        self.criar_velas(quantidade)
+
+        abertura, fechamento, minima, maxima, volume = velas['open'], velas['close'], velas['min'], velas['max'], velas['volume']
+        cores = np.array([self.COR_DOJI, self.COR_ALTA, self.COR_BAIXA])[ArmazenamentoDeVelas.cores(velas)]
+
+        for i, (corpo, barra) in enumerate(zip(self.corpos, self.volumes)):
+            visivel = i < quantidade
+            corpo.set_visible(visivel)
+            barra.set_visible(visivel)
+            if visivel:
+                corpo.set_y(min(abertura[i], fechamento[i]))
+                corpo.set_height(abs(fechamento[i] - abertura[i]))
+                corpo.set_facecolor(cores[i])
+                corpo.set_edgecolor(cores[i])
+                barra.set_height(volume[i])
+                barra.set_facecolor(cores[i])
+
+        posicoes = np.arange(quantidade)
+        self.pavios.set_segments(np.stack([np.column_stack([posicoes, minima]), np.column_stack([posicoes, maxima])], axis=1))
+        self.pavios.set_color(cores)
+
+        # marcador na última vela: ^ abaixo da mínima(alta), v acima da máxima(baixa) ou . acima da máxima(doji)
+        if fechamento[-1] > abertura[-1]:
+            self.marcador.set_data([quantidade - 1], [minima[-1] - 0.00008])
+            self.marcador.set_marker('^')
         else:
-            self.botManager.logging(f"{Fore.RED}[TEMPORARY IMAGES]{Fore.RESET}", f"imagem {nome_imagem} não encontrada no diretório {diretorio}.")
-            
-            
-    
+            self.marcador.set_data([quantidade - 1], [maxima[-1] + 0.00008])
+            self.marcador.set_marker('v' if fechamento[-1] < abertura[-1] else '.')
+        self.marcador.set_color(cores[-1])
+
+        margem = (maxima.max() - minima.min()) * 0.05 or 0.0001
+        self.eixo_precos.set_xlim(-0.8, quantidade - 0.2)
+        self.eixo_precos.set_ylim(min(minima.min(), minima[-1] - 0.00008) - margem, max(maxima.max(), maxima[-1] + 0.00008) + margem)
+        self.eixo_volume.set_ylim(0, (volume.max() or 1) * 1.1)
+
+        # horários no eixo x(a cada 3 velas)
+        deslocamento = int(datetime.fromtimestamp(int(velas['from'][-1])).astimezone().utcoffset().total_seconds())
+        marcas = posicoes[::3]
+        self.eixo_volume.set_xticks(marcas)
+        self.eixo_volume.set_xticklabels([time.strftime('%H:%M:%S', time.gmtime(velas[i]['from'] + deslocamento)) for i in marcas], rotation=45, fontsize=8)
+
+        self.titulo.set_text(titulo)
+        self.subtitulo.set_text(subtitulo)
+
+        imagem = io.BytesIO()
+        self.figura.savefig(imagem, format='png')
+        imagem.seek(0)
+        imagem.name = 'resultado.png'
+        return imagem
+
+
+class CaixaDeSaida:
+    """
+    Fila de envio do Telegram. Quem produz mensagens só enfileira(`enviar`); threads em segundo plano
+    fazem o envio respeitando a ordem de cada chat e os limites do Telegram:
+
+    - por chat: no mínimo `intervalo_por_chat` segundos entre mensagens e até `limite_por_chat`
+      mensagens por `janela_por_chat` segundos(grupos: 20 por minuto);
+    - global: até `limite_global` mensagens por segundo.
+
+    Um erro 429 pausa o chat pelo `retry_after` informado pelo Telegram e a mensagem é reenviada; erros 5xx
+    e de conexão são tentados de novo com backoff até `tentativas` vezes e os outros 4xx falham na hora.
+    """
+    def __init__(self, botManager, workers=2, intervalo_por_chat=1.0, limite_por_chat=20, janela_por_chat=60, limite_global=30, tentativas=5):
+        self.botManager = botManager
+        self.workers = workers
+        self.intervalo_por_chat = intervalo_por_chat
+        self.limite_por_chat = limite_por_chat
+        self.janela_por_chat = janela_por_chat
+        self.limite_global = limite_global
+        self.tentativas = tentativas
+
+        self.condicao = threading.Condition()
+        self.filas = {}
+        self.chats_em_envio = set()
+        self.liberado_em = {}
+        self.envios_por_chat = {}
+        self.envios_globais = deque()
+        self.threads = []
+
+        self.enviadas = 0
+        self.falhas = 0
+        self.latencias = {}
+
+    def enviar(self, metodo, chat_id, *args, **kwargs):
+        """
+        Enfileira uma chamada do TeleBot(ex.: 'send_message', 'send_photo', 'send_sticker').
+
+        Um argumento nomeado pode ser um Future(ex.: o file_id de um upload para outro chat): a mensagem só
+        sai quando ele for resolvido e é enviada com o resultado dele, sem travar os outros chats.
+
+        Returns:
+            Future: Resolvido com o retorno do TeleBot(a mensagem enviada) ou com o erro final.
+        """
+        futuro = Future()
+        with self.condicao:
+            self.filas.setdefault(chat_id, deque()).append({"metodo": metodo, "args": args, "kwargs": kwargs, "futuro": futuro, "tentativa": 0, "enfileirada_em": time.monotonic()})
+            self.condicao.notify()
+        self.iniciar()
+        return futuro
+
+    def profundidade(self):
+        """Quantidade de mensagens aguardando envio(incluindo as que estão sendo enviadas)."""
+        with self.condicao:
+            return sum(len(fila) for fila in self.filas.values())
+
+    def estatisticas(self):
+        """Profundidade da fila, totais e latência de envio(ms) por método."""
+        with self.condicao:
+            latencias = {metodo: {"envios": len(valores), "media_ms": 1000 * sum(valores) / len(valores), "maxima_ms": 1000 * max(valores)} for metodo, valores in self.latencias.items() if valores}
+            return {"fila": sum(len(fila) for fila in self.filas.values()), "enviadas": self.enviadas, "falhas": self.falhas, "latencia": latencias}
+
+    def iniciar(self):
+        with self.condicao:
+            if self.threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self.executar, name=f'caixa-de-saida-{i}', daemon=True)
+                self.threads.append(thread)
+                thread.start()
+
+    def liberado(self, chat_id, agora):
+        """Retorna o instante(monotônico) a partir do qual o chat pode receber a próxima mensagem."""
+        liberado_em = self.liberado_em.get(chat_id, 0)
+        envios = self.envios_por_chat.get(chat_id)
+        if envios:
+            while envios and envios[0] <= agora - self.janela_por_chat:
+                envios.popleft()
+            if envios:
+                liberado_em = max(liberado_em, envios[-1] + self.intervalo_por_chat)
+            if len(envios) >= self.limite_por_chat:
+                liberado_em = max(liberado_em, envios[0] + self.janela_por_chat)
+
+        while self.envios_globais and self.envios_globais[0] <= agora - 1:
+            self.envios_globais.popleft()
+        if len(self.envios_globais) >= self.limite_global:
+            liberado_em = max(liberado_em, self.envios_globais[0] + 1)
+        return liberado_em
+
+    def proxima_mensagem(self):
+        """Aguarda e retorna (chat_id, mensagem) do próximo envio permitido, reservando o chat."""
+        with self.condicao:
+            while True:
+                agora = time.monotonic()
+                proximo = None
+                for chat_id, fila in self.filas.items():
+                    if not fila or chat_id in self.chats_em_envio:
+                        continue
+                    if any(isinstance(valor, Future) and not valor.done() for valor in fila[0]["kwargs"].values()):
+                        continue
+                    liberado_em = self.liberado(chat_id, agora)
+                    if liberado_em <= agora:
+                        self.chats_em_envio.add(chat_id)
+                        self.envios_por_chat.setdefault(chat_id, deque()).append(agora)
+                        self.envios_globais.append(agora)
+                        return chat_id, fila[0]
+                    proximo = liberado_em if proximo is None else min(proximo, liberado_em)
+
+                self.condicao.wait(timeout=None if proximo is None else proximo - agora)
+
+    @staticmethod
+    def erro_temporario(erro):
+        """429, erros 5xx e falhas de conexão/timeout valem uma nova tentativa; os outros erros(4xx como arquivo
+        inválido, HTML mal formado ou bot removido do grupo) não mudam reenviando."""
+        codigo = getattr(erro, 'error_code', None) or getattr(getattr(erro, 'result', None), 'status_code', None)
+        if codigo is None:
+            # requests.ConnectionError/Timeout(usados pelo TeleBot) são OSError
+            return isinstance(erro, OSError)
+        return codigo == 429 or codigo >= 500
+
+    def executar(self):
+        while True:
+            chat_id, mensagem = self.proxima_mensagem()
+
+            inicio = time.monotonic()
+            resposta, erro, permanente = None, None, False
+            try:
+                kwargs = {nome: valor.result() if isinstance(valor, Future) else valor for nome, valor in mensagem["kwargs"].items()}
+            except Exception as excecao:
+                # o Future de um argumento falhou: reenviar não resolve
+                erro, permanente = excecao, True
+            else:
+                try:
+                    # arquivos em memória precisam voltar ao início a cada tentativa
+                    for valor in list(mensagem["args"]) + list(kwargs.values()):
+                        if hasattr(valor, 'seek'):
+                            valor.seek(0)
+                    resposta = getattr(self.botManager.api_telegram, mensagem["metodo"])(chat_id, *mensagem["args"], **kwargs)
+                except Exception as excecao:
+                    erro = excecao
+            latencia = time.monotonic() - inicio
+
+            with self.condicao:
+                self.chats_em_envio.discard(chat_id)
+                fila = self.filas[chat_id]
+                try:
+                    self.concluir_envio(chat_id, fila, mensagem, resposta, erro, permanente, latencia)
+                except Exception as excecao:
+                    # a mensagem sempre sai da fila com um resultado, senão o chat fica travado
+                    if fila and fila[0] is mensagem:
+                        fila.popleft()
+                    if not mensagem["futuro"].done():
+                        mensagem["futuro"].set_exception(excecao)
+                finally:
+                    self.condicao.notify_all()
+
+    def concluir_envio(self, chat_id, fila, mensagem, resposta, erro, permanente, latencia):
+        """Resolve a mensagem(ou agenda a nova tentativa) e registra as métricas. Chamar com a `condicao`."""
+        if erro is None:
+            fila.popleft()
+            self.enviadas += 1
+            self.latencias.setdefault(mensagem["metodo"], deque(maxlen=1000)).append(latencia)
+            mensagem["futuro"].set_result(resposta)
+        else:
+            mensagem["tentativa"] += 1
+            retry_after = getattr(erro, 'result_json', None) and erro.result_json.get('parameters', {}).get('retry_after')
+            if getattr(erro, 'error_code', None) == 429 and retry_after:
+                self.liberado_em[chat_id] = time.monotonic() + retry_after
+                self.botManager.logging(f"{Fore.YELLOW}[TELEGRAM]{Fore.RESET}", f"limite de envio atingido no chat {chat_id}, aguardando {retry_after} segundos")
+            elif not permanente and self.erro_temporario(erro) and mensagem["tentativa"] < self.tentativas:
+                self.liberado_em[chat_id] = time.monotonic() + 2 ** mensagem["tentativa"]
+                self.botManager.logging(f"{Fore.YELLOW}[TELEGRAM]{Fore.RESET}", f"erro ao enviar {mensagem['metodo']}({mensagem['tentativa']}° tentativa), tentando novamente: {erro}")
+            else:
+                fila.popleft()
+                self.falhas += 1
+                mensagem["futuro"].set_exception(erro)
+                self.botManager.logging(f"{Fore.RED}[TELEGRAM]{Fore.RESET}", f"mensagem {mensagem['metodo']} descartada após {mensagem['tentativa']} tentativas: {erro}")
+
+        self.botManager.metricas.observar("telegram_latencia_segundos", latencia, metodo=mensagem["metodo"])
+        self.botManager.metricas.incrementar("telegram_envios_total", metodo=mensagem["metodo"], status="ok" if erro is None else str(getattr(erro, 'error_code', None) or "erro"))
+
+
+class CacheDeMidia:
+    """
+    Cache persistente dos file_id do Telegram, indexado pelo hash(sha256) do conteúdo do arquivo.
+
+    Cada arquivo(stickers, imagens reutilizadas) é enviado por upload uma única vez; depois disso o envio é
+    feito pelo file_id. Se um envio por file_id falhar(ex.: token do bot trocado), o file_id é descartado
+    e o próximo envio volta a fazer upload. Envios do mesmo arquivo feitos durante um upload(ex.: o mesmo
+    sticker para vários grupos) esperam o upload terminar e usam o file_id dele, em vez de fazer outro.
+    """
+    def __init__(self, caminho='media_cache.json'):
+        self.caminho = caminho
+        self.trava = threading.Lock()
+        self.hashes = {}
+        # hash -> Future resolvido quando o upload em andamento do arquivo termina(com ou sem file_id)
+        self.uploads_em_andamento = {}
+        try:
+            with open(caminho, 'r', encoding='utf-8') as arquivo:
+                self.file_ids = json.load(arquivo)
+        except (OSError, ValueError):
+            self.file_ids = {}
+
+    def hash_do_arquivo(self, caminho_arquivo):
+        """sha256 do arquivo, recalculado só quando o tamanho ou a data de modificação mudam."""
+        informacoes = os.stat(caminho_arquivo)
+        chave = (informacoes.st_size, informacoes.st_mtime_ns)
+        em_cache = self.hashes.get(caminho_arquivo)
+        if em_cache is None or em_cache[0] != chave:
+            with open(caminho_arquivo, 'rb') as arquivo:
+                em_cache = (chave, hashlib.sha256(arquivo.read()).hexdigest())
+            self.hashes[caminho_arquivo] = em_cache
+        return em_cache[1]
+
+    def gravar(self):
+        with open(self.caminho + '.tmp', 'w', encoding='utf-8') as arquivo:
+            json.dump(self.file_ids, arquivo)
+        os.replace(self.caminho + '.tmp', self.caminho)
+
+    def salvar(self, hash_do_arquivo, file_id):
+        with self.trava:
+            self.file_ids[hash_do_arquivo] = file_id
+            self.gravar()
+
+    def remover(self, hash_do_arquivo, file_id=None):
+        """Descarta o file_id do arquivo; com `file_id`, só se ele ainda for o guardado(outro envio pode já ter
+        feito um upload novo)."""
+        with self.trava:
+            if file_id is not None and self.file_ids.get(hash_do_arquivo) != file_id:
+                return
+            if self.file_ids.pop(hash_do_arquivo, None) is not None:
+                self.gravar()
+
+    def concluir_upload(self, hash_do_arquivo):
+        """Libera os envios que esperavam o upload do arquivo."""
+        with self.trava:
+            upload = self.uploads_em_andamento.pop(hash_do_arquivo, None)
+        if upload is not None:
+            upload.set_result(None)
+
+    @staticmethod
+    def encadear(origem, destino):
+        """Resolve o Future `destino` com o resultado(ou o erro) de `origem` quando ela terminar."""
+        origem.add_done_callback(lambda f: destino.set_exception(f.exception()) if f.exception() is not None else destino.set_result(f.result()))
+
+    @staticmethod
+    def file_id_da_resposta(resposta):
+        """Extrai o file_id da mensagem retornada pelo Telegram(sticker, foto ou documento)."""
+        if getattr(resposta, 'sticker', None):
+            return resposta.sticker.file_id
+        if getattr(resposta, 'photo', None):
+            return resposta.photo[-1].file_id
+        if getattr(resposta, 'document', None):
+            return resposta.document.file_id
+        return None
+
+    def enviar_arquivo(self, caixa_de_saida, metodo, chat_id, caminho_arquivo, campo, **kwargs):
+        """
+        Envia um arquivo do disco pela caixa de saída, usando o file_id quando já conhecido. Se o envio pelo
+        file_id falhar(ex.: 400 de um file_id que o Telegram não aceita mais, que a caixa de saída não tenta
+        de novo), o file_id é descartado e o arquivo é enviado por upload na mesma hora. Se já houver um
+        upload do arquivo em andamento, o envio espera por ele e é refeito com o file_id obtido.
+
+        Args:
+            metodo (str): Método do TeleBot(ex.: 'send_sticker').
+            campo (str): Nome do parâmetro do arquivo no método(ex.: 'sticker').
+
+        Returns:
+            Future: Resolvido como o de CaixaDeSaida.enviar(), com o resultado do upload quando houver um.
+        """
+        hash_do_arquivo = self.hash_do_arquivo(caminho_arquivo)
+        with self.trava:
+            file_id = self.file_ids.get(hash_do_arquivo)
+            upload = self.uploads_em_andamento.get(hash_do_arquivo) if file_id is None else None
+            fazer_upload = file_id is None and upload is None
+            if fazer_upload:
+                self.uploads_em_andamento[hash_do_arquivo] = Future()
+
+        if fazer_upload:
+            return self.enviar_upload(caixa_de_saida, metodo, chat_id, caminho_arquivo, hash_do_arquivo, campo, **kwargs)
+
+        resultado = Future()
+        def reenviar(_):
+            try:
+                self.encadear(self.enviar_arquivo(caixa_de_saida, metodo, chat_id, caminho_arquivo, campo, **kwargs), resultado)
+            except Exception as erro:
+                resultado.set_exception(erro)
+
+        if file_id is None:
+            upload.add_done_callback(reenviar)
+            return resultado
+
+        def reenviar_por_upload(f):
+            if f.exception() is None:
+                resultado.set_result(f.result())
+                return
+            self.remover(hash_do_arquivo, file_id)
+            reenviar(f)
+
+        caixa_de_saida.enviar(metodo, chat_id, **{campo: file_id}, **kwargs).add_done_callback(reenviar_por_upload)
+        return resultado
+
+    def enviar_upload(self, caixa_de_saida, metodo, chat_id, caminho_arquivo, hash_do_arquivo, campo, **kwargs):
+        """Envia o arquivo por upload, guarda o file_id da resposta e libera os envios que esperavam o upload."""
+        def guardar_file_id(f):
+            try:
+                if f.exception() is None and self.file_id_da_resposta(f.result()):
+                    self.salvar(hash_do_arquivo, self.file_id_da_resposta(f.result()))
+            finally:
+                self.concluir_upload(hash_do_arquivo)
+
+        try:
+            with open(caminho_arquivo, 'rb') as arquivo:
+                conteudo = io.BytesIO(arquivo.read())
+            conteudo.name = os.path.basename(caminho_arquivo)
+            futuro = caixa_de_saida.enviar(metodo, chat_id, **{campo: conteudo}, **kwargs)
+        except Exception:
+            self.concluir_upload(hash_do_arquivo)
+            raise
+        futuro.add_done_callback(guardar_file_id)
+        return futuro
+
+
+class ArmazenamentoDeVelas:
+    """
+    Histórico de velas em disco, um arquivo binário por (ativo, timeframe) com registros de tamanho fixo
+    (from/open/close/min/max/volume, 48 bytes). Novas velas são sempre anexadas no fim do arquivo; a
+    compactação reescreve o arquivo ordenado, sem duplicadas e só com os últimos `dias_de_retencao` dias.
+    """
+    DTYPE = np.dtype([('from', '<i8'), ('open', '<f8'), ('close', '<f8'), ('min', '<f8'), ('max', '<f8'), ('volume', '<f8')])
+
+    @classmethod
+    def converter(cls, velas):
+        """
+        Converte as velas da IQ Option(lista de dicionários do get_candles() ou do stream) no array de
+        registros usado em todo o bot(48 bytes por vela); um array nesse formato é devolvido como está.
+        """
+        if isinstance(velas, np.ndarray):
+            return velas
+        return np.fromiter(((vela['from'], vela['open'], vela['close'], vela['min'], vela['max'], vela['volume']) for vela in velas), dtype=cls.DTYPE, count=len(velas))
+
+    @staticmethod
+    def sem_repetidas(velas):
+        """Ordena pelo 'from' e remove as velas repetidas, mantendo a última ocorrência de cada uma."""
+        # np.unique fica com a primeira ocorrência, então inverter para manter a vela recebida por último
+        velas = velas[::-1]
+        _, indices = np.unique(velas['from'], return_index=True)
+        return velas[indices]
+
+    @staticmethod
+    def cores(velas):
+        """Cor de cada vela: 1 verde, -1 vermelha e 0 doji."""
+        return np.sign(velas['close'] - velas['open']).astype(np.int8)
+
+    @staticmethod
+    def reamostrar(velas, timeframe):
+        """
+        Agrupa velas M1(ordenadas, sem repetidas) em velas de `timeframe` minutos alinhadas como as da IQ
+        Option('from' múltiplo de timeframe*60): abertura da primeira, fechamento da última, mínima e máxima
+        do grupo e soma dos volumes. Com a vela M1 em andamento no fim, a última vela também fica em andamento.
+        """
+        if timeframe == 1 or not len(velas):
+            return velas
+        grupo = velas['from'] // (timeframe * 60)
+        inicios = np.flatnonzero(np.diff(grupo, prepend=grupo[0] - 1))
+        fins = np.append(inicios[1:], len(velas)) - 1
+
+        reamostradas = np.empty(len(inicios), dtype=velas.dtype)
+        reamostradas['from'] = grupo[inicios] * (timeframe * 60)
+        reamostradas['open'] = velas['open'][inicios]
+        reamostradas['close'] = velas['close'][fins]
+        reamostradas['min'] = np.minimum.reduceat(velas['min'], inicios)
+        reamostradas['max'] = np.maximum.reduceat(velas['max'], inicios)
+        reamostradas['volume'] = np.add.reduceat(velas['volume'], inicios)
+        return reamostradas
+
+    def __init__(self, diretorio='candles', dias_de_retencao=12):
+        self.diretorio = diretorio
+        self.dias_de_retencao = dias_de_retencao
+
+    def caminho(self, par, timeframe):
+        return os.path.join(self.diretorio, f"{par}-M{timeframe}.bin")
+
+    def ler(self, par, timeframe):
+        """Lê todas as velas gravadas do ativo(um registro incompleto no fim do arquivo é ignorado)."""
+        caminho = self.caminho(par, timeframe)
+        if not os.path.isfile(caminho):
+            return np.empty(0, dtype=self.DTYPE)
+        quantidade = os.path.getsize(caminho) // self.DTYPE.itemsize
+        return np.fromfile(caminho, dtype=self.DTYPE, count=quantidade)
+
+    def ultima_vela(self, par, timeframe):
+        """Retorna o 'from' da última vela gravada do ativo(ou None), lendo só o último registro."""
+        caminho = self.caminho(par, timeframe)
+        if not os.path.isfile(caminho):
+            return None
+        quantidade = os.path.getsize(caminho) // self.DTYPE.itemsize
+        if not quantidade:
+            return None
+        ultima = np.fromfile(caminho, dtype=self.DTYPE, count=1, offset=(quantidade - 1) * self.DTYPE.itemsize)
+        return int(ultima['from'][0])
+
+    def anexar(self, par, timeframe, velas):
+        """Anexa as velas no fim do arquivo. As velas devem ser mais novas que a última gravada."""
+        if not len(velas):
+            return
+        os.makedirs(self.diretorio, exist_ok=True)
+        with open(self.caminho(par, timeframe), 'ab') as arquivo:
+            arquivo.write(np.ascontiguousarray(velas, dtype=self.DTYPE).tobytes())
+
+    def gravar(self, par, timeframe, velas):
+        """Substitui o arquivo do ativo de forma atômica(arquivo temporário + os.replace)."""
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho = self.caminho(par, timeframe)
+        with open(caminho + '.tmp', 'wb') as arquivo:
+            arquivo.write(np.ascontiguousarray(velas, dtype=self.DTYPE).tobytes())
+        os.replace(caminho + '.tmp', caminho)
+
+    def compactar(self, par, timeframe, deslocamento=0):
+        """Ordena, remove velas duplicadas e descarta os dias fora da retenção."""
+        velas = self.ler(par, timeframe)
+        if not len(velas):
+            return
+        velas = self.sem_repetidas(velas)
+
+        dia = (velas['from'] + deslocamento) // 86400
+        velas = velas[dia > dia[-1] - self.dias_de_retencao]
+        self.gravar(par, timeframe, velas)
+
+    def compactar_se_necessario(self, par, timeframe, deslocamento=0, agora=None):
+        """Compacta o arquivo quando a vela mais antiga passa de um dia além da retenção."""
+        caminho = self.caminho(par, timeframe)
+        if not os.path.isfile(caminho) or os.path.getsize(caminho) < self.DTYPE.itemsize:
+            return
+        primeira = np.fromfile(caminho, dtype=self.DTYPE, count=1)[0]
+        dia_da_primeira = (int(primeira['from']) + deslocamento) // 86400
+        hoje = (int(time.time() if agora is None else agora) + deslocamento) // 86400
+        if dia_da_primeira <= hoje - self.dias_de_retencao - 1:
+            self.compactar(par, timeframe, deslocamento)
+
+
+class EstadoDaCatalogacao:
+    """
+    Estado incremental da catalogação de um ativo/timeframe: contagens verde/vermelha/doji das velas já
+    fechadas por dia e por minuto do dia, mais a soma dessas contagens na janela dos últimos dias.
+
+    A cada ciclo `adicionar` recebe só as velas que fecharam desde o ciclo anterior e `atualizar_janela`
+    soma os dias que entraram e subtrai os que saíram da janela, devolvendo os minutos alterados para que
+    apenas esses horários sejam recalculados.
+    """
+    # cada minuto do dia tem no máximo uma vela por dia, então as contagens diárias cabem em int16(17 KB por
+    # dia em vez de 34 KB); a soma da janela fica em int32
+    DTYPE_DAS_CONTAGENS = np.int16
+
+    def __init__(self, timeframe, deslocamento, dias_carregados):
+        self.timeframe = timeframe
+        self.deslocamento = deslocamento
+        self.dias_carregados = dias_carregados
+
+        self.contagens_por_dia = {}
+        self.ultima_vela = None
+        self.incrementos = []
+
+        self.dias_da_janela = set()
+        self.soma = np.zeros((1440, 3), dtype=np.int32)
+        self.parametros = None
+        self.minuto_da_vela_aberta = None
+        self.analise = {}
+
+    def dia_e_minuto(self, inicio):
+        return (inicio + self.deslocamento) // 86400, ((inicio + self.deslocamento) % 86400) // 60
+
+    def coluna_da_cor(self, velas):
+        """0 para verde, 1 para vermelha e 2 para doji(mesma ordem das colunas de `soma`)."""
+        cor = np.sign(velas['close'] - velas['open'])
+        return np.where(cor > 0, 0, np.where(cor < 0, 1, 2))
+
+    def adicionar(self, velas):
+        """Adiciona velas fechadas(mais novas que `ultima_vela`) às contagens por dia."""
+        if not len(velas):
+            return
+        dia, minuto = self.dia_e_minuto(velas['from'])
+        coluna = self.coluna_da_cor(velas)
+        for d in np.unique(dia).tolist():
+            do_dia = dia == d
+            contagens = self.contagens_por_dia.setdefault(d, np.zeros((1440, 3), dtype=self.DTYPE_DAS_CONTAGENS))
+            np.add.at(contagens, (minuto[do_dia], coluna[do_dia]), 1)
+            self.incrementos.append((d, minuto[do_dia], coluna[do_dia]))
+        self.ultima_vela = int(velas['from'].max())
+
+    def atualizar_janela(self, dias, dia_da_vela_aberta=None):
+        """
+        Move a janela para os `dias` dias mais recentes(contando o dia da vela em andamento, igual à
+        catalogação completa) e atualiza `soma`.
+
+        Returns:
+            set: Minutos do dia cujas contagens mudaram.
+        """
+        alterados = set()
+
+        # incrementos de dias que já estavam na janela
+        for dia, minuto, coluna in self.incrementos:
+            if dia in self.dias_da_janela:
+                np.add.at(self.soma, (minuto, coluna), 1)
+                alterados.update(minuto.tolist())
+        self.incrementos = []
+
+        dias_disponiveis = set(self.contagens_por_dia)
+        if dia_da_vela_aberta is not None:
+            dias_disponiveis.add(dia_da_vela_aberta)
+        nova_janela = set(sorted(dias_disponiveis, reverse=True)[:dias])
+
+        vazio = np.zeros((1440, 3), dtype=self.DTYPE_DAS_CONTAGENS)
+        for dia in self.dias_da_janela - nova_janela:
+            contagens = self.contagens_por_dia.get(dia, vazio)
+            self.soma -= contagens
+            alterados.update(np.nonzero(contagens.any(axis=1))[0].tolist())
+        for dia in nova_janela - self.dias_da_janela:
+            contagens = self.contagens_por_dia.get(dia, vazio)
+            self.soma += contagens
+            alterados.update(np.nonzero(contagens.any(axis=1))[0].tolist())
+        self.dias_da_janela = nova_janela
+
+        # descartar os dias que não cabem mais no histórico carregado
+        for dia in sorted(self.contagens_por_dia, reverse=True)[self.dias_carregados + 1:]:
+            if dia not in self.dias_da_janela:
+                del self.contagens_por_dia[dia]
+
+        return alterados
+
+    def somas_acumuladas(self, minutos, dia_da_vela_aberta=None, contagem_da_vela_aberta=None):
+        """
+        Somas de prefixo das contagens de `minutos`, do dia mais recente para o mais antigo: o item k são as
+        contagens verde/vermelha/doji da janela dos k+1 dias mais recentes(a mesma de `atualizar_janela`,
+        com a vela em andamento), então todas as janelas de 1 a `dias_carregados` dias saem de uma vez.
+
+        Returns:
+            np.ndarray: Formato (dias disponíveis, *minutos.shape, 3).
+        """
+        dias = set(self.contagens_por_dia)
+        if dia_da_vela_aberta is not None:
+            dias.add(dia_da_vela_aberta)
+        if not dias:
+            return np.zeros((0,) + np.shape(minutos) + (3,), dtype=np.int64)
+
+        vazio = np.zeros((1440, 3), dtype=self.DTYPE_DAS_CONTAGENS)
+        por_dia = np.stack([self.contagens_por_dia.get(dia, vazio)[minutos] for dia in sorted(dias, reverse=True)[:self.dias_carregados]])
+        if contagem_da_vela_aberta is not None:
+            # a vela em andamento é sempre do dia mais recente
+            minuto, coluna = contagem_da_vela_aberta
+            por_dia[0][minutos == minuto, coluna] += 1
+        return np.cumsum(por_dia, axis=0)
+
+
+class CatalogoPorMinuto:
+    """
+    Catalogação de todos os ativos indexada por ativo e minuto do dia(0 a 1439): '%', direção e '%' de
+    cada martingale em arrays (ativos, 1440), com -1 no '%' dos martingales 'N/A'. O filtro de uma hora
+    em todos os ativos é uma única operação sobre a fatia [:, hora*60:(hora+1)*60]; os dicionários de
+    cada horário ficam em `dados` e só são consultados para os sinais escolhidos.
+    """
+    def __init__(self, ativos, gales=0):
+        self.ativos = list(ativos)
+        self.gales = gales
+        self.catalogado = np.zeros((len(self.ativos), 1440), dtype=bool)
+        self.porcentagem = np.zeros((len(self.ativos), 1440), dtype=np.int16)
+        self.direcao = np.zeros((len(self.ativos), 1440), dtype=np.int8) # 1 para CALL, -1 para PUT e 0 sem direção
+        self.porcentagem_dos_martingales = np.full((gales, len(self.ativos), 1440), -1, dtype=np.int16)
+        self.dados = np.empty((len(self.ativos), 1440), dtype=object)
+
+    @classmethod
+    def de_analises(cls, catalogacao, gales=None):
+        """
+        Monta o catálogo a partir do resultado de `cataloga` de cada ativo({par: {'HH:MM': dados}}). Sem
+        `gales`, a quantidade de martingales vem das chaves 'mg1' ... 'mgN' dos dados.
+        """
+        if gales is None:
+            primeiro = next((dados for horarios in catalogacao.values() for dados in horarios.values()), {})
+            gales = 0
+            while f'mg{gales + 1}' in primeiro:
+                gales += 1
+
+        catalogo = cls(catalogacao, gales)
+        for i, horarios in enumerate(catalogacao.values()):
+            if not horarios:
+                continue
+            minutos = np.fromiter(map(Catalogador.MINUTO_DO_HORARIO.__getitem__, horarios), dtype=np.int64, count=len(horarios))
+            dados = list(horarios.values())
+            catalogo.catalogado[i, minutos] = True
+            catalogo.porcentagem[i, minutos] = [d['%'] for d in dados]
+            catalogo.direcao[i, minutos] = [1 if d['dir'] == 'CALL' else -1 if d['dir'] == 'PUT ' else 0 for d in dados]
+            for k in range(gales):
+                porcentagens = (d.get(f'mg{k + 1}', {}).get('%') for d in dados)
+                catalogo.porcentagem_dos_martingales[k, i, minutos] = [p if isinstance(p, int) else -1 for p in porcentagens]
+            catalogo.dados[i, minutos] = dados
+        return catalogo
+
+    def hora(self, hora):
+        """Fatias(views, sem cópia) dos minutos de `hora`: (catalogado, porcentagem, porcentagem_dos_martingales)."""
+        fatia = slice(hora * 60, hora * 60 + 60)
+        return self.catalogado[:, fatia], self.porcentagem[:, fatia], self.porcentagem_dos_martingales[:, :, fatia]
+
+    def filtrar(self, hora, primeiro_minuto, limites):
+        """
+        Horários de `hora` a partir do minuto do dia `primeiro_minuto` com '%' >= limites[0] e o '%' do
+        mgK >= limites[K].
+
+        Returns:
+            tuple: (índices dos ativos, minutos do dia), ordenados pelo horário e, no mesmo horário, pela
+            ordem dos ativos.
+        """
+        catalogado, porcentagem, martingales = self.hora(hora)
+        selecionado = catalogado & (porcentagem >= limites[0])
+        for k, limite in enumerate(limites[1:]):
+            if k >= self.gales:
+                selecionado[:] = False
+                break
+            selecionado &= martingales[k] >= limite
+        selecionado[:, :max(primeiro_minuto - hora * 60, 0)] = False
+
+        # transposta: percorre minuto a minuto e, dentro do minuto, na ordem dos ativos
+        minutos, ativos = np.nonzero(selecionado.T)
+        return ativos, minutos + hora * 60
+
+    def sinais(self, ativos, minutos):
+        """Sinais no formato da lista de operações: [{ativo: {'HH:MM': dados}}, ...]."""
+        # cópia de cada horário: o acompanhamento grava o "resultado" nos sinais e os dicionários da catalogação
+        # incremental continuam guardados no EstadoDaCatalogacao
+        return [{self.ativos[a]: {Catalogador.HORARIOS[m]: dict(self.dados[a, m])}} for a, m in zip(np.asarray(ativos).tolist(), np.asarray(minutos).tolist())]
+
+
+class PontoDeRestauracao:
+    """
+    Checkpoints em disco para o bot voltar em poucos segundos depois de uma queda(exceção, deploy):
+
+    - `acompanhamento.json`: a lista publicada, os "resultado" já enviados e a próxima etapa pendente de cada
+      sinal(avisar_operacao/realizar_operacao/verificar_resultado, gale e prazo), regravado a cada etapa;
+    - `catalogacao.npz`: as contagens por dia de cada EstadoDaCatalogacao, regravadas a cada catalogação,
+      para o primeiro ciclo depois da queda buscar só as velas novas.
+
+    Os arquivos são gravados em um temporário(com fsync) e trocados com os.replace, então uma queda no meio
+    da gravação deixa o checkpoint anterior intacto. Uma etapa interrompida no meio é executada de novo na
+    retomada. Sem `diretorio` os checkpoints ficam desligados.
+    """
+    def __init__(self, botManager, diretorio='checkpoint', validade=3600):
+        self.botManager = botManager
+        self.diretorio = diretorio
+        # checkpoints do acompanhamento mais velhos que isso(em segundos) são ignorados
+        self.validade = validade
+        self.trava = threading.Lock()
+
+        self.catalogacao = None
+        self.timeframe = 1
+        self.etapas = {}
+        self.resultados = {}
+
+    def caminho(self, nome):
+        return os.path.join(self.diretorio, nome)
+
+    def gravar_arquivo(self, nome, escrever, modo='w'):
+        """Grava o arquivo `nome` de forma atômica; `escrever(arquivo)` escreve o conteúdo."""
+        os.makedirs(self.diretorio, exist_ok=True)
+        temporario = self.caminho(nome + '.tmp')
+        with open(temporario, modo, **({'encoding': 'utf-8'} if 'b' not in modo else {})) as arquivo:
+            escrever(arquivo)
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        os.replace(temporario, self.caminho(nome))
+
+    def gravar(self):
+        """Grava o acompanhamento atual(chamar com a `trava`)."""
+        if not self.diretorio:
+            return
+        conteudo = {
+            "gravado_em": self.botManager.horario.relogio.time(),
+            "timeframe": self.timeframe,
+            "catalogacao": self.catalogacao,
+            "etapas": list(self.etapas.values()),
+            "resultados": [{"ativo": ativo, "horario": horario, "resultado": resultado} for (ativo, horario), resultado in self.resultados.items()]
+        }
+        self.gravar_arquivo('acompanhamento.json', lambda arquivo: json.dump(conteudo, arquivo))
+
+    def gravar_com_trava(self):
+        with self.trava:
+            self.gravar()
+
+    def iniciar(self, catalogacao, timeframe=1):
+        """Guarda a lista publicada; as etapas de cada sinal são registradas por `agendar`."""
+        with self.trava:
+            self.catalogacao = json.loads(json.dumps(catalogacao))
+            self.timeframe = timeframe
+            self.etapas, self.resultados = {}, {}
+            self.gravar()
+
+    def agendar(self, operacao, etapa, prazo, inicio, gale=0, gravar=True):
+        """Registra a próxima etapa do sinal(substituindo a anterior)."""
+        with self.trava:
+            self.etapas[(operacao["ativo"], operacao["horario"])] = {"ativo": operacao["ativo"], "horario": operacao["horario"], "etapa": etapa, "prazo": prazo, "inicio": inicio, "gale": gale}
+            if gravar:
+                self.gravar()
+
+    def concluir(self, operacao, resultado=None):
+        """Remove o sinal das etapas pendentes, guardando o `resultado`(se houver)."""
+        with self.trava:
+            self.etapas.pop((operacao["ativo"], operacao["horario"]), None)
+            if resultado is not None:
+                self.resultados[(operacao["ativo"], operacao["horario"])] = dict(resultado)
+            self.gravar()
+
+    def encerrar(self):
+        """Lista finalizada e resultado enviado: não há mais nada para retomar."""
+        with self.trava:
+            self.catalogacao = None
+            self.etapas, self.resultados = {}, {}
+            self.gravar()
+
+    def carregar(self):
+        """
+        Lê o checkpoint do acompanhamento.
+
+        Returns:
+            dict | None: {"catalogacao": ..., "timeframe": int, "etapas": [...]}, com os resultados já
+            aplicados na lista; None se não houver lista em andamento ou se o checkpoint tiver expirado.
+        """
+        if not self.diretorio:
+            return None
+        try:
+            with open(self.caminho('acompanhamento.json'), 'r', encoding='utf-8') as arquivo:
+                conteudo = json.load(arquivo)
+        except (OSError, ValueError):
+            return None
+
+        if conteudo.get("catalogacao") is None or self.botManager.horario.relogio.time() - conteudo["gravado_em"] > self.validade:
+            return None
+
+        catalogacao = conteudo["catalogacao"]
+        for item in conteudo["resultados"]:
+            for signal in catalogacao["lista"]:
+                if item["horario"] in signal.get(item["ativo"], {}):
+                    signal[item["ativo"]][item["horario"]]["resultado"] = item["resultado"]
+
+        with self.trava:
+            self.catalogacao = json.loads(json.dumps(catalogacao))
+            self.timeframe = conteudo["timeframe"]
+            self.etapas = {(etapa["ativo"], etapa["horario"]): etapa for etapa in conteudo["etapas"]}
+            self.resultados = {(item["ativo"], item["horario"]): item["resultado"] for item in conteudo["resultados"]}
+        return {"catalogacao": catalogacao, "timeframe": conteudo["timeframe"], "etapas": conteudo["etapas"]}
+
+    def gravar_estados(self, estados):
+        """Grava as contagens por dia de cada EstadoDaCatalogacao({(par, timeframe): estado})."""
+        if not self.diretorio:
+            return
+        indice, arrays = [], {}
+        for (par, timeframe), estado in estados.items():
+            if estado.ultima_vela is None:
+                continue
+            dias = sorted(estado.contagens_por_dia)
+            indice.append({"par": par, "timeframe": timeframe, "deslocamento": estado.deslocamento, "dias_carregados": estado.dias_carregados, "ultima_vela": estado.ultima_vela})
+            arrays[f"dias_{len(indice) - 1}"] = np.array(dias, dtype=np.int64)
+            arrays[f"contagens_{len(indice) - 1}"] = np.stack([estado.contagens_por_dia[dia] for dia in dias]) if dias else np.zeros((0, 1440, 3), dtype=EstadoDaCatalogacao.DTYPE_DAS_CONTAGENS)
+        self.gravar_arquivo('catalogacao.npz', lambda arquivo: np.savez(arquivo, indice=np.array(json.dumps(indice)), **arrays), modo='wb')
+
+    def carregar_estados(self):
+        """
+        Lê os estados gravados por `gravar_estados`. Só as contagens são restauradas: a janela e a análise de
+        cada estado são recalculadas por inteiro no próximo `cataloga_incremental`.
+
+        Returns:
+            dict: {(par, timeframe): EstadoDaCatalogacao}; vazio se não houver checkpoint.
+        """
+        if not self.diretorio:
+            return {}
+        try:
+            with np.load(self.caminho('catalogacao.npz'), allow_pickle=False) as arquivo:
+                estados = {}
+                for i, item in enumerate(json.loads(str(arquivo['indice']))):
+                    estado = EstadoDaCatalogacao(item["timeframe"], item["deslocamento"], item["dias_carregados"])
+                    estado.contagens_por_dia = {dia: contagens.astype(EstadoDaCatalogacao.DTYPE_DAS_CONTAGENS) for dia, contagens in zip(arquivo[f"dias_{i}"].tolist(), arquivo[f"contagens_{i}"])}
+                    estado.ultima_vela = item["ultima_vela"]
+                    estados[(item["par"], item["timeframe"])] = estado
+                return estados
+        except (OSError, ValueError, KeyError):
+            return {}
+
+
+class Catalogador:
+    # horários 'HH:MM' indexados pelo minuto do dia (0 a 1439)
+    HORARIOS = [f"{minuto // 60:02}:{minuto % 60:02}" for minuto in range(1440)]
+    MINUTO_DO_HORARIO = {horario: minuto for minuto, horario in enumerate(HORARIOS)}
+
+    # valores sorteados por `gerar_configuracao_aleatoria`(e todos avaliados por `varrer_configuracoes`)
+    OPCOES_DE_CONFIGURACAO = {
+        "timeframe": ['1 minuto', '5 minutos', '15 minutos'],
+        "periodo de catalogação em dias": ['5 dias', '6 dias', '7 dias', '8 dias', '9 dias', '10 dias'],
+        "porcentagem de assertividade(nenhum martingale)": ['78%', '80%'],
+        "porcentagem de assertividade(1 martingale)": ['60%', '70%'],
+        "porcentagem de assertividade(2 martingale)": ['60%', '70%']
+    }
+
+    def __init__(self, botManager):
+        self.botManager = botManager
+        self.metricas = getattr(botManager, 'metricas', None) or Metricas()
+        self.catalogacao_vetorizada = True
+        self.armazenamento_de_velas = ArmazenamentoDeVelas()
+
+        # manter as contagens de cada ativo entre os ciclos e atualizar só os horários que mudaram
+        self.catalogacao_incremental = True
+        self.dias_maximos_da_catalogacao = 10
+        self.estados_da_catalogacao = {}
+
+        # derivar as velas M5/M15 das velas M1(ArmazenamentoDeVelas.reamostrar) em vez de baixar um histórico
+        # por timeframe: todos os timeframes saem do mesmo histórico M1 gravado. As últimas páginas M1 buscadas
+        # de cada ativo ficam em velas_m1_recentes({par: (minuto da busca, velas)}) e são reaproveitadas pelos
+        # outros timeframes no mesmo minuto, então o intervalo novo é baixado uma vez por ciclo
+        self.reamostrar_do_m1 = True
+        self.velas_m1_recentes = {}
+
+        # escolher a configuração avaliando todas as combinações de OPCOES_DE_CONFIGURACAO de uma vez
+        # (varrer_configuracoes) em vez de sortear uma e catalogar tudo de novo quando a lista sai pequena
+        self.varredura_de_configuracoes = False
+        self.minimo_de_operacoes = 3
+
+        # catalogar somente a hora atual(+ cauda dos martingales) em vez das 24 horas; com o
+        # armazenamento_de_velas ativo a catalogação completa já faz uma única chamada por ativo
+        self.catalogacao_por_horario = False
+
+        # busca paralela de velas(um pool de workers, cada um com a sua própria conexão na IQ Option)
+        self.busca_paralela = True
+        self.maximo_de_workers = 8
+        self.timeout_por_ativo = 60
+        self.tentativas_por_ativo = 3
+        self.tentativas_de_conexao = 3
+        self.backoff_inicial = 1
+        self.fabrica_de_conexoes = None
+        self.executor_de_busca = None
+        self.conexoes_dos_workers = threading.local()
+        # trava por ativo para alterar os estados_da_catalogacao: um worker que estourou o tempo é cancelado
+        # com a trava do ativo e não escreve mais nada(ver escrita_do_ativo)
+        self.travas_dos_ativos = {}
+        self.trava_das_travas = threading.Lock()
+
+        # dividir a agregação da catalogação completa(sem a incremental) entre N processos: as velas vão pela
+        # memória compartilhada e voltam só as estatisticas_compactas de cada ativo; 0 desliga
+        self.processos_de_agregacao = 0
+        self.executor_de_agregacao = None
+
+        # acompanhamento concorrente dos sinais
+        self.workers_do_acompanhamento = 8
+        self.antecedencia_do_aviso = 60
+        self.margem_de_verificacao = 1
+
+        # verificação ao vivo pelo stream de velas(FluxoDeVelas) em vez de buscar a vela depois do fechamento
+        self.verificacao_por_stream = False
+        self.trava_de_imagem = threading.Lock()
+
+        # gráficos de resultado com o RenderizadorDeVelas(um por thread) em vez do mplfinance
+        self.renderizador_rapido = True
+        self.renderizadores = threading.local()
+
     def gerar_imagem(self,velas, titulo, subtitulo):
+        """
+        Gera o gráfico de velas do resultado direto em memória.
+
+        Returns:
+            io.BytesIO: Imagem PNG pronta para o send_photo(); a figura já é fechada aqui.
+        """
+        with self.metricas.cronometro("grafico_segundos", renderizador="rapido" if self.renderizador_rapido else "mplfinance"):
+            return self.desenhar_imagem(ArmazenamentoDeVelas.converter(velas), titulo, subtitulo)
+
+    def desenhar_imagem(self, velas, titulo, subtitulo):
         titulo = titulo.replace('-op','')
-        """for vela in velas:
-            print(datetime.fromtimestamp(vela['from']).strftime(
-                '%d/%m/%Y %H:%M:%S'), 'max: {}'.format(vela['max']), 'min: {}'.format(vela['min']))"""
-
-        data = {'open': [],
-                'close': [],
-                'high': [],
-                'low': [],
-                'volume': []}
-        data_range = []
-
-        for vela in velas:
-            data['open'].append(vela['open'])
-            data['close'].append(vela['close'])
-            data['high'].append(vela['max'])
-            data['low'].append(vela['min'])
-            data['volume'].append(vela['volume'])
-            data_range.append(datetime.fromtimestamp(
-                vela['from']).strftime('%d/%m/%Y %H:%M:%S'))
-
-        # create DataFrame
-        prices = pd.DataFrame(data,
-                            index=data_range)
-
-        """"""
-        # display DataFrame
-        prices.index = pd.DatetimeIndex(prices.index)
+
+        if self.renderizador_rapido:
+            if getattr(self.renderizadores, 'renderizador', None) is None:
+                self.renderizadores.renderizador = RenderizadorDeVelas()
+            return self.renderizadores.renderizador.renderizar(velas, titulo, subtitulo)
+
+        data = {'open': velas['open'],
+                'close': velas['close'],
+                'high': velas['max'],
+                'low': velas['min'],
+                'volume': velas['volume']}
+
+        # create DataFrame(índice no horário local, direto dos timestamps)
+        inicio = velas['from']
+        prices = pd.DataFrame(data, index=pd.DatetimeIndex(pd.to_datetime(inicio + self.deslocamento_utc(int(inicio[-1])), unit='s')))
 
         # $ Markup
         signal = [np.nan for i in range(len(velas)-1)]
@@ -243,67 +1699,426 @@ class Catalogador:
         apd = mpl.make_addplot(signal, type='scatter', markersize=100, marker='^' if velas[-1]['open'] < velas[-1]['close'] else 'v' if velas[-1]['open'] > velas[-1]
                             ['close'] else '.', color='#19b76f' if velas[-1]['open'] < velas[-1]['close'] else '#fd4446' if velas[-1]['open'] > velas[-1]['close'] else 'gray')
 
-        # $ create fig
-        fig, axlist = mpl.plot(
-            prices,
-            type="candle",
-            title=titulo,
-            ylabel='',
-            ylabel_lower='',
-            volume=True,
-            style="yahoo",
-            returnfig=True,
-            datetime_format='%H:%M:%S',
-            addplot=apd
-        )
-
-        # add a new suptitle
-        fig.suptitle(titulo, y=1.05, fontsize=20, fontfamily='Arial', x=0.59)
+        # $ create fig(o pyplot não é thread-safe, então uma imagem por vez)
+        with self.trava_de_imagem:
+            fig, axlist = mpl.plot(
+                prices,
+                type="candle",
+                title=titulo,
+                ylabel='',
+                ylabel_lower='',
+                volume=True,
+                style="yahoo",
+                returnfig=True,
+                datetime_format='%H:%M:%S',
+                addplot=apd
+            )
 
-        # add a title the the correct axes
-        # print('\n\nSUBTITULO[Candlestick]:',subtitulo,'\n\n')
-        axlist[0].set_title(subtitulo, fontsize=15,
-                            fontfamily='Arial', loc='center')
+            # add a new suptitle
+            fig.suptitle(titulo, y=1.05, fontsize=20, fontfamily='Arial', x=0.59)
 
-        # annoted
+            # add a title the the correct axes
+            # print('\n\nSUBTITULO[Candlestick]:',subtitulo,'\n\n')
+            axlist[0].set_title(subtitulo, fontsize=15,
+                                fontfamily='Arial', loc='center')
 
-        # save the figure
-        nome_da_imagem = 'image-'+secrets.token_hex(25)
-        while True:
-            if os.path.isfile('temporary images/{}.png'.format(nome_da_imagem)):
-                nome_da_imagem = 'image-'+secrets.token_hex(25)
-            else:
-                break
+            # save the figure(em memória) e liberar a figura
+            imagem = io.BytesIO()
+            try:
+                fig.savefig(imagem, format='png', bbox_inches='tight')
+            finally:
+                plt.close(fig)
 
-        fig.savefig(
-            'temporary images/{}.png'.format(nome_da_imagem), bbox_inches='tight')
-        return nome_da_imagem+'.png'
+        imagem.seek(0)
+        imagem.name = 'resultado.png'
+        return imagem
 
 
     def gerar_configuracao_aleatoria(self,configuracoes, timeframe=None):
         """Define configurações automáticas para catalogação"""
         configuracoes.update({
             "tipo de catalogação": "agressivo",
-            "timeframe": timeframe or random.choice(['1 minuto', '5 minutos', '15 minutos']),
-            "periodo de catalogação em dias": random.choice(['5 dias', '6 dias', '7 dias', '8 dias', '9 dias', '10 dias']),
+            "timeframe": timeframe or random.choice(self.OPCOES_DE_CONFIGURACAO["timeframe"]),
+            "periodo de catalogação em dias": random.choice(self.OPCOES_DE_CONFIGURACAO["periodo de catalogação em dias"]),
             "martingale": "1 martingale",
-            "porcentagem de assertividade(nenhum martingale)": random.choice(['78%', '80%']),
-            "porcentagem de assertividade(1 martingale)": random.choice(['60%', '70%']),
-            "porcentagem de assertividade(2 martingale)": random.choice(['60%', '70%']),  # Evita repetição manual
+            "porcentagem de assertividade(nenhum martingale)": random.choice(self.OPCOES_DE_CONFIGURACAO["porcentagem de assertividade(nenhum martingale)"]),
+            "porcentagem de assertividade(1 martingale)": random.choice(self.OPCOES_DE_CONFIGURACAO["porcentagem de assertividade(1 martingale)"]),
+            "porcentagem de assertividade(2 martingale)": random.choice(self.OPCOES_DE_CONFIGURACAO["porcentagem de assertividade(2 martingale)"]),  # Evita repetição manual
             "quantidade de operações que a Machine Learning ira filtrar": 20
         })
 
         return configuracoes
     
-    def cataloga(self,par, dias, timeframe):
+    def deslocamento_utc(self, timestamp):
+        """Retorna o deslocamento (em segundos) do fuso local em relação ao UTC no timestamp informado,
+        o mesmo usado por datetime.fromtimestamp()."""
+        return int(datetime.fromtimestamp(timestamp).astimezone().utcoffset().total_seconds())
+
+    def velas_para_numpy(self, velas):
+        """
+        Converte uma página de velas da IQ Option(lista de dicionários) em um array NumPy com os campos
+        from/open/close/min/max/volume(mesmo formato de registro do ArmazenamentoDeVelas).
+        """
+        return ArmazenamentoDeVelas.converter(velas)
+
+    def buscar_pagina_de_velas(self, api_iqoption, par, timeframe, time_):
+        try:
+            velas = api_iqoption.get_candles(par, (timeframe * 60), 1000, time_)
+        except Exception as erro:
+            self.botManager.logging(f"{Fore.RED}[CATALOGAÇÃO]{Fore.RESET}", f"ocorreu um erro ao tentar buscar candles na IQOption com get_candles(): {erro}")
+            raise Exception()
+        if not velas:
+            raise Exception(f"nenhuma vela retornada para o ativo {par}")
+        return self.velas_para_numpy(velas)
+
+    def derivado_do_m1(self, timeframe):
+        """True se as velas do timeframe são reamostradas das velas M1 em vez de buscadas na IQ Option."""
+        return self.reamostrar_do_m1 and timeframe > 1
+
+    def gravar_velas_novas(self, par, timeframe, novas, agora):
+        """Anexa no armazenamento_de_velas as velas de `novas` já fechadas e mais novas que a última gravada."""
+        ultima_gravada = self.armazenamento_de_velas.ultima_vela(par, timeframe)
+        fechadas = novas[novas['from'] + timeframe * 60 <= agora]
+        self.armazenamento_de_velas.anexar(par, timeframe, fechadas[fechadas['from'] > (ultima_gravada or 0)])
+
+    def buscar_velas_desde(self, par, timeframe, ultima_vela, dias, deslocamento, api_iqoption, agora):
+        """
+        Busca, da vela atual para trás, somente as velas mais novas que `ultima_vela`.
+
+        Returns:
+            tuple: (velas, alcancou) com as velas novas em ordem crescente e False se a busca parou antes de
+            chegar em `ultima_vela` por já ter passado de `dias` dias(histórico anterior velho demais).
+        """
+        if self.derivado_do_m1(timeframe):
+            # velas M1 a partir do fim da última vela do timeframe(`ultima_vela` já estava fechada)
+            novas, alcancou = self.buscar_velas_desde(par, 1, ultima_vela + (timeframe - 1) * 60, dias, deslocamento, api_iqoption, agora)
+            if self.armazenamento_de_velas:
+                self.gravar_velas_novas(par, 1, novas, agora)
+            return ArmazenamentoDeVelas.reamostrar(novas, timeframe), alcancou
+
+        # M1 já buscado neste mesmo minuto(por outro timeframe do ciclo) e cobrindo `ultima_vela`: sem rede
+        if timeframe == 1 and self.reamostrar_do_m1:
+            minuto, recentes = self.velas_m1_recentes.get(par, (None, None))
+            if minuto == int(agora // 60) and recentes['from'][0] <= ultima_vela:
+                return recentes[recentes['from'] > ultima_vela], True
+
+        novas = []
+        paginas = []
+        dias_novos = set()
+        time_ = agora
+        while True:
+            pagina = self.buscar_pagina_de_velas(api_iqoption, par, timeframe, time_)
+            paginas.append(pagina)
+            novas.append(pagina[pagina['from'] > ultima_vela])
+            dias_novos.update(np.unique((pagina['from'] + deslocamento) // 86400).tolist())
+            if pagina['from'].min() <= ultima_vela:
+                alcancou = True
+                break
+            if len(dias_novos) > dias:
+                alcancou = False
+                break
+            time_ = int(pagina['from'].min() - 1)
+
+        if timeframe == 1 and self.reamostrar_do_m1:
+            self.velas_m1_recentes[par] = (int(agora // 60), ArmazenamentoDeVelas.sem_repetidas(np.concatenate(paginas)))
+
+        velas = np.concatenate(novas[::-1])
+        return velas[np.argsort(velas['from'], kind='stable')], alcancou
+
+    def buscar_velas_do_periodo(self, par, dias, timeframe, api_iqoption):
+        """
+        Retorna as velas dos `dias` dias mais recentes do ativo(contando o dia atual), em ordem crescente.
+
+        Com o `armazenamento_de_velas` ativo, o histórico vem do disco e o get_candles() só é chamado para o
+        intervalo desde a última vela gravada(e para completar o histórico, se ainda faltarem dias). A vela
+        em andamento entra na catalogação mas não é gravada. Com `reamostrar_do_m1`, as velas M5/M15 são
+        reamostradas do histórico M1.
+
+        Returns:
+            tuple: (velas, deslocamento) com o array de velas e o deslocamento do fuso local em segundos.
+        """
+        if self.derivado_do_m1(timeframe):
+            velas, deslocamento = self.buscar_velas_do_periodo(par, dias, 1, api_iqoption)
+            return ArmazenamentoDeVelas.reamostrar(velas, timeframe), deslocamento
+
+        armazenamento = self.armazenamento_de_velas
+        agora = self.botManager.horario.relogio.time()
+        deslocamento = self.deslocamento_utc(int(agora))
+
+        armazenadas = armazenamento.ler(par, timeframe) if armazenamento else np.empty(0, dtype=ArmazenamentoDeVelas.DTYPE)
+        reescrever = False
+
+        # 1. buscar somente as velas novas(desde a última vela gravada)
+        velas = armazenadas
+        if len(armazenadas):
+            novas, alcancou = self.buscar_velas_desde(par, timeframe, int(armazenadas['from'][-1]), dias, deslocamento, api_iqoption, agora)
+            if not alcancou:
+                # o histórico gravado ficou velho demais, descartar
+                armazenadas, reescrever = armazenadas[:0], True
+            velas = np.concatenate([armazenadas, novas])
+
+        # 2. buscar velas mais antigas enquanto não houver `dias`+1 dias distintos(mesmo critério do loop original)
+        dias_encontrados = set(np.unique((velas['from'] + deslocamento) // 86400).tolist())
+        antigas = []
+        time_ = int(velas['from'][0] - 1) if len(velas) else agora
+        while len(dias_encontrados) <= dias:
+            pagina = self.buscar_pagina_de_velas(api_iqoption, par, timeframe, time_)
+            antigas.append(pagina)
+            dias_encontrados.update(np.unique((pagina['from'] + deslocamento) // 86400).tolist())
+            time_ = int(pagina['from'].min() - 1)
+
+        if antigas:
+            velas = np.concatenate(antigas[::-1] + [velas])
+            velas = velas[np.argsort(velas['from'], kind='stable')]
+            reescrever = True
+
+        # 3. gravar somente as velas já fechadas
+        if armazenamento:
+            fechadas = velas[velas['from'] + timeframe * 60 <= agora]
+            if reescrever:
+                armazenamento.gravar(par, timeframe, fechadas)
+            elif len(armazenadas):
+                armazenamento.anexar(par, timeframe, fechadas[fechadas['from'] > armazenadas['from'][-1]])
+            armazenamento.compactar_se_necessario(par, timeframe, deslocamento, agora)
+
+        # manter somente os `dias` dias mais recentes(contando o dia atual)
+        dia = (velas['from'] + deslocamento) // 86400
+        primeiro_dia = sorted(dias_encontrados, reverse=True)[:dias][-1]
+        return velas[dia >= primeiro_dia], deslocamento
+
+    def cataloga_vetorizado(self, par, dias, timeframe, api_iqoption=None):
+        """
+        Mesma catalogação de `cataloga`, mas calculada com NumPy: as velas ficam em arrays, a cor vem de
+        np.sign(close-open), o dia e o minuto do dia saem de aritmética inteira e as contagens
+        verde/vermelha/doji por horário são feitas com np.bincount.
+
+        Returns:
+            dict: {'HH:MM': {'verde': int, 'vermelha': int, 'doji': int, '%': int, 'dir': str}, ...}
+        """
+        api_iqoption = api_iqoption or self.botManager.api_iqoption
+        start_timer = time.time() #$ Contagem de Tempo | Inicio
+
+        velas, deslocamento = self.buscar_velas_do_periodo(par, dias, timeframe, api_iqoption)
+        analise = self.analisar_velas(velas, deslocamento)
+
+        end_timer = time.time() #$ Contagem de Tempo | Final
+        self.botManager.logging(f"{Fore.GREEN}[CATALOGAÇÃO]{Fore.RESET}", f"ativo catalogado: {par} | {dias} dias{Fore.LIGHTBLACK_EX}(demorou {abs(end_timer-start_timer)} segundos){Fore.RESET}")
+        return analise
+
+    def atualizar_estado_da_catalogacao(self, par, dias, timeframe, api_iqoption=None):
+        """
+        Busca as velas novas do ativo/timeframe e soma as que fecharam no EstadoDaCatalogacao, criando o
+        estado com o histórico completo na primeira chamada(ou quando o histórico guardado não alcança mais).
+
+        Returns:
+            tuple: (estado, dia_da_vela_aberta, contagem_da_vela_aberta), com a vela em andamento como
+            (minuto do dia, coluna da cor) ou None.
+        """
+        api_iqoption = api_iqoption or self.botManager.api_iqoption
+        agora = self.botManager.horario.relogio.time()
+        estado = self.estados_da_catalogacao.get((par, timeframe))
+
+        novas = None
+        if estado is not None and estado.ultima_vela is not None and dias <= estado.dias_carregados:
+            novas, alcancou = self.buscar_velas_desde(par, timeframe, estado.ultima_vela, estado.dias_carregados, estado.deslocamento, api_iqoption, agora)
+            if not alcancou:
+                estado, novas = None, None
+
+        if novas is None:
+            dias_carregados = max(dias, self.dias_maximos_da_catalogacao)
+            novas, deslocamento = self.buscar_velas_do_periodo(par, dias_carregados, timeframe, api_iqoption)
+            estado = None
+
+        fechada = novas['from'] + timeframe * 60 <= agora
+        with self.escrita_do_ativo(par):
+            if estado is None:
+                estado = EstadoDaCatalogacao(timeframe, deslocamento, dias_carregados)
+                self.estados_da_catalogacao[(par, timeframe)] = estado
+            elif self.armazenamento_de_velas and not self.derivado_do_m1(timeframe):
+                self.gravar_velas_novas(par, timeframe, novas, agora)
+            estado.adicionar(novas[fechada])
+        aberta = novas[~fechada]
+
+        dia_da_vela_aberta = None
+        contagem_da_vela_aberta = None
+        if len(aberta):
+            dia, minuto = estado.dia_e_minuto(aberta['from'][-1:])
+            dia_da_vela_aberta, minuto_da_vela_aberta = int(dia[0]), int(minuto[0])
+            contagem_da_vela_aberta = (minuto_da_vela_aberta, int(estado.coluna_da_cor(aberta[-1:])[0]))
+        return estado, dia_da_vela_aberta, contagem_da_vela_aberta
+
+    def cataloga_incremental(self, par, dias, timeframe, gales=0, api_iqoption=None):
+        """
+        Catalogação em janela móvel: na primeira chamada do ativo/timeframe carrega o histórico completo
+        (aquecimento); nas seguintes busca só as velas novas, soma o que fechou, subtrai o dia que saiu da
+        janela e recalcula '%', 'dir' e mg1..mgN apenas dos horários afetados.
+
+        Returns:
+            dict: Mesmo formato de `cataloga`, já com as chaves 'mg1' ... 'mgN'. Os dicionários dos horários são
+            os guardados no estado(só os horários afetados são trocados a cada ciclo) e não devem ser alterados;
+            os sinais publicados são copiados por `CatalogoPorMinuto.sinais`.
+        """
+        api_iqoption = api_iqoption or self.botManager.api_iqoption
+        start_timer = time.time() #$ Contagem de Tempo | Inicio
+        estado, dia_da_vela_aberta, contagem_da_vela_aberta = self.atualizar_estado_da_catalogacao(par, dias, timeframe, api_iqoption)
+
+        with self.escrita_do_ativo(par):
+            alterados = estado.atualizar_janela(dias, dia_da_vela_aberta)
+
+            # a vela em andamento entra na contagem só nesta análise
+            if estado.minuto_da_vela_aberta is not None:
+                alterados.add(estado.minuto_da_vela_aberta)
+            estado.minuto_da_vela_aberta = None
+            contagens = estado.soma
+            if contagem_da_vela_aberta is not None:
+                contagens = estado.soma.copy()
+                contagens[contagem_da_vela_aberta] += 1
+                estado.minuto_da_vela_aberta = contagem_da_vela_aberta[0]
+                alterados.add(contagem_da_vela_aberta[0])
+
+            if estado.parametros != (dias, gales):
+                estado.parametros = (dias, gales)
+                alterados = set(range(1440))
+            elif gales:
+                # o mgK de um horário depende dos horários seguintes, então recalcular também os anteriores
+                alterados.update((m - timeframe * k) % 1440 for m in list(alterados) for k in range(1, gales + 1))
+
+            catalogado = contagens.sum(axis=1) > 0
+            minutos = np.array(sorted(alterados), dtype=np.int64)
+            for m in minutos[~catalogado[minutos]].tolist():
+                estado.analise.pop(self.HORARIOS[m], None)
+
+            minutos = minutos[catalogado[minutos]]
+            if len(minutos):
+                estatisticas = self.estatisticas_dos_minutos(contagens, minutos)
+                if gales:
+                    coluna_da_direcao = np.array([0 if dados['dir'] == 'CALL' else 1 for dados in estatisticas])
+                    for dados, martingales in zip(estatisticas, self.martingales_dos_minutos(contagens, catalogado, minutos, coluna_da_direcao, timeframe, gales)):
+                        dados.update(martingales)
+                for m, dados in zip(minutos.tolist(), estatisticas):
+                    estado.analise[self.HORARIOS[m]] = dados
+            analise = dict(estado.analise)
+
+        end_timer = time.time() #$ Contagem de Tempo | Final
+        self.botManager.logging(f"{Fore.GREEN}[CATALOGAÇÃO]{Fore.RESET}", f"ativo catalogado: {par} | {dias} dias, {len(minutos)} horários atualizados{Fore.LIGHTBLACK_EX}(demorou {abs(end_timer-start_timer)} segundos){Fore.RESET}")
+        return analise
+
+    def cataloga_horario(self, par, dias, timeframe, hora, gales=0, api_iqoption=None):
+        """
+        Catalogação restrita a uma hora do dia: para cada um dos últimos `dias` dias(contando o dia atual)
+        busca somente as velas de `hora`:00 a `hora`:59 mais a cauda dos martingales(gales*timeframe
+        minutos), em vez do histórico completo. São ~60-70 velas por dia no M1 em vez de 1440.
+
+        Os dias são contados no calendário(hoje e os `dias`-1 anteriores), não pelos dias com velas.
+
+        Returns:
+            dict: Mesmo formato de `cataloga`, só com os horários da janela.
+        """
+        api_iqoption = api_iqoption or self.botManager.api_iqoption
+        start_timer = time.time() #$ Contagem de Tempo | Inicio
+        agora = self.botManager.horario.relogio.time()
+        deslocamento = self.deslocamento_utc(int(agora))
+        hoje = (int(agora) + deslocamento) // 86400
+
+        # janelas em minutos do dia; a cauda que passa da meia-noite é buscada no início do mesmo dia
+        primeiro_minuto = hora * 60
+        ultimo_minuto = primeiro_minuto + 60 + gales * timeframe
+        janelas = [(primeiro_minuto, min(ultimo_minuto, 1440))]
+        if ultimo_minuto > 1440:
+            janelas.append((0, ultimo_minuto - 1440))
+
+        paginas = []
+        for dia in range(hoje - dias + 1, hoje + 1):
+            inicio_do_dia = dia * 86400 - deslocamento
+            for minuto_inicial, minuto_final in janelas:
+                inicio = inicio_do_dia + minuto_inicial * 60
+                fim = min(inicio_do_dia + minuto_final * 60 - 1, int(agora))
+                if fim < inicio:
+                    continue
+                quantidade = -(-(fim - inicio + 1) // (timeframe * 60))
+                try:
+                    velas = api_iqoption.get_candles(par, (timeframe * 60), quantidade, fim)
+                except Exception as erro:
+                    self.botManager.logging(f"{Fore.RED}[CATALOGAÇÃO]{Fore.RESET}", f"ocorreu um erro ao tentar buscar candles na IQOption com get_candles(): {erro}")
+                    raise Exception()
+                if velas:
+                    pagina = self.velas_para_numpy(velas)
+                    paginas.append(pagina[(pagina['from'] >= inicio) & (pagina['from'] <= fim)])
+
+        if not paginas:
+            raise Exception(f"nenhuma vela retornada para o ativo {par}")
+
+        analise = self.analisar_velas(np.concatenate(paginas), deslocamento)
+
+        end_timer = time.time() #$ Contagem de Tempo | Final
+        self.botManager.logging(f"{Fore.GREEN}[CATALOGAÇÃO]{Fore.RESET}", f"ativo catalogado: {par} | {dias} dias, {hora:02}h{Fore.LIGHTBLACK_EX}(demorou {abs(end_timer-start_timer)} segundos){Fore.RESET}")
+        return analise
+
+    def analisar_velas(self, velas, deslocamento):
+        """
+        Conta as velas verdes/vermelhas/doji por horário(minuto do dia) e calcula '%' e 'dir'.
+
+        Returns:
+            dict: {'HH:MM': {'verde': int, 'vermelha': int, 'doji': int, '%': int, 'dir': str}, ...}
+        """
+        inicio = velas['from']
+
+        cor = ArmazenamentoDeVelas.cores(velas)
+        minuto = ((inicio + deslocamento) % 86400) // 60
+
+        verde = np.bincount(minuto[cor > 0], minlength=1440)
+        vermelha = np.bincount(minuto[cor < 0], minlength=1440)
+        doji = np.bincount(minuto[cor == 0], minlength=1440)
+        total = verde + vermelha + doji
+
+        # mesma ordem de inserção da versão em loop: do horário mais recente para trás
+        minuto_mais_recente = int(minuto[np.argmax(inicio)])
+        minutos = np.nonzero(total)[0]
+        minutos = minutos[np.argsort((minuto_mais_recente - minutos) % 1440, kind='stable')]
+
+        return dict(zip((self.HORARIOS[m] for m in minutos.tolist()), self.estatisticas_dos_minutos(np.stack([verde, vermelha, doji], axis=1), minutos)))
+
+    def estatisticas_dos_minutos(self, contagens, minutos):
+        """
+        Monta os dados de cada horário('verde', 'vermelha', 'doji', '%' e 'dir') a partir das contagens.
+
+        Args:
+            contagens (np.ndarray): Contagens verde/vermelha/doji por minuto do dia, formato (1440, 3).
+            minutos (np.ndarray): Minutos do dia(com pelo menos uma vela) a montar.
+
+        Returns:
+            list: Um dicionário por minuto, na ordem de `minutos`.
+        """
+        selecionadas = contagens[minutos]
+        porcentagem = np.rint(100 * (selecionadas[:, 0] / selecionadas.sum(axis=1)))
+
+        estatisticas = []
+        for (verde, vermelha, doji), percentual in zip(selecionadas.tolist(), porcentagem.tolist()):
+            percentual, direcao = int(percentual), ''
+            if percentual > 50:
+                direcao = 'CALL'
+            if percentual < 50:
+                percentual, direcao = 100 - percentual, 'PUT '
+            estatisticas.append({'verde': verde, 'vermelha': vermelha, 'doji': doji, '%': percentual, 'dir': direcao})
+        return estatisticas
+
+    def cataloga(self,par, dias, timeframe, api_iqoption=None, hora=None, gales=0):
+        if hora is not None:
+            return self.cataloga_horario(par, dias, timeframe, hora, gales, api_iqoption)
+        if self.catalogacao_incremental and self.catalogacao_vetorizada:
+            return self.cataloga_incremental(par, dias, timeframe, gales, api_iqoption)
+        if self.catalogacao_vetorizada:
+            return self.cataloga_vetorizado(par, dias, timeframe, api_iqoption)
+
+        api_iqoption = api_iqoption or self.botManager.api_iqoption
         data = []
         datas_testadas = []
-        time_ = time.time()
+        time_ = self.botManager.horario.relogio.time()
         start_timer = time.time() #$ Contagem de Tempo | Inicio
         sair = False
         while sair == False:
             try:
-                velas = self.botManager.api_iqoption.get_candles(par, (timeframe * 60), 1000, time_)
+                velas = api_iqoption.get_candles(par, (timeframe * 60), 1000, time_)
             except Exception as erro:
                 self.botManager.logging(f"{Fore.RED}[CATALOGAÇÃO]{Fore.RESET}", f"ocorreu um erro ao tentar buscar candles na IQOption com get_candles(): {erro}")
                 raise Exception()
@@ -357,11 +2172,12 @@ class Catalogador:
         self.botManager.logging(f"{Fore.GREEN}[CATALOGAÇÃO]{Fore.RESET}", f"ativo catalogado: {par} | {dias} dias{Fore.LIGHTBLACK_EX}(demorou {abs(end_timer-start_timer)} segundos){Fore.RESET}")
         return analise
 
-    def organizar_catalogacao_por_horario(self,catalogacao):
+    def organizar_catalogacao_por_horario(self,catalogacao, gales=None):
         """
-        Organiza os dados de catalogação por horários específicos, agrupando-os de acordo com a hora base 
-        (por exemplo, '23:45' será agrupado em '23:00') e garantindo que os dados de cada ativo sejam 
-        agrupados corretamente dentro dessas faixas de horário.
+        Organiza os dados de catalogação de todos os ativos em um `CatalogoPorMinuto`, indexado pelo ativo
+        e pelo minuto do dia(0 a 1439), em vez de um dicionário por hora base('23:45' ficava em '23:00').
+        A hora base passa a ser só uma fatia dos arrays: `catalogo.hora(23)` são os minutos 1380 a 1439 de
+        todos os ativos.
 
         Exemplo de entrada:
         catalogacao = {
@@ -372,274 +2188,616 @@ class Catalogador:
             },
             "GBPUSD": {
                 "05:00": {'verde': 5, 'vermelha': 1, 'doji': 0, '%': 83, 'dir': 'CALL'},
-                "06:00": {'verde': 4, 'vermelha': 2, 'doji': 0, '%': 67, 'dir': 'CALL'},
                 ...
             }
         }
-        
-        Exemplo de saída (dados organizados por hora base):
-        {
-            "05:00": {
-                "EURUSD": {
-                    "05:00": {'verde': 6, 'vermelha': 0, 'doji': 0, '%': 100, 'dir': 'CALL'}
-                },
-                "GBPUSD": {
-                    "05:00": {'verde': 5, 'vermelha': 1, 'doji': 0, '%': 83, 'dir': 'CALL'}
-                }
-            },
-            "06:00": {
-                "EURUSD": {
-                    "06:00": {'verde': 3, 'vermelha': 2, 'doji': 0, '%': 60, 'dir': 'CALL'}
-                },
-                "GBPUSD": {
-                    "06:00": {'verde': 4, 'vermelha': 2, 'doji': 0, '%': 67, 'dir': 'CALL'}
-                }
-            },
-            ...
-        }
 
-        Como funciona:
-        1. O código gera uma lista de períodos de hora (de "00:00" a "23:00").
-        2. Em seguida, cria um dicionário (`horarios_organizados`) onde cada chave corresponde a um período 
-        de hora (exemplo: "00:00", "01:00", ..., "23:00").
-        3. Para cada par de ativo na `catalogacao`, percorre os horários e coloca os dados de cada horário 
-        dentro do intervalo de hora base correspondente. Ou seja, qualquer horário do tipo 'HH:MM' será 
-        agrupado com a hora base 'HH:00', sendo assim, '23:45' será agrupado em '23:00'.
-        4. O dicionário final (`horarios_organizados`) contém os ativos agrupados dentro de cada hora base 
-        com os dados correspondentes de cada intervalo de tempo.
+        Exemplo de saída:
+        catalogo.ativos                  -> ['EURUSD', 'GBPUSD']
+        catalogo.porcentagem[0, 300]     -> 100 (EURUSD às 05:00)
+        catalogo.dados[1, 300]           -> {'verde': 5, 'vermelha': 1, 'doji': 0, '%': 83, 'dir': 'CALL'}
 
         Parâmetros:
         - catalogacao (dict): Dicionário com dados de ativos, onde as chaves são os pares de moedas/ativos 
         (ex: "EURUSD") e os valores são dicionários de horários com informações sobre cada intervalo de tempo.
+        - gales (int): Quantidade de martingales(mg1 ... mgN) dos dados; sem ela, é lida dos próprios dados.
 
         Retorno:
-        - dict: Um dicionário com os dados reorganizados por períodos de hora base. Cada chave é uma hora base 
-        ("00:00", "01:00", etc.), e o valor é outro dicionário contendo os pares de ativos e seus dados 
-        correspondentes para aquele período de hora.
+        - CatalogoPorMinuto: O catálogo com os ativos na mesma ordem de `catalogacao`.
+        """
+        return CatalogoPorMinuto.de_analises(catalogacao, gales)
+        
+    def calcular_martingales(self, analise, timeframe, gales):
+        """
+        Calcula as estatísticas de martingale(mg1, mg2, ..., mgN) de um único ativo já catalogado.
 
-        Exemplo:
-        Entrada:
-        {
-            "EURUSD": {
-                "05:00": {'verde': 6, 'vermelha': 0, 'doji': 0, '%': 100, 'dir': 'CALL'},
-                "06:00": {'verde': 3, 'vermelha': 2, 'doji': 0, '%': 60, 'dir': 'CALL'}
-            }
-        }
+        O horário de cada gale é o minuto do dia deslocado em timeframe*k (com a virada da meia-noite),
+        consultado direto em arrays indexados por minuto, sem aritmética de strings. As contagens do gale k
+        acumulam as do horário base e dos gales anteriores existentes; se o horário do gale não foi
+        catalogado, o gale fica com '%': 'N/A'.
 
-        Saída:
-        {
-            "05:00": {
-                "EURUSD": {
-                    "05:00": {'verde': 6, 'vermelha': 0, 'doji': 0, '%': 100, 'dir': 'CALL'}
-                }
-            },
-            "06:00": {
-                "EURUSD": {
-                    "06:00": {'verde': 3, 'vermelha': 2, 'doji': 0, '%': 60, 'dir': 'CALL'}
+        Args:
+            analise (dict): Resultado de `cataloga` para o ativo({'HH:MM': {...}}).
+            timeframe (int): Timeframe em minutos.
+            gales (int): Quantidade de martingales a calcular.
+
+        Returns:
+            dict: A mesma `analise`, com as chaves 'mg1' ... 'mgN' adicionadas em cada horário.
+        """
+        horarios = sorted(analise)
+        if not horarios or gales <= 0:
+            return analise
+
+        contagens = np.zeros((1440, 3), dtype=np.int64)
+        catalogado = np.zeros(1440, dtype=bool)
+        minutos = np.fromiter((self.MINUTO_DO_HORARIO[horario] for horario in horarios), dtype=np.int64, count=len(horarios))
+        contagens[minutos] = [(analise[horario]['verde'], analise[horario]['vermelha'], analise[horario]['doji']) for horario in horarios]
+        catalogado[minutos] = True
+        coluna_da_direcao = np.array([0 if analise[horario]['dir'] == 'CALL' else 1 for horario in horarios])
+
+        for horario, martingales in zip(horarios, self.martingales_dos_minutos(contagens, catalogado, minutos, coluna_da_direcao, timeframe, gales)):
+            analise[horario].update(martingales)
+
+        return analise
+
+    def martingales_dos_minutos(self, contagens, catalogado, minutos, coluna_da_direcao, timeframe, gales):
+        """
+        Calcula mg1 ... mgN para cada minuto de `minutos`(ver `calcular_martingales`).
+
+        Args:
+            contagens (np.ndarray): Contagens verde/vermelha/doji por minuto do dia, formato (1440, 3).
+            catalogado (np.ndarray): Máscara(1440,) dos minutos que existem na catalogação.
+            minutos (np.ndarray): Minutos do dia a calcular.
+            coluna_da_direcao (np.ndarray): 0(verde) para CALL ou 1(vermelha) para PUT, por minuto.
+
+        Returns:
+            list: Um dicionário {'mg1': {...}, ..., 'mgN': {...}} por minuto, na ordem de `minutos`.
+        """
+        martingales = [{} for _ in range(len(minutos))]
+        soma = contagens[minutos].copy()
+        for k in range(1, gales + 1):
+            minutos_gale = (minutos + timeframe * k) % 1440
+            existe = catalogado[minutos_gale]
+
+            soma += contagens[minutos_gale] * existe[:, None]
+            mg = np.where(existe[:, None], soma, 0)
+            porcentagem = np.rint(100 * (mg[np.arange(len(minutos)), coluna_da_direcao] / np.maximum(mg.sum(axis=1), 1)))
+
+            for i, ((verde, vermelha, doji), percentual, gale_existe) in enumerate(zip(mg.tolist(), porcentagem.tolist(), existe.tolist())):
+                martingales[i]['mg' + str(k)] = {
+                    'verde': verde, 'vermelha': vermelha, 'doji': doji,
+                    '%': int(percentual) if gale_existe else 'N/A'
                 }
-            }
+
+        return martingales
+
+    def conexao_do_worker(self):
+        """Retorna a conexão da IQ Option do worker atual, criando uma na primeira chamada da thread.
+
+        O get_candles() da IQ Option guarda a resposta em um estado compartilhado do cliente, então cada
+        worker usa a sua própria conexão(criada por `fabrica_de_conexoes`)."""
+        if self.fabrica_de_conexoes is None:
+            return self.botManager.api_iqoption
+
+        if getattr(self.conexoes_dos_workers, 'api_iqoption', None) is None:
+            self.conexoes_dos_workers.api_iqoption = self.fabrica_de_conexoes()
+        return self.conexoes_dos_workers.api_iqoption
+
+    @contextmanager
+    def escrita_do_ativo(self, par):
+        """Trava do ativo para ler/alterar o seu estado nos estados_da_catalogacao. Dentro de um worker da
+        catalogação paralela que já foi cancelado(tempo limite), levanta um erro em vez de entrar."""
+        with self.trava_das_travas:
+            trava = self.travas_dos_ativos.setdefault(par, threading.RLock())
+        with trava:
+            cancelado = getattr(self.conexoes_dos_workers, 'cancelado', None)
+            if cancelado is not None and cancelado.is_set():
+                raise Exception(f"catalogação do ativo {par} cancelada(tempo limite excedido)")
+            yield
+
+    def catalogar_ativo_com_retentativas(self, par, dias, timeframe, prazo, hora=None, gales=0, funcao=None):
+        """Cataloga um ativo dentro de um worker, tentando novamente com backoff exponencial em caso de erro.
+        Com `funcao`, chama funcao(par, dias, timeframe, api_iqoption) no lugar de `cataloga`."""
+        for tentativa in range(self.tentativas_por_ativo):
+            try:
+                with self.metricas.cronometro("catalogacao_ativo_segundos", timeframe=f"M{timeframe}"):
+                    if funcao is not None:
+                        return funcao(par, dias, timeframe, self.conexao_do_worker())
+                    return self.cataloga(par, dias, timeframe, self.conexao_do_worker(), hora, gales)
+            except Exception as erro:
+                espera = self.backoff_inicial * (2 ** tentativa)
+                if tentativa == self.tentativas_por_ativo - 1 or time.time() + espera >= prazo:
+                    raise
+                self.botManager.logging(f"{Fore.YELLOW}[CATALOGAÇÃO]{Fore.RESET}", f"erro ao catalogar o ativo {par}({tentativa + 1}° tentativa), tentando novamente em {espera} segundos: {erro}")
+                self.botManager.horario.relogio.sleep(espera)
+
+    def catalogar_ativos_em_paralelo(self, pares, dias, timeframe, hora=None, gales=0, funcao=None):
+        """
+        Busca e cataloga vários ativos ao mesmo tempo em um pool limitado de workers(`maximo_de_workers`).
+
+        Cada ativo tem `timeout_por_ativo` segundos(contados a partir do início do seu processamento) e até
+        `tentativas_por_ativo` tentativas, e o lote inteiro tem `timeout_por_ativo` segundos por rodada de
+        workers(contados a partir do envio), para que ativos na fila atrás de um worker travado também tenham
+        prazo. Ativos com erro ou que estouraram o tempo ficam de fora, igual à catalogação sequencial; o
+        worker de um ativo que estourou o tempo continua rodando, mas é cancelado e não altera mais os
+        estados_da_catalogacao, e o pool é trocado por um novo no ciclo seguinte(a thread dele segue presa).
+
+        Returns:
+            dict: {par: analise} na mesma ordem de `pares`.
+        """
+        if self.executor_de_busca is None:
+            self.executor_de_busca = ThreadPoolExecutor(max_workers=self.maximo_de_workers, thread_name_prefix='catalogacao')
+
+        inicio_por_ativo = {}
+        cancelamentos = {par: threading.Event() for par in pares}
+        prazo_do_lote = time.time() + self.timeout_por_ativo * -(-len(pares) // self.maximo_de_workers)
+        def processar(par):
+            if cancelamentos[par].is_set():
+                raise Exception(f"catalogação do ativo {par} cancelada(tempo limite do lote excedido)")
+            inicio_por_ativo[par] = time.time()
+            self.conexoes_dos_workers.cancelado = cancelamentos[par]
+            try:
+                prazo = min(inicio_por_ativo[par] + self.timeout_por_ativo, prazo_do_lote)
+                return self.catalogar_ativo_com_retentativas(par, dias, timeframe, prazo, hora, gales, funcao)
+            finally:
+                self.conexoes_dos_workers.cancelado = None
+
+        executor = self.executor_de_busca
+        futuros = [(par, executor.submit(processar, par)) for par in pares]
+
+        resultados = {}
+        abandonados = 0
+        for par, futuro in futuros:
+            while not wait([futuro], timeout=0.1).done:
+                agora = time.time()
+                if agora > prazo_do_lote or (par in inicio_por_ativo and agora - inicio_por_ativo[par] > self.timeout_por_ativo):
+                    self.botManager.logging(f"{Fore.RED}[CATALOGAÇÃO]{Fore.RESET}", f"tempo limite de {self.timeout_por_ativo} segundos excedido ao catalogar o ativo {par}")
+                    with self.escrita_do_ativo(par):
+                        cancelamentos[par].set()
+                    if not futuro.cancel():
+                        abandonados += 1
+                    break
+
+            if futuro.done() and not futuro.cancelled() and futuro.exception() is None:
+                resultados[par] = futuro.result()
+
+        if abandonados:
+            # as threads dos workers abandonados continuam presas na IQ Option: o próximo ciclo usa um pool novo
+            self.botManager.logging(f"{Fore.YELLOW}[CATALOGAÇÃO]{Fore.RESET}", f"{abandonados} worker(s) abandonado(s) por tempo limite, o pool de busca será recriado")
+            executor.shutdown(wait=False, cancel_futures=True)
+            if self.executor_de_busca is executor:
+                self.executor_de_busca = None
+
+        return resultados
+
+    @staticmethod
+    def estatisticas_compactas(velas, deslocamento, timeframe, gales):
+        """
+        Mesmas contas de `analisar_velas` + `calcular_martingales`, mas devolvendo só arrays(sem montar os
+        dicionários), para rodar dentro dos processos de `catalogar_ativos_em_processos`.
+
+        Returns:
+            dict: 'minutos'(na ordem de `analisar_velas`), 'contagens'(k, 3), 'porcentagem', 'direcao'(1 CALL,
+            -1 PUT, 0 empate), 'martingales'(gales, k, 3) e 'porcentagem_dos_martingales'(gales, k, -1 = 'N/A').
+        """
+        inicio = velas['from']
+        cor = ArmazenamentoDeVelas.cores(velas)
+        minuto = ((inicio + deslocamento) % 86400) // 60
+
+        coluna = np.where(cor > 0, 0, np.where(cor < 0, 1, 2))
+        contagens = np.bincount(minuto * 3 + coluna, minlength=1440 * 3).reshape(1440, 3)
+        catalogado = contagens.sum(axis=1) > 0
+
+        minuto_mais_recente = int(minuto[np.argmax(inicio)])
+        minutos = np.nonzero(catalogado)[0]
+        minutos = minutos[np.argsort((minuto_mais_recente - minutos) % 1440, kind='stable')]
+
+        selecionadas = contagens[minutos]
+        percentual_verde = np.rint(100 * (selecionadas[:, 0] / selecionadas.sum(axis=1)))
+        coluna_da_direcao = np.where(percentual_verde > 50, 0, 1)
+
+        martingales = np.zeros((gales, len(minutos), 3), dtype=np.int32)
+        porcentagem_dos_martingales = np.full((gales, len(minutos)), -1, dtype=np.int16)
+        soma = selecionadas.copy()
+        for k in range(1, gales + 1):
+            minutos_gale = (minutos + timeframe * k) % 1440
+            existe = catalogado[minutos_gale]
+
+            soma += contagens[minutos_gale] * existe[:, None]
+            mg = np.where(existe[:, None], soma, 0)
+            porcentagem = np.rint(100 * (mg[np.arange(len(minutos)), coluna_da_direcao] / np.maximum(mg.sum(axis=1), 1)))
+            martingales[k - 1] = mg
+            porcentagem_dos_martingales[k - 1] = np.where(existe, porcentagem, -1)
+
+        return {
+            'minutos': minutos.astype(np.int16),
+            'contagens': selecionadas.astype(np.int32),
+            'porcentagem': np.where(percentual_verde < 50, 100 - percentual_verde, percentual_verde).astype(np.int16),
+            'direcao': np.sign(percentual_verde - 50).astype(np.int8),
+            'martingales': martingales,
+            'porcentagem_dos_martingales': porcentagem_dos_martingales
         }
+
+    @staticmethod
+    def agregar_velas_compartilhadas(nome_da_memoria, quantidade, fatias, timeframe, gales):
         """
-        # Lista de períodos de hora
-        periodos_horas = [f"{h:02}:00" for h in range(24)]
-        
-        # Dicionário organizado por horários
-        horarios_organizados = {periodo: {} for periodo in periodos_horas}
-
-        # Percorrer os ativos e horários na catalogação
-        for par, horarios in catalogacao.items():
-            for horario, dados in horarios.items():
-                # Identificar a hora base do horário (e.g., '23:45' -> '23:00')
-                hora_base = f"{horario[:2]}:00"
-                
-                # Verificar se a hora base está dentro dos períodos de horas definidos
-                if hora_base in periodos_horas:
-                    # Adicionar o ativo e horário na estrutura organizada
-                    if par not in horarios_organizados[hora_base]:
-                        horarios_organizados[hora_base][par] = {}
-                    
-                    horarios_organizados[hora_base][par][horario] = dados
-        
-        return horarios_organizados
-        
-    def catalogar_operacoes(self,configuracoes):
-        ativos = self.botManager.api_iqoption.get_all_open_time()
-        start_time_all = time.time()
-        self.botManager.logging(f"{Fore.GREEN}[CATALOGAÇÃO]{Fore.RESET}", "catalogação iniciada pra filtrar novas operações...")
-        
-        catalogacao = {}
-        for par in ativos['digital']:
-            if ativos['digital'][par]['open'] == True:
-                timer = int(time.time())
-                
+        Executada em um processo do `executor_de_agregacao`: lê as velas de vários ativos direto da memória
+        compartilhada(sem copiar nem serializar) e devolve as `estatisticas_compactas` de cada um.
+
+        Args:
+            nome_da_memoria (str): Nome do bloco de SharedMemory com todas as velas concatenadas.
+            quantidade (int): Quantidade total de velas no bloco.
+            fatias (list): (início, fim, deslocamento) das velas de cada ativo dentro do bloco.
+        """
+        memoria = shared_memory.SharedMemory(name=nome_da_memoria)
+        try:
+            velas = np.ndarray((quantidade,), dtype=ArmazenamentoDeVelas.DTYPE, buffer=memoria.buf)
+            resultados = [Catalogador.estatisticas_compactas(velas[inicio:fim], deslocamento, timeframe, gales) for inicio, fim, deslocamento in fatias]
+            del velas
+        finally:
+            memoria.close()
+        return resultados
+
+    def analise_das_estatisticas(self, estatisticas):
+        """Monta o dicionário de `analisar_velas`(com os martingales de `calcular_martingales`) a partir das
+        `estatisticas_compactas` de um ativo."""
+        direcoes = {1: 'CALL', 0: '', -1: 'PUT '}
+        martingales = [list(zip(mg.tolist(), porcentagem.tolist())) for mg, porcentagem in zip(estatisticas['martingales'], estatisticas['porcentagem_dos_martingales'])]
+
+        analise = {}
+        for i, (minuto, (verde, vermelha, doji), percentual, direcao) in enumerate(zip(estatisticas['minutos'].tolist(), estatisticas['contagens'].tolist(), estatisticas['porcentagem'].tolist(), estatisticas['direcao'].tolist())):
+            dados = {'verde': verde, 'vermelha': vermelha, 'doji': doji, '%': percentual, 'dir': direcoes[direcao]}
+            for k, gale in enumerate(martingales, 1):
+                (verde_mg, vermelha_mg, doji_mg), percentual_mg = gale[i]
+                dados['mg' + str(k)] = {'verde': verde_mg, 'vermelha': vermelha_mg, 'doji': doji_mg, '%': percentual_mg if percentual_mg >= 0 else 'N/A'}
+            analise[self.HORARIOS[minuto]] = dados
+        return analise
+
+    def catalogar_ativos_em_processos(self, pares, dias, timeframe, gales=0):
+        """
+        Catalogação completa com a agregação dividida entre `processos_de_agregacao` processos.
+
+        As velas são buscadas como de costume(pool de threads ou em sequência), concatenadas em um único
+        bloco de memória compartilhada e cada processo recebe só o nome do bloco e as fatias dos seus ativos.
+        Os processos devolvem as `estatisticas_compactas` e os dicionários são montados aqui, no mesmo formato
+        de `cataloga_vetorizado` + `calcular_martingales`. Se um processo morrer(BrokenProcessPool), o pool é
+        descartado(o próximo ciclo cria outro) e o ciclo atual é agregado aqui mesmo, com as velas já buscadas.
+
+        Returns:
+            dict: {par: analise} na mesma ordem de `pares`.
+        """
+        start_timer = time.time() #$ Contagem de Tempo | Inicio
+        if self.busca_paralela:
+            velas_por_par = self.catalogar_ativos_em_paralelo(pares, dias, timeframe, funcao=self.buscar_velas_do_periodo)
+        else:
+            velas_por_par = {}
+            for par in pares:
                 try:
-                    catalogacao.update({par: self.cataloga(par, int(configuracoes['periodo de catalogação em dias'].split(' ')[0]), int(configuracoes['timeframe'].split(' ')[0]))})
-                except Exception as error:
-                    #print(f"@Catalogador | @Function catalogar_operacoes_rapidas(try/catch) | ocorreu um erro ao tentar usar catalogacao.update({...}) | @Error {error}")
+                    velas_por_par[par] = self.buscar_velas_do_periodo(par, dias, timeframe, self.botManager.api_iqoption)
+                except Exception as erro:
+                    self.botManager.logging(f"{Fore.RED}[CATALOGAÇÃO]{Fore.RESET}", f"erro ao buscar as velas do ativo {par}: {erro}")
                     continue
-                    #raise Exception(f"@Catalogador | @Function catalogar_operacoes_rapidas(try/catch) | ocorreu um erro ao tentar usar catalogacao.update({...}) | @Error {error}")
 
-                # print('Depois da catalogação Finalizada do ativo {}'.format(par))
+        pares = [par for par in pares if par in velas_por_par and len(velas_por_par[par][0])]
+        if not pares:
+            return {}
 
-                for par in catalogacao:
-                    for horario in sorted(catalogacao[par]): # horario -> %H:%M -> 21:00
-                        if configuracoes['martingale'].strip() != '':
-                            # print(horario)
-                            mg_time = horario
-                            soma = {'verde': catalogacao[par][horario]['verde'], 'vermelha': catalogacao[par]
-                                    [horario]['vermelha'], 'doji': catalogacao[par][horario]['doji']}
+        limites = np.concatenate([[0], np.cumsum([len(velas_por_par[par][0]) for par in pares])]).tolist()
+        quantidade = limites[-1]
+        fatias = [(limites[i], limites[i + 1], int(velas_por_par[par][1])) for i, par in enumerate(pares)]
+        grupos = [grupo.tolist() for grupo in np.array_split(np.arange(len(pares)), min(self.processos_de_agregacao, len(pares)))]
 
-                            for i in range(int(configuracoes['martingale'].split(' ')[0])):
+        if self.executor_de_agregacao is None:
+            # spawn: um fork do processo do bot herdaria travas(logging, cliente da IQ Option, Metricas)
+            # presas pelas threads da caixa de saída e do acompanhamento; spawn também existe em todas as plataformas
+            self.executor_de_agregacao = ProcessPoolExecutor(max_workers=self.processos_de_agregacao, mp_context=multiprocessing.get_context("spawn"))
 
-                                catalogacao[par][horario].update({'mg'+str(i+1): {'verde': 0, 'vermelha': 0, 'doji': 0, '%': 0}})
+        memoria = shared_memory.SharedMemory(create=True, size=quantidade * ArmazenamentoDeVelas.DTYPE.itemsize)
+        try:
+            velas = np.ndarray((quantidade,), dtype=ArmazenamentoDeVelas.DTYPE, buffer=memoria.buf)
+            for par, (inicio, fim, _) in zip(pares, fatias):
+                velas[inicio:fim] = velas_por_par[par][0]
+            del velas
+
+            futuros = [self.executor_de_agregacao.submit(Catalogador.agregar_velas_compartilhadas, memoria.name, quantidade, [fatias[i] for i in grupo], timeframe, gales) for grupo in grupos]
+            estatisticas = [resultado for futuro in futuros for resultado in futuro.result()]
+        except BrokenProcessPool as erro:
+            self.botManager.logging(f"{Fore.RED}[CATALOGAÇÃO]{Fore.RESET}", f"um processo da agregação morreu, agregando este ciclo no processo do bot: {erro}")
+            self.executor_de_agregacao.shutdown(wait=False, cancel_futures=True)
+            self.executor_de_agregacao = None
+            estatisticas = None
+        finally:
+            memoria.close()
+            memoria.unlink()
+
+        if estatisticas is None:
+            catalogacao = {}
+            for par in pares:
+                analise = self.analisar_velas(*velas_por_par[par])
+                catalogacao[par] = self.calcular_martingales(analise, timeframe, gales) if gales else analise
+        else:
+            catalogacao = {par: self.analise_das_estatisticas(estatisticas_do_par) for par, estatisticas_do_par in zip(pares, estatisticas)}
+
+        end_timer = time.time() #$ Contagem de Tempo | Final
+        self.botManager.logging(f"{Fore.GREEN}[CATALOGAÇÃO]{Fore.RESET}", f"{len(catalogacao)} ativos catalogados em {len(grupos)} processos | {dias} dias{Fore.LIGHTBLACK_EX}(demorou {abs(end_timer-start_timer)} segundos){Fore.RESET}")
+        return catalogacao
 
-                                # calcular horario do martingale, exemplo: '21:00'(mg0) --> '21:01'(mg1) --> '21:02'(mg2)
-                                mg_time = (datetime.strptime(f"{datetime.now():%Y-%m-%d} {mg_time}", '%Y-%m-%d %H:%M') + timedelta(minutes=int(configuracoes['timeframe'].split()[0]))).strftime('%H:%M')
+    def catalogar_operacoes(self,configuracoes):
+        ativos = self.botManager.ativos_abertos.obter()
+        start_time_all = time.time()
+        self.botManager.logging(f"{Fore.GREEN}[CATALOGAÇÃO]{Fore.RESET}", "catalogação iniciada pra filtrar novas operações...")
 
-                                
-                                if mg_time in catalogacao[par]:
-                                    catalogacao[par][horario]['mg'+str(i+1)]['verde'] += catalogacao[par][mg_time]['verde'] + soma['verde']
-                                    catalogacao[par][horario]['mg'+str(i+1)]['vermelha'] += catalogacao[par][mg_time]['vermelha'] + soma['vermelha']
-                                    catalogacao[par][horario]['mg'+str(i+1)]['doji'] += catalogacao[par][mg_time]['doji'] + soma['doji']
+        dias = int(configuracoes['periodo de catalogação em dias'].split(' ')[0])
+        timeframe = int(configuracoes['timeframe'].split(' ')[0])
+        pares = [par for par in ativos['digital'] if ativos['digital'][par]['open'] == True]
+        gales = int(configuracoes['martingale'].split(' ')[0]) if configuracoes['martingale'].strip() != '' else 0
+        hora = self.botManager.horario.now().hour if self.catalogacao_por_horario else None
 
-                                    catalogacao[par][horario]['mg'+str(i+1)]['%'] = round(100 * (catalogacao[par][horario]['mg'+str(i+1)]['verde' if catalogacao[par][horario]['dir'] == 'CALL' else 'vermelha'] / (
-                                        catalogacao[par][horario]['mg'+str(i+1)]['verde'] + catalogacao[par][horario]['mg'+str(i+1)]['vermelha'] + catalogacao[par][horario]['mg'+str(i+1)]['doji'])))
+        agregacao_em_processos = bool(self.processos_de_agregacao) and hora is None and self.catalogacao_vetorizada and not self.catalogacao_incremental
+
+        if agregacao_em_processos:
+            catalogacao = self.catalogar_ativos_em_processos(pares, dias, timeframe, gales)
+        elif self.busca_paralela:
+            catalogacao = self.catalogar_ativos_em_paralelo(pares, dias, timeframe, hora, gales)
+        else:
+            catalogacao = {}
+            for par in pares:
+                try:
+                    with self.metricas.cronometro("catalogacao_ativo_segundos", timeframe=f"M{timeframe}"):
+                        catalogacao.update({par: self.cataloga(par, dias, timeframe, hora=hora, gales=gales)})
+                except Exception as error:
+                    #print(f"@Catalogador | @Function catalogar_operacoes_rapidas(try/catch) | ocorreu um erro ao tentar usar catalogacao.update({...}) | @Error {error}")
+                    continue
+                    #raise Exception(f"@Catalogador | @Function catalogar_operacoes_rapidas(try/catch) | ocorreu um erro ao tentar usar catalogacao.update({...}) | @Error {error}")
 
-                                    soma['verde'] += catalogacao[par][mg_time]['verde']
-                                    soma['vermelha'] += catalogacao[par][mg_time]['vermelha']
-                                    soma['doji'] += catalogacao[par][mg_time]['doji']
-                                else:
-                                    catalogacao[par][horario]['mg' +
-                                                                str(i+1)]['%'] = 'N/A'
+        # a catalogação incremental e a agregação em processos já devolvem os martingales calculados
+        if gales and not agregacao_em_processos and not (hora is None and self.catalogacao_incremental and self.catalogacao_vetorizada):
+            for par in catalogacao:
+                catalogacao[par] = self.calcular_martingales(catalogacao[par], timeframe, gales)
 
         end_time_all = time.time()
+        self.metricas.observar("catalogacao_ciclo_segundos", end_time_all - start_time_all, timeframe=f"M{timeframe}")
         self.botManager.logging(f"{Fore.GREEN}[CATALOGAÇÃO]{Fore.RESET}", f"catalogação finalizada em todos ativos{Fore.LIGHTBLACK_EX}(demorou {abs(end_time_all-start_time_all)} segundos){Fore.RESET}")
         
-        catalogacao_organizada = self.organizar_catalogacao_por_horario(catalogacao)
+        catalogacao_organizada = self.organizar_catalogacao_por_horario(catalogacao, gales)
         return catalogacao_organizada
     
     def filtrar_lista_de_operacoes_por_horario(self,catalogacao_organizada, configuracoes):
         """
         Filtra as operações de acordo com o horário atual e período de uma hora.
 
+        O horário atual é lido uma única vez; a hora inteira de todos os ativos é filtrada de uma vez no
+        `CatalogoPorMinuto`(ver `CatalogoPorMinuto.filtrar`) e só os sinais aprovados viram dicionários.
+
         Args:
-            catalogacao_organizada (dict): Dicionário de catalogação organizado por horários.
+            catalogacao_organizada (CatalogoPorMinuto): Catálogo de `organizar_catalogacao_por_horario`.
             configuracoes (dict): Configurações para o filtro, incluindo parâmetros de martingale e assertividade.
 
         Returns:
-            list: Lista de operações filtradas no formato [{ativo: {horario: dados}}].
+            dict: {"hora_atual": 'HH:00', "proxima_hora": 'HH:00', "lista": [{ativo: {horario: dados}}]}, com a
+            lista em ordem de horário.
         """
         # Obter o horário atual
         agora = self.botManager.horario.now()
-        hora_atual = agora.strftime("%H:00")
-        minuto_atual = agora.minute
-
-        """# Verificar se o minuto é maior ou igual a 50
-        if minuto_atual >= 50:
-            print(f"Horário atual é {agora.strftime('%H:%M')}. Aguarde o próximo ciclo horário.")
-            return []"""
+        hora_atual = f"{agora.hour:02}:00"
 
         # Determinar o período de hora (exemplo: 14:00 - 15:00)
-        proxima_hora = (agora + timedelta(hours=1)).strftime("%H:00")
+        proxima_hora = f"{(agora.hour + 1) % 24:02}:00"
 
-        # Obter os dados do catálogo para o período atual
-        catalogo_horario_atual = catalogacao_organizada.get(hora_atual, {})
-        
-        lista_operacoes = []
-
-        for ativo, sinais in catalogo_horario_atual.items():
-            for horario, dados in sinais.items():
-                # Filtrar apenas os sinais após o horário atual
-                hora_sinal = datetime.strptime(f"{self.botManager.horario.now().strftime('%d/%m/%Y')} {horario}", "%d/%m/%Y %H:%M")
-                hora_sinal = self.botManager.horario.timezone.localize(hora_sinal)
-                if hora_sinal.timestamp() >= agora.timestamp():
-                    
-                    # Verificar assertividade com base nas configurações
-                    if configuracoes["martingale"] == "":
-                        if dados['%'] >= int(configuracoes['porcentagem de assertividade(nenhum martingale)'].replace('%', '')):
-                            lista_operacoes.append({ativo: {horario: dados}})
-                    elif configuracoes["martingale"] == "1 martingale":
-                        if dados['%'] >= int(configuracoes['porcentagem de assertividade(nenhum martingale)'].replace('%', '')) and \
-                        dados['mg1']['%'] >= int(configuracoes['porcentagem de assertividade(1 martingale)'].replace('%', '')):
-                            lista_operacoes.append({ativo: {horario: dados}})
-                    elif configuracoes["martingale"] == "2 martingale":
-                        if dados['%'] >= int(configuracoes['porcentagem de assertividade(nenhum martingale)'].replace('%', '')) and \
-                        dados['mg1']['%'] >= int(configuracoes['porcentagem de assertividade(1 martingale)'].replace('%', '')) and \
-                        dados['mg2']['%'] >= int(configuracoes['porcentagem de assertividade(2 martingale)'].replace('%', '')):
-                            lista_operacoes.append({ativo: {horario: dados}})
+        # Filtrar apenas os sinais a partir do horário atual
+        primeiro_minuto = self.minuto_inicial_do_filtro(agora)
+
+        # Assertividade mínima do horário e de cada martingale, com base nas configurações
+        chaves = ['porcentagem de assertividade(nenhum martingale)', 'porcentagem de assertividade(1 martingale)', 'porcentagem de assertividade(2 martingale)']
+        gales = int(configuracoes['martingale'].split(' ')[0]) if configuracoes['martingale'].strip() != '' else 0
+        limites = [int(configuracoes[chave].replace('%', '')) for chave in chaves[:gales + 1]]
+
+        ativos, minutos = catalogacao_organizada.filtrar(agora.hour, primeiro_minuto, limites)
+        lista_operacoes = catalogacao_organizada.sinais(ativos, minutos)
 
         self.botManager.logging(f"{Fore.GREEN}[CATALOGAÇÂO]{Fore.RESET}", f"Operações filtradas entre {hora_atual} e {proxima_hora}: {len(lista_operacoes)} encontradas.")
         return {"hora_atual": hora_atual, "proxima_hora": proxima_hora ,"lista":lista_operacoes}
     
+    def minuto_inicial_do_filtro(self, agora):
+        """Primeiro minuto do dia em que um sinal ainda é válido(o do minuto atual só no segundo 0)."""
+        return agora.hour * 60 + agora.minute + (1 if agora.second or agora.microsecond else 0)
+
     def ordenar_lista(self,lista, timeframe=1):
         """
         Ordena e filtra operações para garantir que haja um intervalo mínimo entre elas.
         
         Args:
             lista (list): Lista de operações no formato [{'ativo': {'horario': dados}}, ...].
-            timeframe (int): Timeframe em minutos. O intervalo mínimo entre operações será timeframe * 60 segundos.
+            timeframe (int): Timeframe em minutos. O intervalo mínimo entre operações será timeframe*4 minutos.
         
         Returns:
             list: Lista filtrada e ordenada de operações.
         """
         # Converter o timeframe para o intervalo mínimo em minutos
-        intervalo_minimo = ((timeframe*4) * 60)
+        intervalo_minimo = timeframe * 4
         
-        # Criar uma lista de operações com horários convertidos para datetime
+        # Criar uma lista de operações com o minuto do dia de cada horário(sem converter para datetime)
         operacoes_formatadas = []
         for operacao in lista:
             for ativo, dados in operacao.items():
                 for horario, detalhes in dados.items():
-                    # Converter o horário em datetime para facilitar a comparação
-                    horario_completo = datetime.strptime(f"{datetime.now().strftime('%d/%m/%Y')} {horario}", "%d/%m/%Y %H:%M")
-                    operacoes_formatadas.append({'ativo': ativo, 'horario': horario_completo, 'dados': detalhes})
+                    operacoes_formatadas.append((self.MINUTO_DO_HORARIO[horario], ativo, horario, detalhes))
         
-        # Ordenar as operações pelo horário
-        operacoes_formatadas.sort(key=lambda x: x['horario'])
+        # Ordenar as operações pelo horário(estável: no mesmo horário mantém a ordem da lista)
+        operacoes_formatadas.sort(key=lambda x: x[0])
         
         # Filtrar operações para garantir o intervalo mínimo
-        lista_filtrada = []
-        ultimo_horario = None
-        
-        for operacao in operacoes_formatadas:
-            if ultimo_horario is None or (operacao['horario'] - ultimo_horario).total_seconds() >= intervalo_minimo:
-                lista_filtrada.append(operacao)
-                ultimo_horario = operacao['horario']
-        
-        # Converter de volta para o formato original
         lista_resultado = []
-        for operacao in lista_filtrada:
-            lista_resultado.append({
-                operacao['ativo']: {
-                    operacao['horario'].strftime('%H:%M'): operacao['dados']
-                }
-            })
+        ultimo_minuto = None
+        
+        for minuto, ativo, horario, detalhes in operacoes_formatadas:
+            if ultimo_minuto is None or minuto - ultimo_minuto >= intervalo_minimo:
+                lista_resultado.append({ativo: {horario: detalhes}})
+                ultimo_minuto = minuto
         
         return lista_resultado
 
+    def quantidade_de_operacoes_espacadas(self, minutos, timeframe=1):
+        """Quantas operações `ordenar_lista` mantém para sinais nos `minutos` do dia(em ordem crescente)."""
+        quantidade, ultimo_minuto = 0, None
+        for minuto in minutos:
+            if ultimo_minuto is None or minuto - ultimo_minuto >= timeframe * 4:
+                quantidade, ultimo_minuto = quantidade + 1, minuto
+        return quantidade
+
+    def atualizar_estados(self, pares, dias, timeframe):
+        """
+        Atualiza o EstadoDaCatalogacao de cada ativo(em paralelo, com `busca_paralela`) sem montar a análise.
+
+        Returns:
+            dict: {par: (estado, dia_da_vela_aberta, contagem_da_vela_aberta)}, sem os ativos com erro.
+        """
+        if self.busca_paralela:
+            return self.catalogar_ativos_em_paralelo(pares, dias, timeframe, funcao=self.atualizar_estado_da_catalogacao)
+
+        estados = {}
+        for par in pares:
+            try:
+                estados[par] = self.atualizar_estado_da_catalogacao(par, dias, timeframe)
+            except Exception:
+                continue
+        return estados
+
+    def varrer_configuracoes(self):
+        """
+        Avalia de uma vez todas as combinações de OPCOES_DE_CONFIGURACAO(timeframe, dias e porcentagens
+        mínimas) para a hora atual, em vez de sortear uma configuração e catalogar tudo de novo quando a
+        lista sai pequena.
+
+        Por timeframe, o estado de cada ativo é atualizado uma única vez(com o maior período) e as somas de
+        prefixo por dia(`EstadoDaCatalogacao.somas_acumuladas`) dão as contagens de todos os períodos. '%',
+        direção e mg1..mgN são as mesmas contas de `estatisticas_dos_minutos` e `martingales_dos_minutos`,
+        vetorizadas em (ativos, dias, minutos da hora), e cada conjunto de porcentagens é só mais uma máscara.
+
+        Returns:
+            tuple: (configuracoes, resultados, estados): a configuração escolhida(sorteada entre as que chegam
+            a `minimo_de_operacoes` operações, ou a de mais operações), uma lista com
+            {'configuracoes', 'sinais', 'operacoes'} de cada combinação e os estados dos ativos por timeframe.
+        """
+        base = self.gerar_configuracao_aleatoria({})
+        gales = int(base['martingale'].split(' ')[0]) if base['martingale'].strip() != '' else 0
+        opcoes = self.OPCOES_DE_CONFIGURACAO
+        dias = np.array([int(opcao.split(' ')[0]) for opcao in opcoes["periodo de catalogação em dias"]])
+        chaves_dos_limites = ['porcentagem de assertividade(nenhum martingale)', 'porcentagem de assertividade(1 martingale)', 'porcentagem de assertividade(2 martingale)'][:gales + 1]
+
+        ativos = self.botManager.ativos_abertos.obter()
+        pares = [par for par in ativos['digital'] if ativos['digital'][par]['open'] == True]
+
+        agora = self.botManager.horario.now()
+        minutos = np.arange(agora.hour * 60, agora.hour * 60 + 60)
+        valido = minutos >= self.minuto_inicial_do_filtro(agora)
+
+        resultados, estados_por_timeframe = [], {}
+        for opcao_de_timeframe in opcoes["timeframe"]:
+            timeframe = int(opcao_de_timeframe.split(' ')[0])
+            estados = self.atualizar_estados(pares, int(dias.max()), timeframe)
+            estados_por_timeframe[timeframe] = estados
+
+            # contagens (ativos, dias, gale, minuto, cor): gale 0 é o próprio horário, gale k o horário + timeframe*k
+            colunas = (minutos[None, :] + timeframe * np.arange(gales + 1)[:, None]) % 1440
+            somas = []
+            for estado, dia_da_vela_aberta, contagem_da_vela_aberta in estados.values():
+                acumuladas = estado.somas_acumuladas(colunas, dia_da_vela_aberta, contagem_da_vela_aberta)
+                if len(acumuladas):
+                    somas.append(acumuladas[np.minimum(dias, len(acumuladas)) - 1])
+            contagens = np.stack(somas) if somas else np.zeros((0, len(dias), gales + 1, len(minutos), 3), dtype=np.int64)
+
+            horario = contagens[:, :, 0]
+            total = horario.sum(axis=-1)
+            catalogado = total > 0
+            percentual_verde = np.rint(100 * (horario[..., 0] / np.maximum(total, 1)))
+            porcentagens = [np.where(percentual_verde < 50, 100 - percentual_verde, percentual_verde)]
+            coluna_da_direcao = np.where(percentual_verde > 50, 0, 1)
+
+            soma = horario.copy()
+            for k in range(1, gales + 1):
+                existe = contagens[:, :, k].sum(axis=-1) > 0
+                soma = soma + contagens[:, :, k] * existe[..., None]
+                mg = np.where(existe[..., None], soma, 0)
+                acertos = np.take_along_axis(mg, coluna_da_direcao[..., None], axis=-1)[..., 0]
+                porcentagens.append(np.where(existe, np.rint(100 * (acertos / np.maximum(mg.sum(axis=-1), 1))), -1))
+
+            for limites in itertools.product(*(opcoes[chave] for chave in chaves_dos_limites)):
+                selecionado = catalogado & valido
+                for porcentagem, limite in zip(porcentagens, limites):
+                    selecionado = selecionado & (porcentagem >= int(limite.replace('%', '')))
+                sinais = selecionado.sum(axis=(0, 2))
+                com_sinal = selecionado.any(axis=0)
+
+                for i, opcao_de_dias in enumerate(opcoes["periodo de catalogação em dias"]):
+                    configuracoes = dict(base)
+                    configuracoes.update(zip(chaves_dos_limites, limites))
+                    configuracoes.update({"timeframe": opcao_de_timeframe, "periodo de catalogação em dias": opcao_de_dias})
+                    resultados.append({"configuracoes": configuracoes, "sinais": int(sinais[i]), "operacoes": self.quantidade_de_operacoes_espacadas(minutos[com_sinal[i]].tolist())})
+
+            contagem = ", ".join(f"{r['configuracoes']['periodo de catalogação em dias']} {'/'.join(r['configuracoes'][chave] for chave in chaves_dos_limites)}: {r['sinais']}({r['operacoes']})" for r in resultados if r['configuracoes']['timeframe'] == opcao_de_timeframe)
+            self.botManager.logging(f"{Fore.GREEN}[VARREDURA]{Fore.RESET}", f"M{timeframe} sinais(operações) por configuração: {contagem}")
+
+        atendem = [resultado for resultado in resultados if resultado["operacoes"] >= self.minimo_de_operacoes]
+        escolhido = random.choice(atendem) if atendem else max(resultados, key=lambda resultado: resultado["operacoes"])
+        self.botManager.logging(f"{Fore.GREEN}[VARREDURA]{Fore.RESET}", f"{len(atendem)} de {len(resultados)} configurações com {self.minimo_de_operacoes} operações ou mais, escolhida: {escolhido['configuracoes']['timeframe']}, {escolhido['configuracoes']['periodo de catalogação em dias']}, {'/'.join(escolhido['configuracoes'][chave] for chave in chaves_dos_limites)}({escolhido['operacoes']} operações)")
+        return escolhido["configuracoes"], resultados, estados_por_timeframe
+
+    def catalogacao_da_varredura(self, estados, configuracoes):
+        """
+        Monta o CatalogoPorMinuto da configuração escolhida em `varrer_configuracoes` direto dos estados já
+        atualizados(sem buscar velas de novo), só com os horários da hora atual.
+        """
+        dias = int(configuracoes['periodo de catalogação em dias'].split(' ')[0])
+        timeframe = int(configuracoes['timeframe'].split(' ')[0])
+        gales = int(configuracoes['martingale'].split(' ')[0]) if configuracoes['martingale'].strip() != '' else 0
+        hora = self.botManager.horario.now().hour
+        minutos_da_hora = np.arange(hora * 60, hora * 60 + 60)
+
+        catalogacao = {}
+        for par, (estado, dia_da_vela_aberta, contagem_da_vela_aberta) in estados.items():
+            acumuladas = estado.somas_acumuladas(np.arange(1440), dia_da_vela_aberta, contagem_da_vela_aberta)
+            if not len(acumuladas):
+                continue
+            contagens = acumuladas[min(dias, len(acumuladas)) - 1]
+            catalogado = contagens.sum(axis=1) > 0
+            minutos = minutos_da_hora[catalogado[minutos_da_hora]]
+
+            estatisticas = self.estatisticas_dos_minutos(contagens, minutos) if len(minutos) else []
+            if gales and len(minutos):
+                coluna_da_direcao = np.array([0 if dados['dir'] == 'CALL' else 1 for dados in estatisticas])
+                for dados, martingales in zip(estatisticas, self.martingales_dos_minutos(contagens, catalogado, minutos, coluna_da_direcao, timeframe, gales)):
+                    dados.update(martingales)
+            catalogacao[par] = dict(zip((self.HORARIOS[m] for m in minutos.tolist()), estatisticas))
+
+        return self.organizar_catalogacao_por_horario(catalogacao, gales)
+
     def gerar_lista(self):
-        configuracoes = self.gerar_configuracao_aleatoria({})
-        catalogacao = self.catalogar_operacoes(configuracoes)
-        lista_dicionario = self.filtrar_lista_de_operacoes_por_horario(catalogacao, configuracoes) 
-        lista = self.ordenar_lista(lista_dicionario["lista"]) 
+        if self.varredura_de_configuracoes:
+            with self.metricas.cronometro("varredura_segundos"):
+                configuracoes, _, estados = self.varrer_configuracoes()
+                catalogacao = self.catalogacao_da_varredura(estados[int(configuracoes['timeframe'].split(' ')[0])], configuracoes)
+        else:
+            configuracoes = self.gerar_configuracao_aleatoria({})
+            catalogacao = self.catalogar_operacoes(configuracoes)
+        with self.metricas.cronometro("filtro_segundos"):
+            lista_dicionario = self.filtrar_lista_de_operacoes_por_horario(catalogacao, configuracoes) 
+        with self.metricas.cronometro("ordenacao_segundos"):
+            lista = self.ordenar_lista(lista_dicionario["lista"]) 
         return {"hora_atual": lista_dicionario["hora_atual"], "proxima_hora": lista_dicionario["proxima_hora"] ,"lista": lista}
 
 
-    def checar_ativo_aberto_na_iqoption(self, ativo):
+    def checar_ativo_aberto_na_iqoption(self, ativo, forcar=False):
         try:
-            ativos = self.botManager.api_iqoption.get_all_open_time()
-            if ativos['digital'][ativo]['open']:
-                return True
-            else:
-                return False
+            return self.botManager.ativos_abertos.esta_aberto(ativo, 'digital', forcar)
         except:
             return False
 
-    def sendPhoto(self, nome_da_imagem, operacao, resultado, aguardando_martingale=0):
-        self.botManager.api_telegram.send_photo(
-            chat_id=self.botManager.id_grupo_telegram, 
-            photo=open(f'temporary images/{nome_da_imagem}', 'rb'), 
-            caption=self.botManager.messageString.resultado_da_operacao_string(operacao=operacao,resultado=resultado, aguardando_martingale=aguardando_martingale)
+    def sendPhoto(self, imagem, operacao, tipo, martingale, aguardando_martingale=0):
+        messageString = self.botManager.messageString
+        self.botManager.enviar_foto(
+            imagem, 
+            lambda grupo: messageString.resultado_da_operacao_string(operacao=operacao, resultado=messageString.resultado_string(tipo, martingale, operacao, grupo), aguardando_martingale=aguardando_martingale, grupo=grupo)
         )
     def sendStick(self, resultado_atual, tipo):
         if tipo == "win":
@@ -647,234 +2805,332 @@ class Catalogador:
                 sticker_path = 'sticks/win-sem-gale.webp'
             else:  # Para '1° Martingale' ou '2° Martingale'
                 sticker_path = 'sticks/win-no-gale.webp'
-            self.botManager.api_telegram.send_sticker(chat_id=self.botManager.id_grupo_telegram, sticker=open(sticker_path, 'rb'))
-        
-        if tipo == "loss":
+        elif tipo == "loss":
             sticker_path = 'sticks/loss.webp'
-            self.botManager.api_telegram.send_sticker(chat_id=self.botManager.id_grupo_telegram, sticker=open(sticker_path, 'rb'))
-
-        if tipo == "doji":
+        elif tipo == "doji":
             sticker_path = 'sticks/doji.webp'
-            self.botManager.api_telegram.send_sticker(chat_id=self.botManager.id_grupo_telegram, sticker=open(sticker_path, 'rb'))                           
+        else:
+            return
+
+        # upload só na primeira vez, depois o sticker é enviado pelo file_id
+        for grupo in self.botManager.grupos:
+            self.botManager.cache_de_midia.enviar_arquivo(self.botManager.caixa_de_saida, 'send_sticker', grupo["chat_id"], sticker_path, 'sticker')
 
-    def acompanhar_operacoes(self, lista, timeframe=1):
+    def acompanhar_operacoes(self, lista, timeframe=1, etapas=None):
+        """
+        Acompanha todos os sinais da lista ao mesmo tempo. Cada sinal vira uma sequência de tarefas
+        agendadas(aviso, entrada e verificação de cada gale) em um AcompanhadorDeSinais, então sinais
+        próximos não atrasam uns aos outros. O resultado de cada sinal é gravado em
+        signal[ativo][horario]["resultado"].
+
+        A próxima etapa de cada sinal fica registrada no PontoDeRestauracao do bot; com `etapas`(as pendentes
+        de um checkpoint) só essas etapas são agendadas, retomando o acompanhamento interrompido.
+
+        Returns:
+            list: A mesma lista, com os resultados preenchidos.
+        """
+        acompanhador = AcompanhadorDeSinais(self.botManager, self.workers_do_acompanhamento)
+        pendentes = {(etapa["ativo"], etapa["horario"]): etapa for etapa in etapas} if etapas is not None else None
         for signal in lista:
             for ativo in signal:
                 for horario in signal[ativo]:
-                    ativo_operacao = ativo
-                    horario_operacao = horario
-                    direcao_operacao = signal[ativo][horario]["dir"].strip()
-                    timeframe_operacao = timeframe
-                    operacao = {"ativo":ativo_operacao, "horario":horario_operacao, "timeframe":f"M{timeframe_operacao}", "dir":direcao_operacao}
-
-                    if self.botManager.horario.horario_valido(horario):
-                        if self.checar_ativo_aberto_na_iqoption(ativo):
-                            # aguardando operação
-                            self.botManager.api_telegram.send_message(self.botManager.id_grupo_telegram, self.botManager.messageString.awaiting_operation_string(operacao))
-                            
-                            # aguardar horario da operação
-                            self.botManager.horario.aguardar_horario(horario_operacao)
-
-                            # operação realizada 
-                            self.botManager.api_telegram.send_message(self.botManager.id_grupo_telegram, self.botManager.messageString.operacao_realizada_string(operacao))
-
-                            resultados = ['Nenhum Martingale', '1° Martingale', '2° Martingale']
-                            for i, resultado_atual in enumerate(resultados):
-                                # Espera o tempo apropriado
-                                time.sleep(timeframe_operacao * 60)
-                                
-
-                                timestamp_operacao = self.botManager.horario.timestamp(horario_operacao, deslocamento_minutos=timeframe_operacao * i)
-
-                                vela = self.botManager.api_iqoption.get_candles(ativo_operacao, timeframe_operacao * 60, 1, timestamp_operacao)[0]
-                                cor = 'vermelha' if vela['open'] > vela['close'] else 'verde' if vela['open'] < vela['close'] else 'doji'
-                                velas = self.botManager.api_iqoption.get_candles(ativo_operacao, timeframe_operacao*60, 15, timestamp_operacao)
-
-                                if cor != 'doji':
-                                   
-                                    if (cor == 'vermelha' and direcao_operacao == 'PUT') or (cor == 'verde' and direcao_operacao == 'CALL'):
-                                        resultado = 'win'
-                                    elif (cor == 'vermelha' and direcao_operacao == 'CALL') or (cor == 'verde' and direcao_operacao == 'PUT'):
-                                        resultado = 'loss'
-                                    else:
-                                        resultado = ''
-
-                                    if resultado == 'win':
-                                        
-                                        # 1. gerar imagem
-                                        nome_da_imagem = self.gerar_imagem(velas=velas, titulo=ativo_operacao, subtitulo=f'Win +R$({resultado_atual})')
-                                        
-                                        # 2. enviando imagem com mensagem de win(+R$)
-                                        self.sendPhoto(nome_da_imagem, operacao, f'<b>Win +R$({resultado_atual})</b>')
-                                        
-                                        # 3. enviar stick de "win"
-                                        self.sendStick(resultado_atual, 'win')
-
-                                        # 3. excluir Imagem
-                                        self.excluir_imagem(nome_da_imagem)
-
-                                        # 4. adicionar win na lista pra mostrar resultado depois
-                                        signal[ativo_operacao][horario_operacao]["resultado"] = {"status":"win", "message":f"<b>Win +R$({resultado_atual})</b>", "martingale":i}
-                                        
-                                        break  # Parar o loop se o resultado for 'win'
-
-                                    elif resultado == 'loss':
-                                        # 1. gerar imagem
-                                        nome_da_imagem = self.gerar_imagem(velas=velas, titulo=ativo_operacao, subtitulo=f'Loss -R$({resultado_atual})')
-                                        
-                                        
-                                        # 2. enviar mensagem de loss(-R$) com a imagem gerada
-                                        self.sendPhoto(nome_da_imagem, operacao, f'<b>Loss -R$({resultado_atual})</b>', aguardando_martingale=i+1)
-                                                                                
-                                        # 3. excluir imagem
-                                        self.excluir_imagem(nome_da_imagem)
-
-                                        # 4. enviar stick
-                                        if resultado_atual == "2° Martingale":
-                                            self.sendStick(resultado_atual, 'loss')
-                                            
-                                            # 4. adicionar loss na lista pra mostrar resultado depois
-                                            signal[ativo_operacao][horario_operacao]["resultado"] = {"status":"loss", "message":f"<b>Loss -R$({resultado_atual})</b>", "martingale":i}
-                                        
-
-                                            
-                                        
-                                        
-
-                                else:  # Se for um DOJI
-                                    if resultado_atual == '2° Martingale':
-                                        # 1. gerar imagem
-                                        nome_da_imagem = self.gerar_imagem(velas=velas, titulo=ativo_operacao, subtitulo=f'DOJI detectado ({resultado_atual})')
-
-                                        # 2. enviar imagem com a mensage 
-                                        self.sendPhoto(nome_da_imagem, operacao, f'🔍 DOJI detectado no ativo <i>{ativo_operacao}</i>') 
-                                        
-                                        # 3. enviar stick
-                                        self.sendStick(resultado_atual, 'doji')
-
-                                        # 4. excluir imagem
-                                        self.excluir_imagem(nome_da_imagem)
-
-                                        
-                                        # 4. adicionar resultado na lista pra mostrar resultado depois
-                                        signal[ativo_operacao][horario_operacao]["resultado"] = {"status":"doji", "message":f"<b>DOJI detectado({resultado_atual})</b>", "martingale":i}
-                                        
-                                        
-                                        time.sleep(10)
-
-                                        break  # Finalizar porque atingiu o limite de martingale
-                                    else:
-                                        # 1. gerar imagem
-                                        nome_da_imagem = self.gerar_imagem(velas=velas, titulo=ativo_operacao, subtitulo=f'DOJI detectado ({resultado_atual})')
-
-                                        # 2. enviar imagem 
-                                        self.sendPhoto(nome_da_imagem, operacao, f'🔍 DOJI detectado no ativo <i>{ativo_operacao}</i>', aguardando_martingale=i+1)
-                                        
-                                        # 3. enviar stick
-                                        self.sendStick(resultado_atual, 'doji')
-
-                                        # 4. excluir imagem
-                                        self.excluir_imagem(nome_da_imagem)
-                                        
-                                        time.sleep(10)
-                                        continue  # Continuar para o próximo gale
-                                
+                    operacao = {"ativo":ativo, "horario":horario, "timeframe":f"M{timeframe}", "dir":signal[ativo][horario]["dir"].strip()}
+                    if pendentes is None:
+                        inicio = self.botManager.horario.timestamp(horario)
+                        self.agendar_etapa(acompanhador, inicio - self.antecedencia_do_aviso, self.avisar_operacao, signal, operacao, timeframe, inicio, gravar=False)
+                    elif (ativo, horario) in pendentes:
+                        self.retomar_etapa(acompanhador, pendentes[(ativo, horario)], signal, operacao, timeframe)
+        self.botManager.ponto_de_restauracao.gravar_com_trava()
+
+        acompanhador.executar()
+        return lista
 
-                        else:
-                            # ativo fechado
-                            self.botManager.api_telegram.send_message(self.botManager.id_grupo_telegram, self.botManager.messageString.active_closed_string(operacao))
+    def agendar_etapa(self, acompanhador, timestamp, funcao, signal, operacao, timeframe, inicio, gale=None, gravar=True):
+        """Agenda a próxima etapa do sinal no acompanhador e registra no PontoDeRestauracao."""
+        self.botManager.ponto_de_restauracao.agendar(operacao, funcao.__name__, timestamp, inicio, gale or 0, gravar)
+        argumentos = (acompanhador, signal, operacao, timeframe, inicio) + ((gale,) if gale is not None else ())
+        acompanhador.agendar(timestamp, funcao, *argumentos)
+
+    def retomar_etapa(self, acompanhador, etapa, signal, operacao, timeframe):
+        """Agenda de novo uma etapa lida do checkpoint(no mesmo prazo; se já passou, imediatamente)."""
+        funcao = getattr(self, etapa["etapa"])
+        gale = etapa["gale"] if funcao == self.verificar_resultado else None
+        if gale is not None and self.verificacao_por_stream:
+            # a inscrição no stream era feita no realizar_operacao, que não roda de novo
+            self.botManager.fluxo_de_velas.inscrever(operacao["ativo"], timeframe)
+        self.agendar_etapa(acompanhador, etapa["prazo"], funcao, signal, operacao, timeframe, etapa["inicio"], gale, gravar=False)
+
+    def avisar_operacao(self, acompanhador, signal, operacao, timeframe, inicio):
+        """Valida o sinal, envia o 'Aguardando Operação' e agenda a entrada."""
+        if not self.botManager.horario.horario_valido(operacao["horario"]):
+            # horario da operacao expirado
+            self.botManager.enviar_mensagem(lambda grupo: self.botManager.messageString.time_has_expired_string(operacao, grupo))
+            self.botManager.ponto_de_restauracao.concluir(operacao)
+            return
+
+        if not self.checar_ativo_aberto_na_iqoption(operacao["ativo"]):
+            # ativo fechado
+            self.botManager.enviar_mensagem(lambda grupo: self.botManager.messageString.active_closed_string(operacao, grupo))
+            self.botManager.ponto_de_restauracao.concluir(operacao)
+            return
+
+        # aguardando operação
+        self.botManager.enviar_mensagem(lambda grupo: self.botManager.messageString.awaiting_operation_string(operacao, grupo))
+        self.agendar_etapa(acompanhador, inicio, self.realizar_operacao, signal, operacao, timeframe, inicio)
+
+    def realizar_operacao(self, acompanhador, signal, operacao, timeframe, inicio):
+        """Envia o 'Operação Realizada' no horário da entrada e agenda a verificação da primeira vela."""
+        self.botManager.enviar_mensagem(lambda grupo: self.botManager.messageString.operacao_realizada_string(operacao, grupo))
+        if self.verificacao_por_stream:
+            self.botManager.fluxo_de_velas.inscrever(operacao["ativo"], timeframe)
+        self.agendar_etapa(acompanhador, self.prazo_da_verificacao(inicio, timeframe, 0), self.verificar_resultado, signal, operacao, timeframe, inicio, 0)
+
+    def prazo_da_verificacao(self, inicio, timeframe, i):
+        """Horário para verificar a vela da entrada(i=0) ou do i° martingale. No modo stream a verificação
+        começa no fechamento da vela e espera o stream; no modo normal espera a margem_de_verificacao."""
+        margem = 0 if self.verificacao_por_stream else self.margem_de_verificacao
+        return inicio + timeframe * 60 * (i + 1) + margem
+
+    def verificar_resultado(self, acompanhador, signal, operacao, timeframe, inicio, i):
+        """Verifica a vela da entrada(i=0) ou do i° martingale, envia o resultado e agenda o próximo gale, se houver."""
+        proximo_gale = False
+        try:
+            proximo_gale = self.processar_resultado(signal, operacao, timeframe, inicio, i)
+        finally:
+            # sinal encerrado: sair do stream do ativo
+            if self.verificacao_por_stream and not proximo_gale:
+                self.botManager.fluxo_de_velas.cancelar(operacao["ativo"], timeframe)
+
+        if proximo_gale:
+            self.agendar_etapa(acompanhador, self.prazo_da_verificacao(inicio, timeframe, i + 1), self.verificar_resultado, signal, operacao, timeframe, inicio, i + 1)
+        else:
+            self.botManager.ponto_de_restauracao.concluir(operacao, signal[operacao["ativo"]][operacao["horario"]].get("resultado"))
+
+    def processar_resultado(self, signal, operacao, timeframe, inicio, i):
+        """Busca a vela do resultado, envia o resultado do sinal e retorna True se ainda houver um próximo gale."""
+        resultados = ['Nenhum Martingale', '1° Martingale', '2° Martingale']
+        resultado_atual = resultados[i]
+        ativo_operacao, horario_operacao, direcao_operacao = operacao["ativo"], operacao["horario"], operacao["dir"]
+
+        timestamp_operacao = inicio + timeframe * 60 * i
+        velas = None
+        if self.verificacao_por_stream:
+            velas = self.botManager.fluxo_de_velas.aguardar_fechamento(ativo_operacao, timeframe, timestamp_operacao)
+
+        if velas is None or len(velas) < 15:
+            # vela do resultado + janela do gráfico em uma única busca(reaproveitando as velas dos gales anteriores)
+            velas = self.botManager.velas_recentes.obter(ativo_operacao, timeframe, timestamp_operacao, 15)
+        vela = velas[-1]
+        cor = 'vermelha' if vela['open'] > vela['close'] else 'verde' if vela['open'] < vela['close'] else 'doji'
+
+        proximo_gale = False
+        if cor != 'doji':
+            if (cor == 'vermelha' and direcao_operacao == 'PUT') or (cor == 'verde' and direcao_operacao == 'CALL'):
+                # 1. gerar imagem
+                imagem = self.gerar_imagem(velas=velas, titulo=ativo_operacao, subtitulo=f'Win +R$({resultado_atual})')
+
+                # 2. enviando imagem com mensagem de win(+R$)
+                self.sendPhoto(imagem, operacao, 'win', i)
+
+                # 3. enviar stick de "win"
+                self.sendStick(resultado_atual, 'win')
+
+                # 4. adicionar win na lista pra mostrar resultado depois
+                signal[ativo_operacao][horario_operacao]["resultado"] = {"status":"win", "message":f"<b>Win +R$({resultado_atual})</b>", "martingale":i}
+            else:
+                # 1. gerar imagem
+                imagem = self.gerar_imagem(velas=velas, titulo=ativo_operacao, subtitulo=f'Loss -R$({resultado_atual})')
 
-                            
-                        
-                    else:
-                        # horario da operacao expirado
-                        self.botManager.api_telegram.send_message(self.botManager.id_grupo_telegram, self.botManager.messageString.time_has_expired_string(operacao))
+                # 2. enviar mensagem de loss(-R$) com a imagem gerada
+                self.sendPhoto(imagem, operacao, 'loss', i, aguardando_martingale=i+1)
 
-        return lista
+                # 3. enviar stick e adicionar loss na lista pra mostrar resultado depois
+                if resultado_atual == "2° Martingale":
+                    self.sendStick(resultado_atual, 'loss')
+                    signal[ativo_operacao][horario_operacao]["resultado"] = {"status":"loss", "message":f"<b>Loss -R$({resultado_atual})</b>", "martingale":i}
+                else:
+                    proximo_gale = True
+
+        else:  # Se for um DOJI
+            # 1. gerar imagem
+            imagem = self.gerar_imagem(velas=velas, titulo=ativo_operacao, subtitulo=f'DOJI detectado ({resultado_atual})')
+
+            # 2. enviar imagem com a mensagem
+            if resultado_atual == '2° Martingale':
+                self.sendPhoto(imagem, operacao, 'doji', i)
+            else:
+                self.sendPhoto(imagem, operacao, 'doji', i, aguardando_martingale=i+1)
+
+            # 3. enviar stick
+            self.sendStick(resultado_atual, 'doji')
+
+            # 4. adicionar resultado na lista pra mostrar resultado depois(limite de martingale atingido)
+            if resultado_atual == '2° Martingale':
+                signal[ativo_operacao][horario_operacao]["resultado"] = {"status":"doji", "message":f"<b>DOJI detectado({resultado_atual})</b>", "martingale":i}
+            else:
+                proximo_gale = True
+
+        return proximo_gale
 
 class BotManager:
-    def __init__(self):
+    def __init__(self, horario=None, api_telegram=None):
+        """`horario` e `api_telegram` permitem trocar o relógio e o Telegram(ex.: no replay.py)."""
         self.email_iqoption = os.getenv("EMAIL_IQOPTION")
         self.senha_iqoption = os.getenv("SENHA_IQOPTION")
         self.token_telegram_bot = os.getenv("TOKEN_TELEGRAM_BOT")
-        self.id_grupo_telegram = os.getenv("ID_GRUPO_TELEGRAM")
 
-        self.api_telegram = telebot.TeleBot(self.token_telegram_bot, parse_mode='HTML')
+        # relógio do bot: horários das mensagens, dos logs e das esperas
+        self.horario = horario or Horario()
+
+        # uma catalogação e um acompanhamento para todos os grupos; id_grupo_telegram é o primeiro deles
+        self.grupos = self.carregar_grupos()
+        self.id_grupo_telegram = self.grupos[0]["chat_id"] if self.grupos else None
+
+        # porta local do /metrics(Prometheus) e /metrics.json; sem ela o servidor de métricas não é iniciado
+        self.porta_metricas = int(os.getenv("PORTA_METRICAS")) if os.getenv("PORTA_METRICAS") else None
+        self.metricas = Metricas()
+
+        # endereço alternativo da Bot API(ex.: um servidor local para testes), no formato do telebot: ".../bot{0}/{1}"
+        if os.getenv("TELEGRAM_API_URL"):
+            telebot.apihelper.API_URL = os.getenv("TELEGRAM_API_URL")
+
+        self.api_telegram = api_telegram or telebot.TeleBot(self.token_telegram_bot, parse_mode='HTML')
+        self.caixa_de_saida = CaixaDeSaida(self)
+        self.cache_de_midia = CacheDeMidia()
         self.api_iqoption = None
 
+        # checkpoints da lista em acompanhamento e da catalogação, para retomar depois de uma queda
+        self.ponto_de_restauracao = PontoDeRestauracao(self, os.getenv("DIRETORIO_CHECKPOINT", 'checkpoint'))
+
         self.messageString = MessageString(self)
 
-        self.horario = Horario()
+        self.ativos_abertos = AtivosAbertos(self, ttl=60)
+        self.velas_recentes = VelasRecentes(self)
+        self.fluxo_de_velas = FluxoDeVelas(self)
+
+        # o cliente da IQ Option guarda a resposta do get_candles() em um estado compartilhado
+        self.trava_iqoption = threading.Lock()
 
         self.catalogador = Catalogador(self)
+        # os workers tentam conectar poucas vezes: o tempo limite por ativo não interrompe um login travado
+        self.catalogador.fabrica_de_conexoes = lambda: self.criar_conexao_iqoption(tentativas=self.catalogador.tentativas_de_conexao)
         
-    def criar_pasta_de_imagens(self):
+    def carregar_grupos(self):
         """
-        Verifica se a pasta 'machinelearning/temporary images' existe,
-        e caso não exista, cria a pasta.
+        Grupos do Telegram que recebem os sinais. GRUPOS_TELEGRAM aponta para um JSON com
+        [{"chat_id": ..., "cabecalho": ..., "idioma": "pt" ou "en"}, ...]; sem ele, cada id de
+        ID_GRUPO_TELEGRAM(separados por vírgula) usa o cabeçalho e o idioma de MessageString.GRUPO_PADRAO.
         """
-        try:
-            caminho_pasta = "temporary images"
-            if not os.path.exists(caminho_pasta):
-                os.makedirs(caminho_pasta)
-                self.logging(f"{Fore.GREEN}[BOTMANAGER]{Fore.RESET}", f"Pasta '{caminho_pasta}' criada com sucesso.")
-                
-            else:
-                self.logging(f"{Fore.GREEN}[BOTMANAGER]{Fore.RESET}", f"Pasta '{caminho_pasta}' já existe.")
-               
-        except Exception as erro:
-            print(f"Erro ao verificar/criar a pasta: {erro}")
-    
-    def datetime_and_weekday_in_string(self): 
-        days = ['Segunda-Feira','Terça-feira','Quarta-feira','Quinta-feira','Sexta-feira','Sábado','Domingo']
-        return '{}, {}'.format(datetime.fromtimestamp(datetime.utcnow().timestamp() - 10800).strftime('%d/%m/%Y %H:%M:%S'),days[datetime.fromtimestamp(datetime.utcnow().timestamp() - 10800).weekday()] )
+        if os.getenv("GRUPOS_TELEGRAM"):
+            with open(os.getenv("GRUPOS_TELEGRAM"), 'r', encoding='utf-8') as arquivo:
+                grupos = json.load(arquivo)
+        else:
+            grupos = [{"chat_id": chat_id.strip()} for chat_id in (os.getenv("ID_GRUPO_TELEGRAM") or '').split(',') if chat_id.strip()]
+        return [dict(MessageString.GRUPO_PADRAO, **grupo) for grupo in grupos]
+
+    def enviar_mensagem(self, mensagem):
+        """Envia uma mensagem para todos os grupos; `mensagem(grupo)` monta o texto no cabeçalho e no idioma do grupo."""
+        return [self.caixa_de_saida.enviar('send_message', grupo["chat_id"], mensagem(grupo)) for grupo in self.grupos]
+
+    def enviar_foto(self, imagem, legenda):
+        """
+        Envia a mesma foto para todos os grupos com `legenda(grupo)`. O upload é feito só para o primeiro
+        grupo; os outros recebem o file_id da resposta(ou um novo upload, se o primeiro envio falhar).
+        """
+        if not self.grupos:
+            return []
+        primeiro = self.caixa_de_saida.enviar('send_photo', self.grupos[0]["chat_id"], photo=imagem, caption=legenda(self.grupos[0]))
+        futuros = [primeiro]
+        for grupo in self.grupos[1:]:
+            foto = Future()
+            def reaproveitar(f, foto=foto):
+                conteudo = CacheDeMidia.file_id_da_resposta(f.result()) if f.exception() is None else None
+                if conteudo is None:
+                    conteudo = io.BytesIO(imagem.getvalue())
+                    conteudo.name = getattr(imagem, 'name', 'imagem.png')
+                foto.set_result(conteudo)
+            primeiro.add_done_callback(reaproveitar)
+            futuros.append(self.caixa_de_saida.enviar('send_photo', grupo["chat_id"], photo=foto, caption=legenda(grupo)))
+        return futuros
+
+    def datetime_and_weekday_in_string(self, days=None): 
+        days = days or ['Segunda-Feira','Terça-feira','Quarta-feira','Quinta-feira','Sexta-feira','Sábado','Domingo']
+        agora = self.horario.now()
+        return '{}, {}'.format(agora.strftime('%d/%m/%Y %H:%M:%S'), days[agora.weekday()])
 
     def logging(self, info, message):
         print(f"{Fore.LIGHTBLACK_EX}[LOG]{Fore.RESET}{info} {Fore.LIGHTBLACK_EX}{self.datetime_and_weekday_in_string()}{Fore.RESET} {message}")
 
-    def conectar_iqoption(self):
-        while True:
+    def criar_conexao_iqoption(self, tentativas=None):
+        """Cria e retorna uma nova conexão na IQ Option(usada também pelos workers da catalogação paralela).
+        Sem `tentativas` tenta indefinidamente; com elas, levanta um erro depois da última tentativa."""
+        for tentativa in itertools.count(1):
+            if tentativas is not None and tentativa > tentativas:
+                raise Exception(f"não foi possível conectar na IQ Option após {tentativas} tentativas")
             try:
-                self.api_iqoption = IQ_Option(self.email_iqoption, self.senha_iqoption)
-                self.api_iqoption.connect()
-                if self.api_iqoption.check_connect():
-                    saldo = self.api_iqoption.get_balance()
+                api_iqoption = IQOptionInstrumentada(IQ_Option(self.email_iqoption, self.senha_iqoption), self.metricas)
+                api_iqoption.connect()
+                if api_iqoption.check_connect():
+                    saldo = api_iqoption.get_balance()
                     self.logging(f"{Fore.GREEN}[IQ OPTION]{Fore.RESET}", f"conectada, banca atual R${saldo} (Conta de Treinamento)")
-                    return self.api_iqoption
+                    return api_iqoption
                 else:
                     self.logging(f"{Fore.RED}[IQ OPTION]{Fore.RESET}", "Erro ao conectar na IQ Option. Tentando novamente...")
             except Exception as erro:
                 self.logging(f"{Fore.RED}[IQ OPTION]{Fore.RESET}", f"Erro ao conectar na IQ Option: {erro}")
-                time.sleep(2)
+            self.horario.relogio.sleep(2)
+
+    def conectar_iqoption(self):
+        self.api_iqoption = self.criar_conexao_iqoption()
+        return self.api_iqoption
     
     
 
-    def start(self):
-        while True:
+    def start(self, ate=None):
+        """Loop principal: catalogar, enviar a lista e acompanhar os resultados. `ate`(timestamp) encerra o
+        loop nesse horário; sem ele o bot roda indefinidamente.
+
+        Se houver um checkpoint(PontoDeRestauracao) de uma lista ainda em acompanhamento, o primeiro ciclo
+        retoma essa lista direto das etapas pendentes, sem catalogar nem enviar a lista de novo."""
+        self.catalogador.estados_da_catalogacao.update(self.ponto_de_restauracao.carregar_estados())
+        retomada = self.ponto_de_restauracao.carregar()
+        if retomada is not None:
+            self.logging(f"{Fore.GREEN}[BOTMANAGER]{Fore.RESET}", f"retomando a lista do checkpoint: {len(retomada['etapas'])} operações pendentes")
+
+        while ate is None or self.horario.relogio.time() < ate:
             try:
-                # 1. gerar lista
-                catalogacao = self.catalogador.gerar_lista()
-                print('catalogacao:', catalogacao)
-                
-                if len(catalogacao["lista"]) < 3:
-                    minutos = int(self.horario.now().strftime('%M'))
-                    if minutos >= 50:
-                        horario_atual = self.horario.now().strftime('%H:%M')
-                        proximo_horario = self.horario.proximo_horario(horario_atual)
-                        self.logging(f"{Fore.GREEN}[BOTMANAGER]{Fore.RESET}",f"poucas operacoes encontradas no horario atual {Fore.LIGHTBLACK_EX}{self.horario.now().strftime('%d/%m/%Y %H:%M:%S')}{Fore.RESET} aguardando o proximo horario {Fore.LIGHTBLACK_EX}{proximo_horario}{Fore.RESET} para tentar novamente")
-                        self.horario.aguardar_horario(proximo_horario) # Aguarda até a próxima hora
+                if retomada is not None:
+                    # 1-3. lista publicada antes da queda: acompanhar só as etapas pendentes
+                    catalogacao, etapas, timeframe, retomada = retomada["catalogacao"], retomada["etapas"], retomada["timeframe"], None
+                    lista = self.catalogador.acompanhar_operacoes(catalogacao["lista"], timeframe, etapas=etapas)
+                else:
+                    # 1. gerar lista
+                    catalogacao = self.catalogador.gerar_lista()
+                    print('catalogacao:', catalogacao)
 
-                    continue
-                
-                # 2. enviar lista no telegram
-                self.api_telegram.send_message(self.id_grupo_telegram, self.messageString.send_list_string(catalogacao))
+                    if len(catalogacao["lista"]) < self.catalogador.minimo_de_operacoes:
+                        minutos = int(self.horario.now().strftime('%M'))
+                        if minutos >= 50:
+                            horario_atual = self.horario.now().strftime('%H:%M')
+                            proximo_horario = self.horario.proximo_horario(horario_atual)
+                            self.logging(f"{Fore.GREEN}[BOTMANAGER]{Fore.RESET}",f"poucas operacoes encontradas no horario atual {Fore.LIGHTBLACK_EX}{self.horario.now().strftime('%d/%m/%Y %H:%M:%S')}{Fore.RESET} aguardando o proximo horario {Fore.LIGHTBLACK_EX}{proximo_horario}{Fore.RESET} para tentar novamente")
+                            self.horario.aguardar_horario(proximo_horario) # Aguarda até a próxima hora
+
+                        continue
+                    self.ponto_de_restauracao.gravar_estados(self.catalogador.estados_da_catalogacao)
+
+                    # 2. enviar lista no telegram
+                    self.enviar_mensagem(lambda grupo: self.messageString.send_list_string(catalogacao, grupo))
+                    self.ponto_de_restauracao.iniciar(catalogacao)
 
-                # 3. acompanhar resultado da lista
-                lista = self.catalogador.acompanhar_operacoes(catalogacao["lista"])
+                    # 3. acompanhar resultado da lista
+                    lista = self.catalogador.acompanhar_operacoes(catalogacao["lista"])
 
                 # 4. enviar resultado da lista
                 catalogacao["lista"] = lista
-                self.api_telegram.send_message(self.id_grupo_telegram, self.messageString.resultado_e_placar_da_lista_string(catalogacao))
+                self.enviar_mensagem(lambda grupo: self.messageString.resultado_e_placar_da_lista_string(catalogacao, grupo))
+                self.ponto_de_restauracao.encerrar()
+                self.logging(f"{Fore.GREEN}[TELEGRAM]{Fore.RESET}", f"caixa de saída: {self.caixa_de_saida.estatisticas()}")
                 
                 # 5. aguardar proxima hora, caso necessário
                 if self.horario.horario_valido(catalogacao["proxima_hora"]):
@@ -894,8 +3150,11 @@ class BotManager:
         print("| Detalhes")
         print("Desenvolvedor: David Eduardo (https://github.com/davideduardotech)")
       
-        self.criar_pasta_de_imagens()
         self.conectar_iqoption()    
+        self.ativos_abertos.iniciar_atualizacao_em_segundo_plano()
+        if self.porta_metricas:
+            self.metricas.iniciar_servidor(self.porta_metricas)
+            self.logging(f"{Fore.GREEN}[MÉTRICAS]{Fore.RESET}", f"métricas em http://127.0.0.1:{self.porta_metricas}/metrics")
         self.start()
 
 
@@ -0,0 +1,307 @@
+"""
+Replay offline do gerador de sinais: roda catalogação → lista → acompanhamento dos gales sem IQ Option e
+sem Telegram, com velas gravadas(arquivos do ArmazenamentoDeVelas, `{par}-M{tf}.bin`) ou sintéticas e um
+relógio simulado, então um dia inteiro de operações roda em segundos.
+
+Uso:
+    python replay.py sintetico [--pares 20] [--dias 12] [--inicio "2025-10-09 09:00"] [--horas 24]
+    python replay.py gravado candles/ [--inicio "2025-10-09 09:00"] [--horas 24] [--fechados PAR1 PAR2]
+"""
+import argparse, contextlib, io, itertools, json, os, tempfile, threading, time
+from collections import Counter
+from datetime import datetime
+from types import SimpleNamespace
+import numpy as np
+import pytz
+from main import BotManager, Horario, Relogio, CaixaDeSaida, CacheDeMidia, PontoDeRestauracao, ArmazenamentoDeVelas, IQOptionInstrumentada, MessageString
+
+
+class RelogioSimulado(Relogio):
+    """
+    Relógio do replay: o tempo só anda quando alguém espera(sleep, aguardar_horario, a agenda do
+    AcompanhadorDeSinais sem tarefas em execução) ou quando a IQOptionSimulado cobra a latência de uma chamada.
+    """
+    def __init__(self, inicio):
+        self.atual = float(inicio)
+        self.trava = threading.Lock()
+
+    def time(self):
+        return self.atual
+
+    def monotonic(self):
+        return self.atual
+
+    def sleep(self, segundos):
+        self.avancar(segundos)
+
+    def avancar(self, segundos):
+        with self.trava:
+            self.atual += max(segundos, 0)
+
+    def aguardar(self, condicao, timeout=None, ocioso=True):
+        if ocioso and timeout is not None:
+            self.avancar(timeout)
+            return False
+        # ainda há tarefas rodando: esperar(em tempo real) que terminem ou agendem a próxima etapa
+        return condicao.wait(0.01)
+
+
+class IQOptionSimulado:
+    """
+    Substituto local do IQ_Option com get_candles(), get_all_open_time() e os streams de velas, servidos dos
+    arquivos do ArmazenamentoDeVelas em `diretorio` até o horário do relógio simulado. A vela em andamento
+    é devolvida sem movimento(close = open), como se tivesse acabado de abrir.
+    """
+    def __init__(self, relogio, diretorio, fechados=(), latencia=0.05):
+        self.relogio = relogio
+        self.armazenamento = ArmazenamentoDeVelas(diretorio)
+        self.fechados = set(fechados)
+        self.latencia = latencia
+        self.velas = {}
+        self.streams = {}
+        self.trava = threading.Lock()
+        self.chamadas = 0
+        self.velas_servidas = 0
+        self.pares = sorted({nome.rsplit('-M', 1)[0] for nome in os.listdir(diretorio) if nome.endswith('.bin')})
+
+    def carregar(self, par, tamanho):
+        """Velas do arquivo `{par}-M{tf}.bin`; sem o arquivo, reamostra as velas do M1."""
+        with self.trava:
+            if (par, tamanho) not in self.velas:
+                velas = self.armazenamento.ler(par, tamanho // 60)
+                if not len(velas) and tamanho > 60:
+                    velas = ArmazenamentoDeVelas.reamostrar(self.armazenamento.ler(par, 1), tamanho // 60)
+                self.velas[(par, tamanho)] = velas
+            return self.velas[(par, tamanho)]
+
+    def velas_ate(self, par, tamanho, quantidade, fim):
+        agora = self.relogio.time()
+        velas = self.carregar(par, tamanho)
+        j = int(np.searchsorted(velas['from'], min(fim, agora), side='right'))
+
+        resposta = []
+        for vela in velas[max(j - quantidade, 0):j]:
+            inicio = int(vela['from'])
+            aberta = inicio + tamanho > agora
+            resposta.append({
+                'id': inicio // tamanho, 'from': inicio, 'at': inicio * 10**9, 'to': inicio + tamanho,
+                'open': float(vela['open']),
+                'close': float(vela['open'] if aberta else vela['close']),
+                'min': float(vela['open'] if aberta else vela['min']),
+                'max': float(vela['open'] if aberta else vela['max']),
+                'volume': 0 if aberta else int(vela['volume'])
+            })
+        return resposta
+
+    def get_candles(self, par, tamanho, quantidade, fim):
+        self.relogio.sleep(self.latencia)
+        velas = self.velas_ate(par, tamanho, quantidade, fim)
+        with self.trava:
+            self.chamadas += 1
+            self.velas_servidas += len(velas)
+        return velas
+
+    def get_all_open_time(self):
+        ativos = {par: {'open': par not in self.fechados} for par in self.pares}
+        return {'digital': dict(ativos), 'binary': dict(ativos), 'turbo': dict(ativos)}
+
+    def start_candles_stream(self, par, tamanho, quantidade):
+        self.streams[(par, tamanho)] = quantidade
+
+    def get_realtime_candles(self, par, tamanho):
+        quantidade = self.streams.get((par, tamanho), 0)
+        return {vela['from']: vela for vela in self.velas_ate(par, tamanho, quantidade, self.relogio.time())}
+
+    def stop_candles_stream(self, par, tamanho):
+        self.streams.pop((par, tamanho), None)
+
+
+class TelegramSimulado:
+    """Substituto do TeleBot que só guarda as mensagens enviadas(com o horário simulado do envio)."""
+    def __init__(self, relogio):
+        self.relogio = relogio
+        self.mensagens = []
+        self.ids = itertools.count(1)
+        self.nomes_dos_arquivos = {}
+        self.uploads = Counter()
+        self.trava = threading.Lock()
+
+    def registrar(self, tipo, chat_id, conteudo):
+        with self.trava:
+            message_id = next(self.ids)
+            self.mensagens.append({"tipo": tipo, "chat_id": chat_id, "conteudo": conteudo, "horario": self.relogio.time()})
+        return SimpleNamespace(message_id=message_id, sticker=None, photo=None, document=None)
+
+    def send_message(self, chat_id, text, **kwargs):
+        return self.registrar('mensagem', chat_id, text)
+
+    def send_photo(self, chat_id, photo, caption=None, **kwargs):
+        resposta = self.registrar('foto', chat_id, caption)
+        if not isinstance(photo, str):
+            self.uploads['foto'] += 1
+        resposta.photo = [SimpleNamespace(file_id=photo if isinstance(photo, str) else f"foto-{resposta.message_id}")]
+        return resposta
+
+    def send_sticker(self, chat_id, sticker, **kwargs):
+        # upload(arquivo) ou reenvio pelo file_id; nos dois casos registra o nome do arquivo
+        nome = self.nomes_dos_arquivos.get(sticker, sticker) if isinstance(sticker, str) else sticker.name
+        if not isinstance(sticker, str):
+            self.uploads['sticker'] += 1
+        resposta = self.registrar('sticker', chat_id, nome)
+        file_id = sticker if isinstance(sticker, str) else f"sticker-{resposta.message_id}"
+        self.nomes_dos_arquivos[file_id] = nome
+        resposta.sticker = SimpleNamespace(file_id=file_id)
+        return resposta
+
+
+def gravar_velas_sinteticas(diretorio, pares=20, dias=12, fim=None, timeframe=1, semente=0):
+    """
+    Grava velas sintéticas(passeio aleatório, ~5% de dojis) no formato do ArmazenamentoDeVelas.
+
+    Returns:
+        list: Nomes dos pares gravados.
+    """
+    duracao = timeframe * 60
+    fim = int(fim or time.time())
+    fim -= fim % duracao
+    quantidade = dias * 86400 // duracao
+    inicio = fim - quantidade * duracao
+
+    gerador = np.random.default_rng(semente)
+    armazenamento = ArmazenamentoDeVelas(diretorio)
+    nomes = [f"PAR{i}-OTC" for i in range(pares)]
+    for nome in nomes:
+        movimento = gerador.normal(0, 0.0003, quantidade)
+        movimento[gerador.random(quantidade) < 0.05] = 0
+        fechamento = np.round(1.1 + np.cumsum(movimento), 5)
+        abertura = np.concatenate(([1.1], fechamento[:-1]))
+
+        velas = np.empty(quantidade, dtype=ArmazenamentoDeVelas.DTYPE)
+        velas['from'] = inicio + np.arange(quantidade) * duracao
+        velas['open'] = abertura
+        velas['close'] = fechamento
+        velas['min'] = np.round(np.minimum(abertura, fechamento) - np.abs(gerador.normal(0, 0.0001, quantidade)), 5)
+        velas['max'] = np.round(np.maximum(abertura, fechamento) + np.abs(gerador.normal(0, 0.0001, quantidade)), 5)
+        velas['volume'] = gerador.integers(1, 500, quantidade)
+        armazenamento.gravar(nome, timeframe, velas)
+    return nomes
+
+
+@contextlib.contextmanager
+def fuso_local(zona):
+    """
+    Ajusta o TZ do processo para `zona` enquanto o bloco roda e restaura o anterior no final.
+
+    O catalogador usa o fuso local do processo(datetime.fromtimestamp) e o Horario usa America/Sao_Paulo;
+    em produção os dois coincidem, então o replay roda dentro de fuso_local(bot.horario.timezone.zone).
+    """
+    anterior = os.environ.get('TZ')
+    os.environ['TZ'] = zona
+    time.tzset()
+    try:
+        yield
+    finally:
+        if anterior is None:
+            os.environ.pop('TZ', None)
+        else:
+            os.environ['TZ'] = anterior
+        time.tzset()
+
+
+def criar_bot(relogio, api, diretorio_temporario, grupos=1):
+    """BotManager ligado ao relógio simulado, à IQOptionSimulado e ao TelegramSimulado(sem limites de envio),
+    enviando para `grupos` grupos. O cache de file_ids e os checkpoints do replay ficam em
+    `diretorio_temporario` para não misturar com os do bot real. O fuso do processo não é alterado(ver
+    `fuso_local`)."""
+    bot = BotManager(horario=Horario(relogio=relogio), api_telegram=TelegramSimulado(relogio))
+    bot.grupos = [dict(MessageString.GRUPO_PADRAO, chat_id='replay' if i == 0 else f'replay-{i}') for i in range(grupos)]
+    bot.id_grupo_telegram = bot.grupos[0]["chat_id"]
+    bot.api_iqoption = IQOptionInstrumentada(api, bot.metricas)
+    bot.caixa_de_saida = CaixaDeSaida(bot, intervalo_por_chat=0, limite_por_chat=10**9, limite_global=10**9)
+    bot.cache_de_midia = CacheDeMidia(os.path.join(diretorio_temporario, 'media_cache.json'))
+    bot.ponto_de_restauracao = PontoDeRestauracao(bot, os.path.join(diretorio_temporario, 'checkpoint'))
+    bot.catalogador.fabrica_de_conexoes = lambda: bot.api_iqoption
+    bot.catalogador.armazenamento_de_velas = None
+    return bot
+
+
+def executar_replay(diretorio, inicio, horas=24, fechados=(), latencia=0.05, silencioso=True, arquivo_de_metricas=None, varredura=False, grupos=1):
+    """
+    Roda o loop do BotManager de `inicio` até `inicio + horas` no relógio simulado. Com
+    `arquivo_de_metricas`, grava no final o snapshot das Metricas do bot em JSON. `varredura` liga a
+    escolha da configuração por `Catalogador.varrer_configuracoes` e `grupos` envia para vários grupos.
+
+    Returns:
+        dict: Tempo real e simulado, chamadas ao get_candles(), mensagens por tipo, stickers, uploads de
+        arquivos(o resto foi reenviado pelo file_id) e o atraso médio dos despertares agendados.
+    """
+    relogio = RelogioSimulado(inicio)
+    api = IQOptionSimulado(relogio, diretorio, fechados, latencia)
+
+    with tempfile.TemporaryDirectory() as temporario:
+        bot = criar_bot(relogio, api, temporario, grupos)
+        bot.catalogador.varredura_de_configuracoes = varredura
+
+        inicio_real = time.perf_counter()
+        with fuso_local(bot.horario.timezone.zone), contextlib.redirect_stdout(io.StringIO()) if silencioso else contextlib.nullcontext():
+            bot.start(ate=inicio + horas * 3600)
+            while bot.caixa_de_saida.profundidade():
+                time.sleep(0.01)
+        tempo_real = time.perf_counter() - inicio_real
+
+    if arquivo_de_metricas:
+        with open(arquivo_de_metricas, 'w', encoding='utf-8') as arquivo:
+            json.dump(bot.metricas.snapshot(), arquivo, indent=2)
+
+    mensagens = bot.api_telegram.mensagens
+    atrasos = [atraso for _, atraso in bot.horario.atrasos]
+    return {
+        "tempo_real_s": round(tempo_real, 2),
+        "tempo_simulado_h": round((relogio.time() - inicio) / 3600, 2),
+        "chamadas_get_candles": api.chamadas,
+        "mensagens": dict(Counter(mensagem["tipo"] for mensagem in mensagens)),
+        "stickers": dict(Counter(os.path.basename(str(mensagem["conteudo"])) for mensagem in mensagens if mensagem["tipo"] == 'sticker')),
+        "uploads": dict(bot.api_telegram.uploads),
+        "atraso_medio_s": round(float(np.mean(atrasos)), 3) if atrasos else 0.0
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay offline do gerador de sinais")
+    subparsers = parser.add_subparsers(dest="fonte", required=True)
+
+    sintetico = subparsers.add_parser("sintetico", help="velas sintéticas geradas em um diretório temporário")
+    sintetico.add_argument("--pares", type=int, default=20)
+    sintetico.add_argument("--dias", type=int, default=12)
+    sintetico.add_argument("--semente", type=int, default=0)
+
+    gravado = subparsers.add_parser("gravado", help="velas gravadas pelo ArmazenamentoDeVelas")
+    gravado.add_argument("diretorio")
+
+    for subparser in (sintetico, gravado):
+        subparser.add_argument("--inicio", help="'AAAA-MM-DD HH:MM' no fuso America/Sao_Paulo(padrão: fim das velas - horas)")
+        subparser.add_argument("--horas", type=float, default=24)
+        subparser.add_argument("--fechados", nargs="*", default=[])
+        subparser.add_argument("--latencia", type=float, default=0.05, help="segundos simulados por chamada ao get_candles()")
+        subparser.add_argument("--verboso", action="store_true")
+        subparser.add_argument("--metricas", help="arquivo JSON para o snapshot das métricas no final do replay")
+        subparser.add_argument("--varredura", action="store_true", help="escolher a configuração pela varredura de todas as combinações")
+        subparser.add_argument("--grupos", type=int, default=1, help="quantidade de grupos do Telegram recebendo os sinais")
+
+    argumentos = parser.parse_args()
+    fuso = pytz.timezone("America/Sao_Paulo")
+    inicio = int(fuso.localize(datetime.strptime(argumentos.inicio, "%Y-%m-%d %H:%M")).timestamp()) if argumentos.inicio else None
+
+    with tempfile.TemporaryDirectory() as temporario:
+        if argumentos.fonte == "sintetico":
+            diretorio = temporario
+            fim = (inicio + int(argumentos.horas * 3600)) if inicio else int(time.time())
+            gravar_velas_sinteticas(diretorio, argumentos.pares, argumentos.dias, fim, semente=argumentos.semente)
+        else:
+            diretorio = argumentos.diretorio
+
+        if inicio is None:
+            ultima = max(int(ArmazenamentoDeVelas(diretorio).ler(nome[:-len('-M1.bin')], 1)['from'][-1]) for nome in os.listdir(diretorio) if nome.endswith('-M1.bin'))
+            inicio = ultima - int(argumentos.horas * 3600)
+
+        print(executar_replay(diretorio, inicio, argumentos.horas, argumentos.fechados, argumentos.latencia, not argumentos.verboso, argumentos.metricas, argumentos.varredura, argumentos.grupos))
@@ -0,0 +1,117 @@
+"""Caixa de saída(CaixaDeSaida) com o TeleBot de verdade apontado para um servidor HTTP local no lugar do Telegram."""
+import json, threading, time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import pytest
+import telebot
+from telebot import apihelper
+from main import CaixaDeSaida, Metricas
+
+
+class TelegramLocal(BaseHTTPRequestHandler):
+    """Responde como a API do Telegram. O texto da mensagem escolhe a resposta: 'limite' recebe um 429 com
+    retry_after=1 na primeira vez, 'invalida' sempre recebe 400 e o resto é enviado."""
+    def do_POST(self):
+        parametros = {nome: valores[0] for nome, valores in parse_qs(urlparse(self.path).query).items()}
+        tamanho = int(self.headers.get('Content-Length') or 0)
+        if tamanho:
+            parametros.update({nome: valores[0] for nome, valores in parse_qs(self.rfile.read(tamanho).decode()).items()})
+        chat_id, texto = int(parametros['chat_id']), parametros['text']
+
+        servidor = self.server
+        with servidor.trava:
+            servidor.recebidas.append((time.monotonic(), chat_id, texto))
+            vezes = sum(1 for _, _, recebido in servidor.recebidas if recebido == texto)
+
+        if texto == 'limite' and vezes == 1:
+            self.responder(429, {"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1", "parameters": {"retry_after": 1}})
+        elif texto == 'invalida':
+            self.responder(400, {"ok": False, "error_code": 400, "description": "Bad Request: can't parse entities"})
+        else:
+            self.responder(200, {"ok": True, "result": {"message_id": vezes, "date": int(time.time()), "chat": {"id": chat_id, "type": "group"}, "text": texto}})
+
+    def responder(self, status, corpo):
+        conteudo = json.dumps(corpo).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(conteudo)))
+        self.end_headers()
+        self.wfile.write(conteudo)
+
+    def log_message(self, *args):
+        pass
+
+
+class BotManagerFalso:
+    def __init__(self):
+        self.api_telegram = telebot.TeleBot('123:teste', threaded=False)
+        self.metricas = Metricas()
+
+    def logging(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor(monkeypatch):
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), TelegramLocal)
+    servidor.trava = threading.Lock()
+    servidor.recebidas = []
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    monkeypatch.setattr(apihelper, 'API_URL', f"http://127.0.0.1:{servidor.server_port}/bot{{0}}/{{1}}")
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def criar_caixa(**kwargs):
+    return CaixaDeSaida(BotManagerFalso(), **dict({"workers": 3, "intervalo_por_chat": 0}, **kwargs))
+
+
+def test_429_e_reenviado_depois_do_retry_after(servidor):
+    caixa = criar_caixa()
+    mensagem = caixa.enviar('send_message', 1, 'limite').result(timeout=10)
+
+    assert mensagem.text == 'limite'
+    tentativas = [instante for instante, _, texto in servidor.recebidas if texto == 'limite']
+    assert len(tentativas) == 2
+    assert tentativas[1] - tentativas[0] >= 1
+    assert caixa.enviadas == 1 and caixa.falhas == 0
+
+
+def test_400_falha_sem_nova_tentativa(servidor):
+    caixa = criar_caixa()
+    futuro = caixa.enviar('send_message', 1, 'invalida')
+
+    with pytest.raises(apihelper.ApiTelegramException) as erro:
+        futuro.result(timeout=10)
+    assert erro.value.error_code == 400
+    # a fila do chat segue andando depois da falha
+    assert caixa.enviar('send_message', 1, 'seguinte').result(timeout=10).text == 'seguinte'
+    assert [texto for _, _, texto in servidor.recebidas] == ['invalida', 'seguinte']
+    assert caixa.falhas == 1
+
+
+def test_mensagens_de_um_chat_saem_em_ordem(servidor):
+    caixa = criar_caixa()
+    futuros = [caixa.enviar('send_message', chat_id, f"{chat_id}-{i}") for i in range(6) for chat_id in (1, 2)]
+    # um 429 no meio do chat 1 não deixa as mensagens seguintes passarem na frente
+    futuros.append(caixa.enviar('send_message', 1, 'limite'))
+    futuros += [caixa.enviar('send_message', 1, f"1-{i}") for i in range(6, 9)]
+    for futuro in futuros:
+        futuro.result(timeout=10)
+
+    enviadas_no_chat_1 = [texto for _, chat_id, texto in servidor.recebidas if chat_id == 1]
+    assert enviadas_no_chat_1 == [f"1-{i}" for i in range(6)] + ['limite', 'limite'] + [f"1-{i}" for i in range(6, 9)]
+    assert [texto for _, chat_id, texto in servidor.recebidas if chat_id == 2] == [f"2-{i}" for i in range(6)]
+
+
+def test_limite_global_por_segundo(servidor):
+    caixa = criar_caixa(limite_global=3)
+    futuros = [caixa.enviar('send_message', chat_id, 'global') for chat_id in range(7)]
+    for futuro in futuros:
+        futuro.result(timeout=10)
+
+    instantes = sorted(instante for instante, _, _ in servidor.recebidas)
+    assert len(instantes) == 7
+    # nunca mais de 3 envios dentro de um mesmo segundo
+    assert all(instantes[i + 3] - instantes[i] >= 0.99 for i in range(len(instantes) - 3))
@@ -0,0 +1,105 @@
+"""Catalogação paralela(pool de workers) com um cliente da IQ Option falso, sem rede."""
+import contextlib, io, threading, time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import main
+from main import Relogio
+from replay import RelogioSimulado, IQOptionSimulado, criar_bot, gravar_velas_sinteticas
+
+
+class IQOptionLenta(IQOptionSimulado):
+    """IQOptionSimulado em que a primeira chamada de `par_lento` trava por `espera` segundos(tempo real)."""
+    def __init__(self, *args, par_lento=None, espera=0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.par_lento, self.espera = par_lento, espera
+        self.travou = threading.Event()
+
+    def get_candles(self, par, tamanho, quantidade, fim):
+        if par == self.par_lento and not self.travou.is_set():
+            self.travou.set()
+            time.sleep(self.espera)
+        return super().get_candles(par, tamanho, quantidade, fim)
+
+
+def criar(diretorio, relogio, pares=4, **kwargs):
+    nomes = gravar_velas_sinteticas(str(diretorio), pares=pares, dias=3, fim=relogio.time())
+    api = IQOptionLenta(relogio, str(diretorio), latencia=0, **kwargs)
+    bot = criar_bot(relogio, api, str(diretorio))
+    bot.catalogador.backoff_inicial = 0
+    bot.catalogador.dias_maximos_da_catalogacao = 1
+    return bot, api, nomes
+
+
+def test_todos_os_ativos_com_uma_conexao_por_worker(tmp_path):
+    bot, api, pares = criar(tmp_path, RelogioSimulado(1760000400))
+    catalogador = bot.catalogador
+    conexoes = []
+    catalogador.fabrica_de_conexoes = lambda: conexoes.append(1) or bot.api_iqoption
+    catalogador.maximo_de_workers = 2
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        estados = catalogador.atualizar_estados(pares, 1, 1)
+
+    assert list(estados) == pares
+    assert 1 <= len(conexoes) <= 2
+
+
+def test_worker_cancelado_nao_altera_os_estados(tmp_path):
+    bot, api, pares = criar(tmp_path, Relogio(), par_lento="PAR0-OTC", espera=1.0)
+    catalogador = bot.catalogador
+    catalogador.timeout_por_ativo = 0.3
+    catalogador.tentativas_por_ativo = 1
+
+    executor = catalogador.executor_de_busca = ThreadPoolExecutor(max_workers=catalogador.maximo_de_workers)
+    with contextlib.redirect_stdout(io.StringIO()):
+        estados = catalogador.atualizar_estados(pares, 1, 1)
+        executor.shutdown(wait=True)
+
+    assert "PAR0-OTC" not in estados
+    assert set(estados) == set(pares[1:])
+    assert ("PAR0-OTC", 1) not in catalogador.estados_da_catalogacao
+
+
+def test_lote_tem_prazo_mesmo_com_a_fila_atras_de_um_worker_travado(tmp_path):
+    bot, api, pares = criar(tmp_path, Relogio(), par_lento="PAR0-OTC", espera=4.0)
+    catalogador = bot.catalogador
+    catalogador.maximo_de_workers = 1
+    catalogador.timeout_por_ativo = 0.3
+    catalogador.tentativas_por_ativo = 1
+
+    inicio = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        estados = catalogador.atualizar_estados(pares, 1, 1)
+    duracao = time.time() - inicio
+
+    prazo_do_lote = catalogador.timeout_por_ativo * len(pares)
+    assert duracao < prazo_do_lote + 0.5
+    assert "PAR0-OTC" not in estados
+    # o worker travado foi abandonado junto com o pool: o ciclo seguinte roda em threads novas
+    assert catalogador.executor_de_busca is None
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert set(catalogador.atualizar_estados(pares, 1, 1)) == set(pares)
+
+
+def test_falha_de_conexao_do_worker_tem_limite(tmp_path, monkeypatch):
+    bot, api, pares = criar(tmp_path, RelogioSimulado(1760000400))
+    logins = []
+
+    class IQOptionForaDoAr:
+        def __init__(self, *args):
+            pass
+
+        def connect(self):
+            logins.append(1)
+            raise ConnectionError("fora do ar")
+
+    monkeypatch.setattr(main, "IQ_Option", IQOptionForaDoAr)
+    with contextlib.redirect_stdout(io.StringIO()):
+        with pytest.raises(Exception):
+            bot.criar_conexao_iqoption(tentativas=2)
+        assert len(logins) == 2
+
+        bot.catalogador.fabrica_de_conexoes = lambda: bot.criar_conexao_iqoption(tentativas=bot.catalogador.tentativas_de_conexao)
+        bot.catalogador.maximo_de_workers = 1
+        assert bot.catalogador.atualizar_estados(pares[:1], 1, 1) == {}
+    assert len(logins) == 2 + bot.catalogador.tentativas_por_ativo * bot.catalogador.tentativas_de_conexao
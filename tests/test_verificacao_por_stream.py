@@ -0,0 +1,28 @@
+"""Verificação ao vivo(FluxoDeVelas) no replay offline: o resultado sai do stream, sem get_candles()."""
+import contextlib, io
+from replay import RelogioSimulado, IQOptionSimulado, criar_bot, gravar_velas_sinteticas
+
+FIM = 1760000400
+
+
+def test_resultado_pelo_stream_sem_get_candles(tmp_path):
+    pares = gravar_velas_sinteticas(str(tmp_path), pares=1, dias=1, fim=FIM)
+    inicio = FIM - 3600
+    relogio = RelogioSimulado(inicio)
+    api = IQOptionSimulado(relogio, str(tmp_path), latencia=0)
+    bot = criar_bot(relogio, api, str(tmp_path))
+    catalogador = bot.catalogador
+    catalogador.verificacao_por_stream = True
+
+    par = pares[0]
+    signal = {par: {"12:00": {"dir": "CALL"}}}
+    operacao = {"ativo": par, "horario": "12:00", "timeframe": "M1", "dir": "CALL"}
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot.fluxo_de_velas.inscrever(par, 1)
+        relogio.avancar(catalogador.prazo_da_verificacao(inicio, 1, 0) - inicio)
+        chamadas = api.chamadas
+        catalogador.processar_resultado(signal, operacao, 1, inicio, 0)
+        bot.fluxo_de_velas.cancelar(par, 1)
+
+    assert api.chamadas == chamadas
+    assert bot.velas_recentes.buscas == 0